@@ -1,327 +1,4842 @@
 ﻿import mysql.connector
 import json
+import datetime
+import re
+import decimal
+import hashlib
+import heapq
+import math
+import os
+import pickle
+import queue
+import shutil
+import sys
+import tempfile
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext, ttk
 from pathlib import Path
 import threading
-from typing import Dict, List, Tuple, Any, Optional
+import time
+import unicodedata
+import uuid
+import zlib
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from operator import is_not, itemgetter
+from typing import Dict, Iterable, List, Tuple, Any, Optional
 
 
-class JSONtoMySQL:
+class ColumnStats:
     """
-    Handles the business logic for importing JSON files into MySQL.
+    Running summary of the values seen in one column.
+    
+    Holds just enough to pick the column's MySQL type (see
+    JSONtoMySQL._determine_column_type) without keeping the values themselves.
+    """
+    
+    __slots__ = ('has_nested', 'has_string', 'max_length', 'has_float',
+                 'has_int', 'max_abs_int', 'has_bool', 'has_value')
+    
+    def __init__(self):
+        self.has_nested = False
+        self.has_string = False
+        self.max_length = 0
+        self.has_float = False
+        self.has_int = False
+        self.max_abs_int = 0
+        self.has_bool = False
+        self.has_value = False
+    def add(self, value: Any):
+        """Account for one non-null value."""
+        self.has_value = True
+        value_type = type(value)
+        if value_type is str:
+            self.has_string = True
+            if len(value) > self.max_length:
+                self.max_length = len(value)
+        elif value_type is bool:  # Checked before int - bool is a subclass of int
+            self.has_bool = True
+        elif value_type is int:
+            self.has_int = True
+            if abs(value) > self.max_abs_int:
+                self.max_abs_int = abs(value)
+        elif value_type is float:
+            self.has_float = True
+        elif value_type is dict or value_type is list:
+            self.has_nested = True
+        elif isinstance(value, (dict, list)):
+            self.has_nested = True
+        elif isinstance(value, str):
+            self.has_string = True
+            self.max_length = max(self.max_length, len(value))
+        elif isinstance(value, float):
+            self.has_float = True
+    def add_values(self, values: Any):
+        """
+        Account for a whole column of values at once (None values are skipped).
+        
+        Equivalent to calling add() for every value, but when the values are
+        all of one type - the usual case - the type test, integer range and
+        string length are each worked out in a single pass of C-level builtins
+        (set/map/max) instead of a Python-level call per value.
+        """
+        present = list(filter(partial(is_not, None), values))
+        if not present:
+            return
+        value_types = set(map(type, present))
+        if len(value_types) > 1:
+            for value in present:
+                self.add(value)
+            return
+        
+        value_type = value_types.pop()
+        if value_type is str:
+            self.has_value = self.has_string = True
+            self.max_length = max(self.max_length, max(map(len, present)))
+        elif value_type is bool:
+            self.has_value = self.has_bool = True
+        elif value_type is int:
+            self.has_value = self.has_int = True
+            self.max_abs_int = max(self.max_abs_int, max(present), -min(present))
+        elif value_type is float:
+            self.has_value = self.has_float = True
+        elif value_type is dict or value_type is list:
+            self.has_value = self.has_nested = True
+        else:
+            for value in present:
+                self.add(value)
+    def merge(self, other: 'ColumnStats'):
+        """Combine the statistics of another ColumnStats into this one."""
+        self.has_nested |= other.has_nested
+        self.has_string |= other.has_string
+        self.max_length = max(self.max_length, other.max_length)
+        self.has_float |= other.has_float
+        self.has_int |= other.has_int
+        self.max_abs_int = max(self.max_abs_int, other.max_abs_int)
+        self.has_bool |= other.has_bool
+        self.has_value |= other.has_value
+    def column_type(self) -> str:
+        """MySQL column type, using the precedence of _determine_column_type."""
+        if not self.has_value:
+            return "TEXT"  # If all values are None, default to TEXT
+        if self.has_nested:
+            return "JSON"
+        if self.has_string:
+            return "TEXT" if self.max_length > 255 else "VARCHAR(255)"
+        if self.has_float:
+            return "DOUBLE"
+        if self.has_int:
+            return "BIGINT" if self.max_abs_int >= 2147483648 else "INT"
+        if self.has_bool:
+            return "BOOLEAN"
+        return "TEXT"
+    def stores_float_as_text(self) -> bool:
+        """True if floats share this column with strings (see _encode_float_text)."""
+        return self.has_float and not self.has_nested and self.has_string
 
-    This class manages database connections, table creation with automatic 
-    schema inference, and data insertion with transaction safety. Each instance 
-    represents a single database connection that should be closed when operations 
-    are complete.
+
+class RowBuffer:
     """
+    Parsed records stored as compact tuples instead of dicts.
     
-    def __init__(self, host: str, user: str, password: str, database: str, 
-                 port: int = 3306, status_callback=None):
+    Each record is converted to a tuple as soon as it is parsed, and the dict
+    can be freed right away. A tuple has no per-row key table, so it is a
+    fraction of the size of the dict, and it is exactly the parameter row that
+    INSERT needs - the insert path uses the rows as they are.
+    
+    Column types are accumulated per column (ColumnStats) while rows are added,
+    so inference does not need the values gathered up again afterwards. This
+    is done column by column for each block of STATS_BLOCK_ROWS rows (see
+    ColumnStats.add_values) rather than value by value as each row arrives.
+    
+    While parsing, columns are numbered in the order they are first seen
+    (rows added before a new column appeared are simply shorter). finalize()
+    pads the rows and reorders every row to the alphabetical column order used
+    for the table.
+    """
+    
+    # Rows added between column-wise statistics updates
+    STATS_BLOCK_ROWS = 4096
+    
+    def __init__(self):
+        self.columns: List[str] = []
+        self.stats: List[ColumnStats] = []
+        self.rows: List[tuple] = []
+        self._index: Dict[str, int] = {}
+        self._counted = 0  # Leading rows already accounted for in stats
+    def __len__(self):
+        return len(self.rows)
+    def _add_column(self, key: str):
+        self._index[key] = len(self.columns)
+        self.columns.append(key)
+        self.stats.append(ColumnStats())
+    def add(self, record: Dict):
+        """Convert one record to a row tuple aligned to the known columns."""
+        if not record.keys() <= self._index.keys():
+            for key in record:
+                if key not in self._index:
+                    self._add_column(key)
+        
+        # Using None for missing fields - MySQL will insert NULL
+        self.rows.append(tuple(map(record.get, self.columns)))
+        if len(self.rows) - self._counted >= self.STATS_BLOCK_ROWS:
+            self.update_stats()
+    def update_stats(self):
+        """Account for the rows added since the last update in the column stats."""
+        rows = self.rows
+        if self._counted >= len(rows):
+            return
+        width = len(self.columns)
+        block = rows[self._counted:] if self._counted else rows
+        if min(map(len, block)) < width:
+            # Rows added before a column first appeared are shorter; pad them
+            # now so every column can be read with one itemgetter
+            for i in range(self._counted, len(rows)):
+                if len(rows[i]) < width:
+                    rows[i] = rows[i] + (None,) * (width - len(rows[i]))
+            block = rows[self._counted:]
+        for position, stats in enumerate(self.stats):
+            stats.add_values(map(itemgetter(position), block))
+        self._counted = len(rows)
+    def add_records(self, records: List[Dict]):
+        """
+        Add a list of records, releasing each dict as soon as it is converted.
+        
+        The caller's list is emptied in the process.
+        """
+        for i, record in enumerate(records):
+            self.add(record)
+            records[i] = None
+        records.clear()
+    def merge(self, other: 'RowBuffer'):
+        """Append the rows of another buffer (e.g. from a parallel worker)."""
+        self.update_stats()
+        other.update_stats()
+        for key in other.columns:
+            if key not in self._index:
+                self._add_column(key)
+        for key, stats in zip(other.columns, other.stats):
+            self.stats[self._index[key]].merge(stats)
+        
+        mapping = [self._index[key] for key in other.columns]
+        if mapping == list(range(len(mapping))):
+            # Same leading column order - rows can be taken as they are
+            self.rows.extend(other.rows)
+        else:
+            width = len(self.columns)
+            for row in other.rows:
+                remapped = [None] * width
+                for position, value in zip(mapping, row):
+                    remapped[position] = value
+                self.rows.append(tuple(remapped))
+        self._counted = len(self.rows)
+        other.rows = []
+    def finalize(self):
+        """Pad all rows to full width and sort the columns alphabetically."""
+        self.update_stats()
+        width = len(self.columns)
+        order = sorted(range(width), key=lambda i: self.columns[i])
+        reorder = order != list(range(width))
+        pick = itemgetter(*order) if width > 1 else None
+        
+        rows = self.rows
+        for i, row in enumerate(rows):
+            if len(row) < width:
+                row = row + (None,) * (width - len(row))
+            elif not reorder:
+                continue
+            if reorder:
+                row = pick(row)
+            rows[i] = row
+        
+        self.columns = [self.columns[i] for i in order]
+        self.stats = [self.stats[i] for i in order]
+        self._index = {key: i for i, key in enumerate(self.columns)}
+    def column_types(self) -> Dict[str, str]:
+        """MySQL type for every column, keyed by column name."""
+        return {key: stats.column_type() for key, stats in zip(self.columns, self.stats)}
+    def json_positions(self) -> List[int]:
+        """Positions of the JSON columns (see _encode_json_values)."""
+        return [i for i, stats in enumerate(self.stats) if stats.column_type() == 'JSON']
+    def float_text_positions(self) -> List[int]:
+        """Positions of text columns that also hold floats (see _encode_float_text)."""
+        return [i for i, stats in enumerate(self.stats) if stats.stores_float_as_text()]
+
+
+def _encode_float_text(rows: List[tuple], positions: List[int]):
+    """
+    Write the floats of VARCHAR/TEXT columns as Python's text for them, in place.
+    
+    Sent as numbers, the server would format them itself - differently for
+    the text engine (a DOUBLE literal, 1e20) and the prepared one (a bound
+    double) - and neither matches what RowChecksum hashes, so correct rows
+    would fail verification. As text they are stored exactly as hashed.
+    NaN and infinity have no text form in MySQL and become NULL, as they do
+    in DOUBLE columns.
+    """
+    if not positions:
+        return
+    isfinite = math.isfinite
+    for i, row in enumerate(rows):
+        if not any(type(row[position]) is float for position in positions):
+            continue
+        values = list(row)
+        for position in positions:
+            value = values[position]
+            if type(value) is float:
+                values[position] = repr(value) if isfinite(value) else None
+        rows[i] = tuple(values)
+
+
+def _encode_json_values(rows: List[tuple], positions: List[int]):
+    """
+    Serialize the values of JSON columns to JSON text, in place.
+    
+    The connector cannot send dicts or lists as parameters, and a plain string
+    stored in a JSON column must itself be valid JSON (a quoted string), so
+    every non-null value at the given positions is encoded.
+    """
+    if not positions:
+        return
+    dumps = json.dumps
+    for i, row in enumerate(rows):
+        values = list(row)
+        for position in positions:
+            if values[position] is not None:
+                values[position] = dumps(values[position], ensure_ascii=False)
+        rows[i] = tuple(values)
+
+
+class RecordFlattener:
+    """
+    Turns nested records into flat rows plus child table rows.
+    
+    Nested objects become prefixed columns ({"Address": {"City": ...}} gives
+    an Address__City column). Arrays of objects become rows of a child table
+    named <table>__<key>, each with a parent_id column holding the id of the
+    row it came from - like splitting a repeating group out into its own table
+    with a foreign key. Children of children work the same way, one level of
+    table name per level of nesting. Anything else (arrays of scalars, mixed
+    arrays) is left as a value for a JSON column.
+    
+    Child rows are numbered 1, 2, ... per child table in the order they are
+    found, and are loaded with those ids written explicitly.
+    
+    An empty object has no keys to become columns, so it is kept as the
+    value '{}' of its own column, like any other value left for JSON. Two
+    sources that would share a column name - a key Address__City next to
+    an Address object with a City key, or a key parent_id in a child record
+    - raise ValueError rather than silently mixing their values.
+    """
+    
+    SEPARATOR = '__'
+    
+    def __init__(self):
+        self.children: Dict[str, RowBuffer] = {}
+        # table -> column name -> key path it was made from (for collisions)
+        self.sources: Dict[str, Dict[str, Tuple[str, ...]]] = {}
+    def flatten(self, record: Dict, table_name: str, record_id: int) -> Dict:
+        """Flat copy of a record whose row will get id record_id in table_name."""
+        flat = {}
+        self._flatten_into(flat, record, (), table_name, record_id)
+        return flat
+    def _claim(self, table_name: str, name: str, path: Tuple[str, ...]):
+        """Record that column name holds the value at path; ValueError if another path has it."""
+        sources = self.sources.get(table_name)
+        if sources is None:
+            sources = self.sources[table_name] = {}
+        source = sources.setdefault(name, path)
+        if source != path:
+            first, second = ['.'.join(key_path) or 'the parent row id' for key_path in (source, path)]
+            raise ValueError(f"Flattening {table_name}: {first} and {second} would both be column "
+                             f"{name} - rename one of them or import without flatten")
+    def _flatten_into(self, flat: Dict, record: Dict, path: Tuple[str, ...], table_name: str,
+                      record_id: int):
+        for key, value in record.items():
+            key_path = path + (key,)
+            name = self.SEPARATOR.join(key_path)
+            if type(value) is dict and value:
+                self._flatten_into(flat, value, key_path, table_name, record_id)
+            elif type(value) is list and value and all(type(item) is dict for item in value):
+                child_table = f"{table_name}{self.SEPARATOR}{name}"
+                child = self.children.get(child_table)
+                if child is None:
+                    child = self.children[child_table] = RowBuffer()
+                    self._claim(child_table, 'parent_id', ())
+                for item in value:
+                    child_row = self.flatten(item, child_table, len(child) + 1)
+                    child_row['parent_id'] = record_id
+                    child.add(child_row)
+            else:
+                self._claim(table_name, name, key_path)
+                flat[name] = value
+    def finalize(self) -> Dict[str, RowBuffer]:
+        """Finalized child table buffers, keyed by child table name."""
+        for child in self.children.values():
+            child.finalize()
+        return self.children
+
+
+class TableProfile:
+    """
+    Schema and size profile of a file's records, for dry runs.
+    
+    Like RowBuffer it keeps a ColumnStats per column, but it does not keep
+    the rows - only the number of bytes each column's values take - so a
+    multi-gigabyte file can be profiled in constant memory.
+    
+    With a sample size, only the first sample_rows records feed the type
+    inference and byte counts; later records are still counted (and must
+    parse), and the byte counts are scaled up to the full row count.
+    """
+    
+    # Stored size of the fixed-width types; everything else is measured
+    FIXED_WIDTHS = {'INT': 4, 'BIGINT': 8, 'DOUBLE': 8, 'BOOLEAN': 1}
+    
+    # InnoDB per-row cost: record header (5), transaction id (6),
+    # roll pointer (7) and the BIGINT id primary key (8)
+    ROW_OVERHEAD_BYTES = 26
+    
+    # InnoDB leaves 1/16 of each page free when inserting in key order
+    PAGE_FILL_FACTOR = 15 / 16
+    
+    def __init__(self, sample_rows: int = 0):
+        self.sample_rows = sample_rows
+        self.rows = 0
+        self.profiled_rows = 0
+        self.stats: Dict[str, ColumnStats] = {}
+        self.value_bytes: Dict[str, int] = {}
+        self.value_count: Dict[str, int] = {}
+    def add(self, record: Any):
+        """Count one record and, while sampling, profile its values."""
+        if not isinstance(record, dict):
+            raise ValueError(f"record {self.rows + 1} is a {type(record).__name__}, not an object")
+        self.rows += 1
+        if self.sample_rows and self.profiled_rows >= self.sample_rows:
+            return
+        self.profiled_rows += 1
+        for key, value in record.items():
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = ColumnStats()
+                self.value_bytes[key] = 0
+                self.value_count[key] = 0
+            if value is None:
+                continue
+            stats.add(value)
+            if type(value) is str:
+                size = len(value) if value.isascii() else len(value.encode('utf-8'))
+            elif type(value) is dict or type(value) is list:
+                size = len(json.dumps(value))
+            else:
+                size = len(str(value))
+            self.value_bytes[key] += size
+            self.value_count[key] += 1
+    def merge(self, other: 'TableProfile'):
+        """Combine the profile of another part of the file (e.g. from a worker process)."""
+        self.rows += other.rows
+        self.profiled_rows += other.profiled_rows
+        for key, stats in other.stats.items():
+            if key in self.stats:
+                self.stats[key].merge(stats)
+                self.value_bytes[key] += other.value_bytes[key]
+                self.value_count[key] += other.value_count[key]
+            else:
+                self.stats[key] = stats
+                self.value_bytes[key] = other.value_bytes[key]
+                self.value_count[key] = other.value_count[key]
+    @property
+    def columns(self) -> List[str]:
+        """Columns in table order (alphabetical, as RowBuffer.finalize sorts them)."""
+        return sorted(self.stats)
+    def column_types(self) -> Dict[str, str]:
+        """MySQL type for every column, keyed by column name."""
+        return {key: stats.column_type() for key, stats in self.stats.items()}
+    def estimated_bytes(self) -> int:
+        """Approximate on-disk size of the loaded table (clustered index only)."""
+        if not self.profiled_rows:
+            return 0
+        column_types = self.column_types()
+        null_bitmap = (len(self.stats) + 7) // 8
+        sampled = self.profiled_rows * (self.ROW_OVERHEAD_BYTES + null_bitmap)
+        for key, column_type in column_types.items():
+            count = self.value_count[key]
+            if column_type in self.FIXED_WIDTHS:
+                sampled += self.FIXED_WIDTHS[column_type] * count
+            else:
+                # Variable-length values carry a 1 or 2 byte length prefix
+                prefix = 1 if column_type == 'VARCHAR(255)' else 2
+                sampled += self.value_bytes[key] + prefix * count
+        scaled = sampled * self.rows / self.profiled_rows
+        return int(scaled / self.PAGE_FILL_FACTOR)
+
+
+class JsonPathProfile:
+    """
+    Values found at paths inside JSON columns, for indexing them.
+    
+    A path is a JSON column name followed by keys, dot separated
+    ("Address.City" is the City key of the Address column). For the
+    configured paths every record's value is accounted for in a ColumnStats,
+    which gives the type of the generated column that exposes the path.
+    
+    The first sample_rows records are also walked in full: for every scalar
+    path found, how many records have a value there and how many distinct
+    values there are (counted up to distinct_limit). Paths that are both
+    common and selective are suggested as index candidates - like the
+    missing-index suggestions SQL Server derives from its statistics.
+    """
+    
+    def __init__(self, paths: List[str], sample_rows: int, distinct_limit: int):
+        self.paths = {path: path.split('.') for path in paths}
+        self.stats = {path: ColumnStats() for path in paths}
+        self.sample_rows = sample_rows
+        self.distinct_limit = distinct_limit
+        self.rows = 0
+        self.sampled = 0
+        self.present: Dict[str, int] = {}
+        self.distinct: Dict[str, set] = {}
+    def add(self, record: Dict):
+        """Account for the JSON values of one record (other columns are ignored)."""
+        self.rows += 1
+        for path, keys in self.paths.items():
+            value = record
+            for key in keys:
+                value = value.get(key) if type(value) is dict else None
+            if value is not None:
+                self.stats[path].add(value)
+        if self.sampled < self.sample_rows:
+            self.sampled += 1
+            for column, value in record.items():
+                if type(value) is dict:
+                    self._walk(column, value)
+    def _walk(self, prefix: str, value: Dict):
+        for key, item in value.items():
+            path = f"{prefix}.{key}"
+            if type(item) is dict:
+                self._walk(path, item)
+            elif item is not None and type(item) is not list:
+                if path not in self.present:
+                    self.present[path] = 0
+                    self.distinct[path] = set()
+                self.present[path] += 1
+                if len(self.distinct[path]) < self.distinct_limit:
+                    self.distinct[path].add(item)
+    def column_type(self, path: str) -> str:
+        """
+        Type of the generated column for a configured path.
+        
+        As ColumnStats.column_type, except that booleans mixed with numbers
+        or strings give a string column: JSON_UNQUOTE yields 'true' and
+        'false' for them, which a numeric column refuses in strict mode.
+        """
+        stats = self.stats[path]
+        if stats.has_bool and not stats.has_nested and (stats.has_int or stats.has_float
+                                                         or stats.has_string):
+            return "TEXT" if stats.max_length > 255 else "VARCHAR(255)"
+        return stats.column_type()
+    def suggestions(self, min_presence: float, min_selectivity: float) -> List[Tuple[str, float]]:
+        """
+        Unconfigured paths worth indexing, most selective first.
+        
+        Returns:
+            List of (path, selectivity) where selectivity is distinct values
+            per record that has the path (1.0 = every value unique)
+        """
+        candidates = []
+        for path, present in self.present.items():
+            if path in self.paths or present < self.sampled * min_presence:
+                continue
+            selectivity = len(self.distinct[path]) / present
+            if selectivity >= min_selectivity:
+                candidates.append((path, selectivity))
+        return sorted(candidates, key=lambda candidate: (-candidate[1], candidate[0]))
+
+
+class InterningHook:
+    """
+    object_pairs_hook for the JSON decoder that shares repeated string values.
+    
+    Low-cardinality columns of the Alliance exports repeat the same few
+    values ("case", "person") in every record, and the decoder allocates a
+    new string for each occurrence. This hook makes every occurrence point
+    at one shared string: short values are shared per key until that key has
+    produced max_distinct different values; past that the key is treated as
+    high cardinality (IDs, names) and its values are left alone. Keys need no
+    help - the C scanner already reuses one string per key within a decode.
+    
+    It is opt-in (intern_values=True) because it is a trade: on the case
+    sample x10 (269k records) parsing took 2.3 times as long (0.71s against
+    0.30s) for 13% less memory (97.5 MB against 111.8 MB). Worth it only when
+    a file barely fits in memory (see _json_decoder).
+    """
+    
+    # Longer strings are almost never repeated, so they are not tracked
+    MAX_VALUE_LENGTH = 64
+    
+    def __init__(self, max_distinct: int = 1024):
+        self.max_distinct = max_distinct
+        self._values: Dict[str, Dict[str, str]] = {}  # key -> {value: shared value}
+        self._high_cardinality = set()
+    def __call__(self, pairs: List[Tuple[str, Any]]) -> Dict[str, Any]:
+        record = {}
+        for key, value in pairs:
+            if (type(value) is str and len(value) <= self.MAX_VALUE_LENGTH
+                    and key not in self._high_cardinality):
+                seen = self._values.get(key)
+                if seen is None:
+                    seen = self._values[key] = {}
+                shared = seen.get(value)
+                if shared is not None:
+                    value = shared
+                elif len(seen) < self.max_distinct:
+                    seen[value] = value
+                else:
+                    # Too many distinct values to be worth sharing
+                    self._high_cardinality.add(key)
+                    del self._values[key]
+            record[key] = value
+        return record
+
+
+class RowChecksum:
+    """
+    Order-independent row count and content checksum of loaded rows.
+    
+    Each row is rendered the way MySQL renders it in CONCAT_WS (values joined
+    by CHAR(31), NULL written as CHAR(0)) and hashed with CRC32; the checksum
+    is the plain sum of the row hashes. A sum does not depend on row order,
+    so rows inserted by several connections in any order still match, and
+    the server can compute the same figure with one aggregate query
+    (see server_query).
+    
+    DOUBLE and JSON columns are left out of the hash because MySQL formats
+    them differently from Python (e.g. 1e20 vs 1e+20, JSON key order); they
+    are still covered by the row count. Floats in text columns are loaded as
+    the text hashed here (see _encode_float_text).
+    """
+    
+    SEPARATOR = '\x1f'
+    NULL_MARKER = '\x00'
+    EXCLUDED_TYPES = ('DOUBLE', 'JSON')
+    
+    def __init__(self, positions: List[int]):
+        self.positions = positions
+        self.count = 0
+        self.total = 0
+    @classmethod
+    def for_columns(cls, columns: List[str], column_types: Dict[str, str]) -> 'RowChecksum':
+        """Checksum over every column whose text form is stable in MySQL."""
+        return cls([i for i, column in enumerate(columns)
+                    if column_types[column] not in cls.EXCLUDED_TYPES])
+    def copy_empty(self) -> 'RowChecksum':
+        """New, empty checksum over the same columns (one per worker)."""
+        return RowChecksum(self.positions)
+    @classmethod
+    def _render(cls, value: Any) -> str:
+        if value is None:
+            return cls.NULL_MARKER
+        value_type = type(value)
+        if value_type is str:
+            return value
+        if value_type is bool:
+            return '1' if value else '0'  # Stored as TINYINT
+        if value_type is float:
+            return repr(value)  # As _encode_float_text stores it in text columns
+        return str(value)
+    def update(self, rows: List[tuple]):
+        """Add a batch of rows (tuples aligned to the table columns)."""
+        self.count += len(rows)
+        if not self.positions:
+            return
+        render = self._render
+        separator = self.SEPARATOR
+        positions = self.positions
+        total = 0
+        for row in rows:
+            text = separator.join([render(row[i]) for i in positions])
+            total += zlib.crc32(text.encode('utf-8'))
+        self.total += total
+    def merge(self, other: 'RowChecksum'):
+        """Combine another worker's checksum into this one."""
+        self.count += other.count
+        self.total += other.total
+    def server_query(self, table_name: str, columns: List[str]) -> str:
+        """Aggregate query that computes the same count and checksum in MySQL."""
+        if not self.positions:
+            return f"SELECT COUNT(*), 0 FROM `{table_name}`"
+        values = ', '.join(f"IFNULL(`{columns[i]}`, CHAR(0))" for i in self.positions)
+        return (f"SELECT COUNT(*), COALESCE(SUM(CRC32(CONCAT_WS(CHAR(31), {values}))), 0) "
+                f"FROM `{table_name}`")
+
+
+class AdaptiveBatchSizer:
+    """
+    Picks the number of rows per INSERT batch from measured batch timings.
+    
+    Starts at the given size and hill-climbs on throughput: after every batch
+    the size keeps moving the same way (x GROWTH or / GROWTH) while rows/sec
+    improves, turns around when it drops, and holds when it is flat. A batch
+    that takes far longer than the recent per-row latency predicts (lock wait,
+    server stall) halves the size at once and restarts the climb.
+    
+    The size never leaves [min_rows, max_rows]; callers derive max_rows from
+    max_allowed_packet so that a batch always fits in one statement.
+    """
+    
+    GROWTH = 1.5
+    
+    # Throughput change that counts as better / worse than the previous batch
+    IMPROVEMENT = 1.05
+    DECLINE = 0.90
+    
+    # Batch latency, relative to what the per-row average predicts, that counts as a spike
+    LATENCY_SPIKE = 3.0
+    
+    def __init__(self, initial: int, min_rows: int, max_rows: int, step: int = 1):
+        self.step = max(1, step)
+        self.min_rows = self._round(max(min_rows, self.step))
+        self.max_rows = max(self.min_rows, self._round(max_rows))
+        self.size = self._clamp(initial)
+        self.direction = 1
+        self.last_rate: Optional[float] = None
+        self.seconds_per_row: Optional[float] = None
+    @staticmethod
+    def estimate_row_bytes(rows: List[tuple], sample: int = 200) -> int:
+        """Rough size of one row in an INSERT statement, from a spread-out sample."""
+        if not rows:
+            return 1
+        stride = max(1, len(rows) // sample)
+        sampled = rows[::stride][:sample]
+        total = sum(sum(len(str(value)) + 3 for value in row) + 4 for row in sampled)
+        return max(1, total // len(sampled))
+    def _round(self, rows: float) -> int:
+        return max(self.step, int(rows) // self.step * self.step)
+    def _clamp(self, rows: float) -> int:
+        return min(self.max_rows, max(self.min_rows, self._round(rows)))
+    def record(self, rows: int, seconds: float):
+        """Account for one executed batch and choose the next size."""
+        if rows <= 0:
+            return
+        rate = rows / seconds if seconds > 0 else float('inf')
+        expected = self.seconds_per_row * rows if self.seconds_per_row else None
+        
+        if expected and seconds > expected * self.LATENCY_SPIKE:
+            self.size = self._clamp(self.size / 2)
+            self.direction = 1
+            self.last_rate = None  # Re-measure from the smaller size
+        else:
+            if self.last_rate is not None:
+                if rate < self.last_rate * self.DECLINE:
+                    self.direction = -self.direction
+                elif rate < self.last_rate * self.IMPROVEMENT:
+                    self.direction = 0  # Flat - stay at this size
+                elif self.direction == 0:
+                    self.direction = 1
+            elif self.direction == 0:
+                self.direction = 1
+            if self.direction > 0:
+                self.size = self._clamp(self.size * self.GROWTH)
+            elif self.direction < 0:
+                self.size = self._clamp(self.size / self.GROWTH)
+            self.last_rate = rate
+        
+        row_seconds = seconds / rows
+        self.seconds_per_row = (row_seconds if self.seconds_per_row is None
+                                else 0.8 * self.seconds_per_row + 0.2 * row_seconds)
+
+
+def _iter_ndjson_range(json_file_path: str, start: int, end: int, decoder: json.JSONDecoder):
+    """
+    Yield the JSON Lines records that begin inside the byte range [start, end).
+    
+    The caller guarantees that start is at the beginning of a line. Decoding
+    errors report the byte offset of the offending record.
+    """
+    with open(json_file_path, 'rb') as f:
+        f.seek(start)
+        position = start
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            line_start = position
+            position += len(line)
+            # Tolerate a UTF-8 byte order mark on the very first line
+            if line_start == 0 and line.startswith(b'\xef\xbb\xbf'):
+                line = line[3:]
+            line = line.strip()
+            if not line:
+                continue  # Blank lines are allowed between records
+            try:
+                record = decoder.decode(line.decode('utf-8'))
+            except json.JSONDecodeError as e:
+                raise json.JSONDecodeError(
+                    f"{e.msg} (record starting at byte {line_start})", e.doc, e.pos
+                )
+            yield record
+
+
+def _iter_json_document(json_file_path: str, decoder: json.JSONDecoder,
+                        chunk_chars: int = 1024 * 1024, max_record_chars: int = 256 * 1024 * 1024):
+    """
+    Yield the records of a JSON document (an array of objects, or one object)
+    without loading the whole document.
+    
+    The file is read in chunks into a text buffer and records are decoded one
+    at a time with JSONDecoder.raw_decode; consumed text is dropped from the
+    buffer, so it only ever holds the current record and one chunk. When a
+    record runs past the end of the buffer the buffer is (at least) doubled and
+    the record decoded again, up to max_record_chars. A syntax error anywhere
+    else fails at once, with its position in the whole document.
+    """
+    whitespace = ' \t\r\n'
+    # A decode error this close to the end of the buffer may just be a
+    # literal or number cut off by the chunk boundary ('fals', '1e', '-')
+    cut_off_chars = 10
+    with open(json_file_path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        position = 0   # Next character to look at in buffer
+        offset = 0     # Characters already dropped from the front of buffer
+        dropped_lines = 0     # Newlines in the dropped characters
+        line_start = 0        # Document offset of the line the buffer starts in
+        eof = False
+        
+        def read_more() -> bool:
+            nonlocal buffer, position, offset, dropped_lines, line_start, eof
+            if eof:
+                return False
+            chunk = f.read(max(chunk_chars, len(buffer) - position))
+            if not chunk:
+                eof = True
+                return False
+            newlines = buffer.count('\n', 0, position)
+            if newlines:
+                dropped_lines += newlines
+                line_start = offset + buffer.rfind('\n', 0, position) + 1
+            offset += position
+            buffer = buffer[position:] + chunk
+            position = 0
+            return True
+        
+        def document_error(msg: str, index: int) -> json.JSONDecodeError:
+            # Position, line and column in the whole document, as json.load reports them
+            newline = buffer.rfind('\n', 0, index)
+            lineno = dropped_lines + buffer.count('\n', 0, index) + 1
+            colno = index - newline if newline >= 0 else offset + index - line_start + 1
+            error = json.JSONDecodeError(msg, '', 0)
+            error.pos, error.lineno, error.colno = offset + index, lineno, colno
+            error.args = (f"{msg}: line {lineno} column {colno} (char {offset + index})",)
+            return error
+        
+        def next_char() -> str:
+            nonlocal position
+            while True:
+                while position < len(buffer) and buffer[position] in whitespace:
+                    position += 1
+                if position < len(buffer):
+                    return buffer[position]
+                if not read_more():
+                    return ''
+        
+        def decode_value() -> Any:
+            nonlocal position
+            next_char()
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError as e:
+                    # Only an error at the end of the buffer can be a record
+                    # cut off by it (an unterminated string runs to the end);
+                    # anything else is a real syntax error
+                    truncated = (e.pos >= len(buffer) - cut_off_chars
+                                 or e.msg.startswith('Unterminated string'))
+                    if truncated and len(buffer) - position < max_record_chars and read_more():
+                        continue
+                    raise document_error(e.msg, e.pos) from None
+                if end == len(buffer) and read_more():
+                    continue  # A number at the very end may be cut off ('12' of '123')
+                position = end
+                return value
+        
+        first = next_char()
+        if first == '{':
+            record = decode_value()
+            if record:
+                yield record
+        elif first == '[':
+            position += 1
+            if next_char() == ']':
+                position += 1
+            else:
+                while True:
+                    yield decode_value()
+                    separator = next_char()
+                    position += 1
+                    if separator == ']':
+                        break
+                    if separator != ',':
+                        raise document_error("Expecting ',' delimiter", position - 1)
+        else:
+            # Empty file or a bare value - report it the way json.load would
+            decode_value()
+            raise ValueError("JSON document must be an array of objects or an object")
+        
+        if next_char():
+            raise document_error("Extra data", position)
+
+
+def _collation_key(value: Any) -> str:
+    """
+    Text of a value as MySQL's default case- and accent-insensitive collations compare it.
+    
+    Casefolded and with accents removed ('É' and 'e' are equal, as in
+    utf8mb4_0900_ai_ci and utf8mb4_general_ci). Trailing spaces are dropped,
+    as PAD SPACE collations (general_ci, MySQL 5.7's default) ignore them;
+    the NO PAD 0900 collations do not, so there two keys differing only in
+    trailing spaces are treated as equal when they are not - the safe way
+    round for a duplicate check.
+    """
+    text = str(value)
+    if not text.isascii():
+        text = ''.join(char for char in unicodedata.normalize('NFKD', text)
+                       if not unicodedata.combining(char))
+    return text.rstrip(' ').casefold()
+
+
+def _natural_sort_key(positions: List[int], column_types: List[str]):
+    """
+    Sort key for rows by a natural key, approximating MySQL's index order.
+    
+    Text columns compare as the default collations do (see _collation_key),
+    and their values compare as text even when some are numbers, since that
+    is how the VARCHAR column stores them. Keys equal under this key are
+    what the primary key would refuse as duplicates.
+    """
+    def part(position: int, column_type: str):
+        if column_type == 'VARCHAR(255)':
+            return lambda row: _collation_key(row[position])
+        return itemgetter(position)
+    
+    parts = [part(position, column_type) for position, column_type in zip(positions, column_types)]
+    if len(parts) == 1:
+        return parts[0]
+    return lambda row: tuple([key(row) for key in parts])
+
+
+def _write_sorted_run(rows: List[tuple], key, batch_rows: int = 10000):
+    """Sort rows and spill them to an anonymous temp file, batch_rows per pickle."""
+    rows.sort(key=key)
+    spill = tempfile.TemporaryFile()
+    for start in range(0, len(rows), batch_rows):
+        pickle.dump(rows[start:start + batch_rows], spill, protocol=pickle.HIGHEST_PROTOCOL)
+    rows.clear()
+    spill.seek(0)
+    return spill
+
+
+def _read_sorted_run(spill):
+    """Yield the rows of a run written by _write_sorted_run."""
+    while True:
+        try:
+            batch = pickle.load(spill)
+        except EOFError:
+            return
+        yield from batch
+
+
+def _external_sort(rows, key, run_rows: int):
+    """
+    Yield rows sorted by key, holding at most run_rows rows in memory.
+    
+    A classic external merge sort (what SQL Server does when a sort spills to
+    tempdb): rows are sorted in runs of run_rows, each run is written to a
+    temp file, and the runs are merged back with heapq.merge. If all rows
+    fit in one run nothing is written to disk. Temp files are deleted as soon
+    as the merge is finished or abandoned.
+    """
+    runs = []
+    try:
+        run = []
+        for row in rows:
+            run.append(row)
+            if len(run) >= run_rows:
+                runs.append(_write_sorted_run(run, key))
+        if not runs:
+            run.sort(key=key)
+            yield from run
+            return
+        if run:
+            runs.append(_write_sorted_run(run, key))
+        yield from heapq.merge(*[_read_sorted_run(spill) for spill in runs], key=key)
+    finally:
+        for spill in runs:
+            spill.close()
+
+
+def _unique_sorted(rows, key):
+    """Pass sorted rows through, raising ValueError at the first repeated key."""
+    previous = object()
+    for row in rows:
+        current = key(row)
+        if current == previous:
+            raise ValueError(f"Duplicate natural key value {current!r} - "
+                             f"the natural key cannot be the primary key for this file")
+        previous = current
+        yield row
+
+
+def _iter_json_records(json_file_path: str, decoder: json.JSONDecoder):
+    """Yield the records of a JSON or JSON Lines file one at a time."""
+    if Path(json_file_path).suffix.lower() in JSONtoMySQL.NDJSON_EXTENSIONS:
+        return _iter_ndjson_range(json_file_path, 0, os.path.getsize(json_file_path), decoder)
+    return _iter_json_document(json_file_path, decoder)
+
+
+def _json_decoder(intern_values: bool = False) -> json.JSONDecoder:
+    """The plain decoder, or one that shares repeated values (see InterningHook)."""
+    if intern_values:
+        return json.JSONDecoder(object_pairs_hook=InterningHook())
+    return json.JSONDecoder()
+
+
+def _parse_ndjson_range(json_file_path: str, start: int, end: int,
+                        intern_values: bool = False) -> RowBuffer:
+    """
+    Parse the JSON Lines records that begin inside the byte range [start, end).
+
+    This is a module-level function (not a method) so it can be pickled and
+    shipped to worker processes by ProcessPoolExecutor. The caller guarantees
+    that start is at the beginning of a line. Rows come back as a RowBuffer,
+    which is also much cheaper to send between processes than dicts.
+    """
+    # One decoder for the whole range so repeated values are shared across lines
+    decoder = _json_decoder(intern_values)
+    records = RowBuffer()
+    for record in _iter_ndjson_range(json_file_path, start, end, decoder):
+        records.add(record)
+    # Column stats are worked out here, in the worker, not by the merging parent
+    records.update_stats()
+    return records
+
+
+def _profile_ndjson_range(json_file_path: str, start: int, end: int,
+                          key_columns: Tuple[str, ...] = ()) -> Tuple[TableProfile, List[tuple]]:
+    """
+    Profile the JSON Lines records that begin inside the byte range [start, end).
+
+    Pass one of a streamed file (see JSONtoMySQL._profile_stream), run in a
+    worker process like _parse_ndjson_range. Only the column statistics and
+    the key_columns values of every record (for the duplicate check) come
+    back, never the rows themselves.
+    """
+    decoder = json.JSONDecoder()
+    profile = TableProfile()
+    keys = []
+    for record in _iter_ndjson_range(json_file_path, start, end, decoder):
+        profile.add(record)
+        if key_columns:
+            keys.append(tuple(map(record.get, key_columns)))
+    return profile, keys
+
+
+def _ndjson_range_rows(json_file_path: str, start: int, end: int, columns: List[str],
+                       intern_values: bool = False) -> List[tuple]:
+    """
+    Rows of the JSON Lines records that begin inside the byte range [start, end).
+
+    Pass two of a streamed file (see JSONtoMySQL._stream_rows), run in a
+    worker process: every record becomes a tuple aligned to columns.
+    """
+    decoder = _json_decoder(intern_values)
+    return [tuple(map(record.get, columns))
+            for record in _iter_ndjson_range(json_file_path, start, end, decoder)]
+
+
+class FilePrefetcher:
+    """
+    Copies upcoming files to a local temp directory in the background.
+    
+    While file N is being inserted, a worker thread reads file N+1, N+2, ...
+    from the (usually network) share into local storage, so network read
+    time overlaps with database time instead of adding to it.
+    
+    budget_bytes is per file worker: with workers importing files at once,
+    up to workers * budget_bytes of copies are held locally, so each worker
+    can have its file copied while the others are still importing theirs.
+    A file larger than the whole budget is copied only when no other copy
+    is held, so it is still read locally but never alongside other copies.
+    Files that fail to copy are simply read from their original location.
+    
+    Usage: call fetch() for each file in list order, then release() once the
+    file has been imported so its space can be reused.
+    """
+    
+    def __init__(self, files: List[Path], budget_bytes: int, workers: int = 1):
+        self.files = [str(path) for path in files]
+        self.budget_bytes = budget_bytes * max(1, workers)
+        
+        self._temp_dir = tempfile.mkdtemp(prefix="json_prefetch_")
+        self._local_paths: Dict[str, str] = {}   # source path -> local copy
+        self._direct: set = set()                # files read from the source
+        self._sizes: Dict[str, int] = {}
+        self._bytes_held = 0
+        self._stopped = False
+        self._condition = threading.Condition()
+        
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    def _run(self):
+        """Copy files one after another, staying within the byte budget."""
+        for index, source in enumerate(self.files):
+            try:
+                size = os.path.getsize(source)
+            except OSError:
+                size = None
+            
+            if size is None:
+                with self._condition:
+                    self._direct.add(source)
+                    self._condition.notify_all()
+                continue
+            
+            # Wait until enough already-imported copies have been released
+            # (an over-budget file waits until none are held)
+            with self._condition:
+                while (not self._stopped and self._bytes_held
+                       and self._bytes_held + size > self.budget_bytes):
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                self._bytes_held += size
+            
+            # Prefix with the index so identically named files cannot collide
+            local_path = os.path.join(self._temp_dir, f"{index}_{Path(source).name}")
+            try:
+                shutil.copyfile(source, local_path)
+            except OSError:
+                with self._condition:
+                    self._bytes_held -= size
+                    self._direct.add(source)
+                    self._condition.notify_all()
+                continue
+            
+            with self._condition:
+                self._local_paths[source] = local_path
+                self._sizes[source] = size
+                self._condition.notify_all()
+    def fetch(self, source) -> str:
+        """
+        Return a path to read the file from, waiting for its copy if needed.
+        
+        Returns the local copy when one was made, otherwise the original path.
+        """
+        source = str(source)
+        if source not in self.files:
+            return source
+        with self._condition:
+            while source not in self._local_paths and source not in self._direct:
+                if self._stopped or not self._thread.is_alive():
+                    return source
+                self._condition.wait(timeout=1)
+            return self._local_paths.get(source, source)
+    def release(self, source):
+        """Delete the local copy of a file that has been imported."""
+        source = str(source)
+        with self._condition:
+            local_path = self._local_paths.pop(source, None)
+            if local_path is None:
+                return
+            self._bytes_held -= self._sizes.pop(source, 0)
+            self._condition.notify_all()
+        try:
+            os.remove(local_path)
+        except OSError:
+            pass
+    def close(self):
+        """Stop prefetching and remove the temp directory."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._thread.join()
+        shutil.rmtree(self._temp_dir, ignore_errors=True)
+    def __enter__(self):
+        """Context manager support - enables 'with' statement usage."""
+        return self
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager support - ensures temp copies are cleaned up."""
+        self.close()
+
+class ConnectionPool:
+    """
+    Session-scoped pool of open MySQL connections for one set of credentials.
+    
+    Opening a connection to a remote server costs a TCP, TLS and auth
+    handshake. The GUI creates one pool when Test Connection succeeds and
+    keeps it for the session, so the verified connection (and any extra
+    connections opened for parallel loading) are reused by every import
+    instead of being reopened each run.
+    
+    Idle connections are health-checked with a ping before being handed out;
+    a connection that cannot be revived is discarded and replaced.
+    """
+    
+    def __init__(self, host: str, user: str, password: str, database: str, port: int = 3306):
+        self.connect_args = {
+            'host': host,
+            'user': user,
+            'password': password,
+            'database': database,
+            'port': port
+        }
+        self._idle = []
+        self._lock = threading.Lock()
+    def _connect(self):
+        """Open a brand new connection."""
+        return mysql.connector.connect(
+            **self.connect_args,
+            connect_timeout=10,
+            autocommit=False  #manage transactions explicitly
+        )
+    def acquire(self):
+        """
+        Get a live connection, reusing an idle one when possible.
+        """
+        while True:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                return self._connect()
+            try:
+                # Health check - reconnects transparently if the server dropped us
+                connection.ping(reconnect=True, attempts=1, delay=0)
+                return connection
+            except mysql.connector.Error:
+                try:
+                    connection.close()
+                except mysql.connector.Error:
+                    pass
+    def release(self, connection):
+        """Return a connection to the pool for reuse."""
+        try:
+            # Never hand out a connection with an open transaction
+            connection.rollback()
+        except mysql.connector.Error:
+            connection.close()
+            return
+        with self._lock:
+            self._idle.append(connection)
+    def close_all(self):
+        """Close every idle connection (call when the session ends)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            try:
+                connection.close()
+            except mysql.connector.Error:
+                pass
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over string tuples.
+    
+    Answers "definitely not seen" or "possibly seen" using about 10 bits per
+    key at a 1% false-positive rate, instead of the ~100 bytes per key of a
+    Python set. Positions come from one BLAKE2b digest split into two 64-bit
+    hashes (double hashing).
+    """
+    
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+    def _positions(self, key: Tuple[str, ...]):
+        digest = hashlib.blake2b('\x1f'.join(key).encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hash_count)]
+    def add(self, key: Tuple[str, ...]) -> bool:
+        """Add a key; returns True if it was possibly present already."""
+        bits = self.bits
+        present = True
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                present = False
+                bits[position >> 3] |= mask
+        return present
+
+
+class DuplicateKeyTracker:
+    """
+    Finds records that repeat a key, within a file and across the files of a run.
+    
+    Keys are (entity, key column values...). The entity is the record's
+    EntityType when the file has that column, otherwise the table name, so
+    "one row per SourceIDValue per entity" is checked across every file that
+    carries the same entity.
+    
+    Keys are kept in an exact set while the run has at most exact_key_limit
+    of them. Past that the set is folded into a BloomFilter: each file is
+    checked against the filter, and only the keys it flags are verified -
+    within the file by a second pass over the candidate keys, and against
+    earlier files by looking the candidates up in the tables they were
+    loaded into (lookup_loaded_keys). Either way no GROUP BY over the
+    loaded tables is needed.
+    
+    Key values are normalized by _collation_key, so keys compare ignoring
+    case, accents and trailing spaces, as the tables' collations compare
+    them: the exact set, the Bloom filter and the lookup in loaded tables
+    then all agree on what a duplicate is.
+    
+    Loading a file replaces what was in its table before (for the unified
+    table: its entity's partition), so keys loaded into that same table
+    earlier are not duplicates of it, and are forgotten once it commits.
+    That keeps one tracker correct for a whole watch_directory session, in
+    which a changed file is loaded again.
+    """
+    
+    def __init__(self, key_columns: Tuple[str, ...], exact_key_limit: int):
+        self.key_columns = tuple(key_columns)
+        self.exact_key_limit = exact_key_limit
+        self.seen: Dict[Tuple, str] = {}  # key -> table it was loaded into
+        self.bloom: Optional[BloomFilter] = None
+        # entity -> tables already loaded with rows of that entity (for verification)
+        self.loaded_tables: Dict[str, List[str]] = {}
+    @property
+    def mode(self) -> str:
+        return 'bloom' if self.bloom else 'exact'
+    def _keys(self, table_name: str, columns: List[str], rows: List[tuple]) -> Optional[List]:
+        """Key of every row (None where a key value is missing), or None if untracked."""
+        if not all(column in columns for column in self.key_columns):
+            return None
+        positions = [columns.index(column) for column in self.key_columns]
+        entity_position = columns.index('EntityType') if 'EntityType' in columns else None
+        keys = []
+        for row in rows:
+            values = [row[i] for i in positions]
+            if any(value is None for value in values):
+                keys.append(None)
+                continue
+            entity = table_name if entity_position is None or row[entity_position] is None \
+                else str(row[entity_position])
+            keys.append((_collation_key(entity),) + tuple(map(_collation_key, values)))
+        return keys
+    def _switch_to_bloom(self, incoming: int):
+        """Fold the exact set into a Bloom filter sized for the run so far."""
+        self.bloom = BloomFilter(max(4 * self.exact_key_limit, 2 * (len(self.seen) + incoming)))
+        for key in self.seen:
+            self.bloom.add(key)
+        self.seen = {}
+    def find_duplicates(self, table_name: str, columns: List[str], rows: List[tuple],
+                        lookup_loaded_keys=None) -> Tuple[Optional[List], List[int], int]:
+        """
+        Check a file's rows before they are loaded.
+        
+        Args:
+            lookup_loaded_keys: Function (entity, tables, candidate keys) ->
+                set of those keys present in the tables; used to verify
+                Bloom filter hits against earlier files
+        
+        Returns:
+            Tuple of (keys, duplicate row indexes, how many of those were
+            already loaded from earlier files). Pass keys to add() once the
+            file has been committed. keys is None when the file lacks a key
+            column and is not tracked.
+        """
+        keys = self._keys(table_name, columns, rows)
+        if keys is None:
+            return None, [], 0
+        
+        if not self.bloom and len(self.seen) + len(keys) > self.exact_key_limit:
+            self._switch_to_bloom(len(keys))
+        
+        duplicates = []
+        earlier = 0
+        if not self.bloom:
+            file_keys = set()
+            for i, key in enumerate(keys):
+                if key is None:
+                    continue
+                loaded_in = self.seen.get(key)
+                if loaded_in is not None and loaded_in != table_name:
+                    duplicates.append(i)
+                    earlier += 1
+                elif key in file_keys:
+                    duplicates.append(i)
+                else:
+                    file_keys.add(key)
+            return keys, duplicates, earlier
+        
+        # Bloom mode, pass 1: keys the filter has (possibly) seen, in this file or before
+        candidates = set()
+        for key in keys:
+            if key is not None and self.bloom.add(key):
+                candidates.add(key)
+        if not candidates:
+            return keys, [], 0
+        
+        # Verify against earlier files: only the candidates are looked up
+        loaded = set()
+        if lookup_loaded_keys:
+            by_entity: Dict[str, List] = {}
+            for key in candidates:
+                by_entity.setdefault(key[0], []).append(key)
+            for entity, entity_keys in by_entity.items():
+                tables = [table for table in self.loaded_tables.get(entity, []) if table != table_name]
+                if tables:
+                    loaded |= lookup_loaded_keys(entity, tables, entity_keys)
+        
+        # Pass 2: within the file, every occurrence after the first is a duplicate
+        first_seen = set()
+        for i, key in enumerate(keys):
+            if key not in candidates:
+                continue
+            if key in loaded:
+                duplicates.append(i)
+                earlier += 1
+            elif key in first_seen:
+                duplicates.append(i)
+            else:
+                first_seen.add(key)
+        return keys, duplicates, earlier
+    def add(self, table_name: str, keys: Optional[List], skip: List[int] = ()):
+        """Record the keys of a committed file (except rows that were not loaded)."""
+        if keys is None:
+            return
+        skip = set(skip)
+        entities = {key[0] for i, key in enumerate(keys) if key is not None and i not in skip}
+        replaced = {entity for entity in entities if table_name in self.loaded_tables.get(entity, ())}
+        if replaced and not self.bloom:
+            # The table was loaded before: its earlier rows are gone
+            self.seen = {key: table for key, table in self.seen.items()
+                         if table != table_name or key[0] not in replaced}
+        if not self.bloom:
+            for i, key in enumerate(keys):
+                if key is not None and i not in skip:
+                    self.seen[key] = table_name
+        # Bloom mode: the keys were added by find_duplicates already
+        for entity in entities:
+            tables = self.loaded_tables.setdefault(entity, [])
+            if table_name not in tables:
+                tables.append(table_name)
+
+
+class SharedFileParse:
+    """
+    One parse of a file, shared by the importers of a fan-out.
+    
+    The first importer to ask runs prepare (JSONtoMySQL._prepare_file) while
+    the others wait for it; all of them get the same result. If parsing
+    failed, every importer gets the same exception, so each one reports and
+    records the failure for its own database.
+    
+    Files large enough to be streamed are not parsed here; stream is the
+    SharedFileStream their importers share instead.
+    """
+    
+    def __init__(self, prepare, stream: Optional['SharedFileStream'] = None):
+        self._prepare = prepare
+        self.stream = stream
+        self._lock = threading.Lock()
+        self._done = False
+        self._result = None
+        self._error: Optional[Exception] = None
+    def get(self) -> Any:
+        with self._lock:
+            if not self._done:
+                try:
+                    self._result = self._prepare()
+                except Exception as e:
+                    self._error = e
+                self._done = True
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class SharedFileStream:
+    """
+    One read of a streamed file, shared by the importers of a fan-out.
+    
+    The streaming import reads a file twice (see
+    JSONtoMySQL._streaming_insert_json_data). Here the first importer to ask
+    runs pass one and the others get its result, and pass two is read by one
+    producer thread that hands every chunk to each importer through that
+    importer's own queue. The file is decoded twice in all, not twice per
+    target database.
+    
+    Queues hold at most QUEUE_CHUNKS chunks, so a slow target holds the
+    reader back instead of chunks piling up in memory. An importer that
+    fails or finishes calls leave(); the reader stops waiting for it, and
+    stops reading altogether once every importer has left.
+    
+    owner is the first importer, the one the file belongs to: pass one -
+    including the duplicate check, which only it has - runs as owner.
+    """
+    
+    # Chunks waiting per importer before the reader pauses
+    QUEUE_CHUNKS = 2
+    # Seconds between checks for importers that left while the reader waits
+    PUT_POLL_SECONDS = 0.5
+    
+    def __init__(self, importers: List[Any]):
+        self.owner = importers[0]
+        self._slots = {id(importer): slot for slot, importer in enumerate(importers)}
+        self._queues = [queue.Queue(self.QUEUE_CHUNKS) for _ in importers]
+        self._active = [True] * len(importers)
+        self._lock = threading.Lock()
+        self._profiled = False
+        self._profile = None
+        self._error: Optional[Exception] = None
+        self._reader: Optional[threading.Thread] = None
+    def profile(self, read_profile) -> Any:
+        """Result of pass one, run by whichever importer asks first."""
+        with self._lock:
+            if not self._profiled:
+                try:
+                    self._profile = read_profile()
+                except Exception as e:
+                    self._error = e
+                self._profiled = True
+        if self._error is not None:
+            raise self._error
+        return self._profile
+    def chunks(self, importer, read_chunks):
+        """
+        Yield pass two's chunks for one importer.
+        
+        read_chunks (a generator function) is started once, on the reader
+        thread, by whichever importer asks first.
+        """
+        slot = self._slots[id(importer)]
+        with self._lock:
+            if self._reader is None:
+                self._reader = threading.Thread(target=self._read, args=(read_chunks,), daemon=True)
+                self._reader.start()
+        while True:
+            item = self._queues[slot].get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    def leave(self, importer):
+        """Stop handing chunks to an importer (it failed or is done)."""
+        self._active[self._slots[id(importer)]] = False
+    def _read(self, read_chunks):
+        end = None
+        try:
+            for chunk in read_chunks():
+                if not any(self._active):
+                    return
+                for slot in range(len(self._queues)):
+                    self._put(slot, chunk)
+        except Exception as e:
+            end = e  # Every importer fails the same way
+        for slot in range(len(self._queues)):
+            self._put(slot, end)
+    def _put(self, slot: int, item: Any):
+        while self._active[slot]:
+            try:
+                self._queues[slot].put(item, timeout=self.PUT_POLL_SECONDS)
+                return
+            except queue.Full:
+                continue
+
+
+class ChunkLoadPool:
+    """
+    Inserts the chunks of a streamed file over several connections at once.
+    
+    Each worker thread opens its own connection on its first chunk and
+    inserts whole chunks with explicit ids, each committed on its own and
+    retried on transient errors (see JSONtoMySQL._insert_chunk), so chunks
+    may finish in any order. At most QUEUE_PER_WORKER chunks per worker are
+    queued or in flight: submit() then waits for the oldest one, which keeps
+    memory bounded as in the serial load and raises a worker's error in the
+    caller.
+    """
+    
+    # Chunks queued or in flight per worker before submit() waits
+    QUEUE_PER_WORKER = 2
+    
+    def __init__(self, importer: Any, table_name: str, columns: List[str], engine: str,
+                 workers: int, checksum: Optional[RowChecksum] = None):
+        self.importer = importer
+        self.table_name = table_name
+        self.columns = columns
+        self.engine = engine
+        self.workers = workers
+        self.checksum = checksum
+        self._step = importer._batch_step(engine, len(columns) + 1)
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._pending = deque()
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+    def submit(self, rows: List[tuple], first_id: int):
+        """Queue a chunk whose rows get the ids first_id, first_id + 1, ..."""
+        self._pending.append(self._executor.submit(self._insert, rows, first_id))
+        while len(self._pending) > self.QUEUE_PER_WORKER * self.workers:
+            self._collect(self._pending.popleft())
+    def finish(self):
+        """Wait for every queued chunk (raises the first error)."""
+        while self._pending:
+            self._collect(self._pending.popleft())
+    def close(self):
+        """Stop the workers and close their connections (after finish, or on failure)."""
+        for future in self._pending:
+            future.cancel()
+        self._executor.shutdown(wait=True)
+        self._pending.clear()
+        for connection in self._connections:
+            try:
+                connection.rollback()
+            except mysql.connector.Error:
+                pass  # Connection is gone - the server already discarded the transaction
+            self.importer._close_connection(connection)
+        self._connections = []
+    def _collect(self, future):
+        chunk_checksum = future.result()
+        if self.checksum:
+            self.checksum.merge(chunk_checksum)
+    def _insert(self, rows: List[tuple], first_id: int) -> Optional[RowChecksum]:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self.importer._open_connection()
+            with self._lock:
+                self._connections.append(connection)
+            self._local.sizer = self.importer._batch_sizer(connection, rows, self._step)
+        chunk_checksum = self.checksum.copy_empty() if self.checksum else None
+        self.importer._insert_chunk(connection, self.table_name, rows, self.columns, first_id,
+                                    self.engine, chunk_checksum, self._local.sizer)
+        return chunk_checksum
+
+
+class JSONtoMySQL:
+    """
+    Handles the business logic for importing JSON files into MySQL.
+
+    This class manages database connections, table creation with automatic 
+    schema inference, and data insertion with transaction safety. Each instance 
+    represents a single database connection that should be closed when operations 
+    are complete.
+    """
+    
+    # File patterns picked up when importing a directory
+    JSON_FILE_PATTERNS = ('*.json', '*.jsonl', '*.ndjson')
+    
+    # JSON Lines files (one record per line) are read with the NDJSON reader
+    NDJSON_EXTENSIONS = ('.jsonl', '.ndjson')
+    
+    # NDJSON files at least this large are split and parsed in parallel; streamed
+    # ones are decoded this many bytes per worker process at a time (see _stream_rows)
+    NDJSON_PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+    STREAM_RANGE_BYTES = 8 * 1024 * 1024
+    
+    # Rows sent per INSERT statement (keeps each statement under max_allowed_packet);
+    # the starting point when batch sizes adapt (see AdaptiveBatchSizer)
+    INSERT_BATCH_SIZE = 1000
+    
+    # Bounds for adaptive batch sizes; a batch also never exceeds this share
+    # of max_allowed_packet (default used if the server value cannot be read)
+    ADAPTIVE_MIN_BATCH_ROWS = 50
+    ADAPTIVE_MAX_BATCH_ROWS = 20000
+    PACKET_FILL_RATIO = 0.5
+    DEFAULT_MAX_ALLOWED_PACKET = 64 * 1024 * 1024
+    
+    # Insert engines: 'text' renders values client-side and relies on executemany
+    # rewriting; 'prepared' uses server-side prepared statements (binary protocol)
+    INSERT_ENGINES = ('text', 'prepared')
+    
+    # Rows per multi-row prepared INSERT, and MySQL's placeholder limit per statement
+    PREPARED_BATCH_ROWS = 250
+    MAX_PREPARED_PLACEHOLDERS = 65535
+    
+    # Engine benchmarks only run for files this large, on a sample of this many rows
+    ENGINE_BENCHMARK_MIN_ROWS = 20000
+    ENGINE_BENCHMARK_SAMPLE_ROWS = 2000
+    
+    # Benchmark winners, shared for the whole session:
+    # (host, database, width bucket, row-count bucket) -> engine name
+    _engine_choices: Dict[Tuple, str] = {}
+    
+    # Natural primary keys (see _natural_primary_key): the column types that can
+    # be one, and how many rows a streamed file sorts in memory before
+    # spilling a sorted run to disk (see _external_sort)
+    NATURAL_KEY_TYPES = ('INT', 'BIGINT', 'VARCHAR(255)')
+    SORT_RUN_ROWS = 1000000
+    
+    # Files at least this large are imported in two streaming passes instead of
+    # being held in memory (see _streaming_insert_json_data), STREAM_CHUNK_ROWS
+    # rows at a time
+    STREAM_MIN_BYTES = 256 * 1024 * 1024
+    STREAM_CHUNK_ROWS = 20000
+    
+    # Files with at least this many records are loaded over several connections
+    PARALLEL_LOAD_MIN_ROWS = 50000
+    
+    # Local disk space per file worker used to read ahead upcoming files from
+    # network shares
+    PREFETCH_BUDGET_BYTES = 512 * 1024 * 1024
+    
+    # Files smaller than this cannot hold a single column ({"":0} is 6 bytes),
+    # so they are skipped from their size alone, without being opened
+    MIN_DATA_BYTES = 6
+    
+    # MySQL errors worth retrying: lock wait timeout, deadlock, can't connect,
+    # server gone away, lost connection (twice)
+    TRANSIENT_ERRNOS = (1205, 1213, 2003, 2006, 2013, 2055)
+    
+    # Retries per chunk after a transient error, waiting 1s, 2s, 4s, ... between them
+    TRANSIENT_RETRIES = 4
+    RETRY_BACKOFF_SECONDS = 1.0
+    
+    # Rows committed together in staged loads - the unit that is retried
+    RETRY_CHUNK_ROWS = 50000
+    
+    # Suffixes for the work tables used by staged (swap-in) loads
+    STAGING_SUFFIX = "__staging"
+    RETIRED_SUFFIX = "__old"
+    
+    # MySQL's limit on the length of a table name
+    MAX_TABLE_NAME_CHARS = 64
+    
+    # Rows fetched per round trip when exporting a table to JSON
+    EXPORT_CHUNK_ROWS = 5000
+    
+    # Partitioned exports write one <prefix><entity>.json file per EntityType,
+    # matching the names of the exception files EJ sends us
+    EXPORT_FILE_PREFIX = "Alliance_Exception_"
+    
+    # information_schema data types a range export can split by (see _range_key_column)
+    INTEGER_DATA_TYPES = ('tinyint', 'smallint', 'mediumint', 'int', 'bigint')
+    
+    # Progress of resumable (checkpointed) imports, one row per target table
+    CHECKPOINT_TABLE = "import_checkpoints"
+    
+    # One row per imported file of every run (see _record_import_run), and the
+    # windows throughput_report compares: the latest runs of a table against
+    # the runs before them, flagging a drop below REGRESSION_RATIO of baseline
+    RUN_HISTORY_TABLE = "import_runs"
+    REPORT_RECENT_RUNS = 5
+    REPORT_BASELINE_RUNS = 30
+    REGRESSION_RATIO = 0.8
+    
+    # Consolidation mode loads every <EXPORT_FILE_PREFIX><entity> file into this
+    # one table, LIST partitioned by EntityType (see _load_entity_partition)
+    UNIFIED_TABLE = "Alliance_Exception"
+    
+    # Column types from narrowest to widest, for merging file schemas into the
+    # unified table; JSON only merges with JSON (anything else widens to TEXT)
+    TYPE_WIDENING_ORDER = ('BOOLEAN', 'INT', 'BIGINT', 'DOUBLE', 'VARCHAR(255)', 'TEXT')
+    
+    # information_schema data_type -> the type names used by ColumnStats
+    MYSQL_TYPE_NAMES = {'tinyint': 'BOOLEAN', 'int': 'INT', 'bigint': 'BIGINT', 'double': 'DOUBLE',
+                        'varchar': 'VARCHAR(255)', 'text': 'TEXT', 'json': 'JSON'}
+    
+    # Key that should be unique per entity in the exception files, and what to
+    # do with records that repeat it (see DuplicateKeyTracker)
+    DUPLICATE_KEY_COLUMNS = ('SourceIDValue',)
+    DUPLICATE_ACTIONS = ('report', 'reject', 'dedupe')
+    
+    # Keys tracked in an exact set up to this many per run; beyond it a Bloom
+    # filter (with verification of its hits) keeps memory flat
+    EXACT_KEY_LIMIT = 5000000
+    
+    # Watch mode: how often the directory is scanned, and how long a file's size
+    # and modification time must stay unchanged before it counts as complete
+    WATCH_POLL_SECONDS = 2.0
+    WATCH_SETTLE_SECONDS = 5.0
+    
+    # Indexed generated columns over JSON paths (see JsonPathProfile): records
+    # walked for index suggestions, distinct values counted per path, and how
+    # common (share of records) and selective (distinct values per record) a
+    # path must be to be suggested
+    GENERATED_COLUMN_STORAGE = ('VIRTUAL', 'STORED')
+    JSON_INDEX_SAMPLE_ROWS = 10000
+    JSON_INDEX_DISTINCT_LIMIT = 10000
+    JSON_INDEX_MIN_PRESENCE = 0.5
+    JSON_INDEX_MIN_SELECTIVITY = 0.2
+    
+    # Load rate assumed by dry runs when no import has been measured yet
+    # (rows/sec, a conservative single-connection figure for the conversion server)
+    DRY_RUN_ROWS_PER_SEC = 5000
+    
+    def __init__(self, host: str, user: str, password: str, database: str, 
+                 port: int = 3306, status_callback=None, load_workers: int = 4,
+                 checkpoint_rows: int = 0, pool: Optional[ConnectionPool] = None,
+                 insert_engine: str = 'auto', intern_values: bool = False, verify: bool = True,
+                 connect: bool = True,
+                 duplicate_keys: Optional[Tuple[str, ...]] = DUPLICATE_KEY_COLUMNS,
+                 on_duplicate: str = 'report', consolidate: bool = False,
+                 stream_min_bytes: Optional[int] = STREAM_MIN_BYTES, flatten: bool = False,
+                 json_indexes: Optional[Dict[str, List[str]]] = None,
+                 generated_columns: str = 'VIRTUAL', record_history: bool = True,
+                 natural_key: Optional[Tuple[str, ...]] = None, file_workers: int = 1):
+        """
+        Initialize database connection.
+        
+        Args:
+            natural_key: Columns to use as the tables' clustered primary key
+                (e.g. ('SourceIDValue',)) instead of the id column; rows are
+                inserted in key order (see _natural_primary_key)
+            record_history: Write a row per imported file to RUN_HISTORY_TABLE
+                (see _record_import_run and throughput_report)
+            json_indexes: JSON paths to index per table name, e.g.
+                {"Alliance_Exception_case": ["Address.City"]}; each gets an
+                indexed generated column after the load (see
+                _add_json_path_indexes). Any dict, even an empty one, also
+                turns on index suggestions for JSON paths
+            generated_columns: 'VIRTUAL' (computed on read, nothing stored
+                but the index) or 'STORED' for the generated columns
+            flatten: Load nested objects as prefixed columns and arrays of
+                objects as child tables instead of JSON columns (see
+                RecordFlattener); not applied to consolidated files. Flattened
+                files are never streamed - they are loaded in memory whatever
+                their size
+            stream_min_bytes: Files at least this large are imported in two
+                streaming passes that keep only a few chunks of rows in memory
+                (None disables; see _streaming_insert_json_data)
+            consolidate: Load Alliance_Exception_<entity> files into partitions of
+                one UNIFIED_TABLE instead of a table per file (see
+                _load_entity_partition); other files load as usual
+            duplicate_keys: Columns that must be unique per entity, checked
+                within and across files (None or () disables the check)
+            on_duplicate: 'report' duplicates and load them anyway, 'reject'
+                the whole file, or 'dedupe' (keep the first occurrence only)
+            connect: False to skip opening a connection, for dry runs
+                (see preflight_directory); nothing else works without one
+            verify: Check every loaded table against a row count and checksum
+                computed while inserting (see RowChecksum)
+            intern_values: Share repeated string values of low-cardinality
+                columns while decoding - less memory, but parsing is about
+                2.3 times slower (see InterningHook)
+            insert_engine: 'text', 'prepared', or 'auto' to benchmark both on
+                large files and use the faster one (see _select_insert_engine)
+            pool: Optional session ConnectionPool. When given, connections are
+                borrowed from it and returned (not closed) by close()
+            load_workers: Number of connections used to insert a single large
+                file concurrently (1 disables intra-file parallelism)
+            checkpoint_rows: When greater than 0, enables resumable imports that
+                commit every checkpoint_rows rows (see _resumable_insert_json_data)
+            file_workers: Number of files import_directory loads at the same
+                time, each over its own connection, largest files first (see
+                _plan_file_order); fan-out and consolidated runs load one file
+                at a time
+        """
+        self.status_callback = status_callback
+        self.load_workers = max(1, load_workers)
+        self.file_workers = max(1, file_workers)
+        self.checkpoint_rows = max(0, checkpoint_rows)
+        self.pool = pool
+        if insert_engine != 'auto' and insert_engine not in self.INSERT_ENGINES:
+            raise ValueError(f"Unknown insert engine: {insert_engine}")
+        self.insert_engine = insert_engine
+        self.intern_values = intern_values
+        self.verify = verify
+        if on_duplicate not in self.DUPLICATE_ACTIONS:
+            raise ValueError(f"Unknown duplicate action: {on_duplicate}")
+        self.on_duplicate = on_duplicate
+        self.consolidate = consolidate
+        self.stream_min_bytes = stream_min_bytes
+        self.flatten = flatten
+        if generated_columns.upper() not in self.GENERATED_COLUMN_STORAGE:
+            raise ValueError(f"Unknown generated column storage: {generated_columns}")
+        self.json_indexes = json_indexes
+        self.generated_columns = generated_columns.upper()
+        self.duplicate_keys = tuple(duplicate_keys or ())
+        self.duplicate_tracker = (DuplicateKeyTracker(self.duplicate_keys, self.EXACT_KEY_LIMIT)
+                                  if self.duplicate_keys else None)
+        # Shared with the file workers of import_directory, which use the same tracker
+        self._tracker_lock = threading.Lock()
+        
+        # Per-file results of the current run, keyed by file name
+        self.run_metrics: Dict[str, Dict[str, Any]] = {}
+        
+        # (batch rows, rows/sec) of every batch of the file being loaded
+        self.batch_history: List[Tuple[int, float]] = []
+        
+        # Run history: the id shared by the files of one run, and the engine
+        # and per-phase seconds (parse, load, verify) of the file being loaded
+        self.record_history = record_history
+        self.natural_key = tuple(natural_key or ())
+        self.run_id = uuid.uuid4().hex
+        self.file_engine: Optional[str] = None
+        self.phase_seconds: Dict[str, float] = {}
+        
+        # Fan-out: importers of the other target databases (see add_target),
+        # and (success, message) per target for the last file
+        self.target_label = f"{database}@{host}"
+        self.targets: List['JSONtoMySQL'] = []
+        self.target_results: Dict[str, Tuple[bool, str]] = {}
+        self.log_prefix = ''
+        self._max_packet: Optional[int] = None
+        
+        # Prepared insert engine: (connection, cursor, statement) per
+        # (connection id, table, rows per statement), see _prepared_insert
+        self._prepared_inserts: Dict[Tuple[int, str, int], Tuple[Any, Any, str]] = {}
+        self._prepared_lock = threading.Lock()
+        
+        # Kept so that extra connections can be opened for parallel loading
+        self._connect_args = {
+            'host': host,
+            'user': user,
+            'password': password,
+            'database': database,
+            'port': port
+        }
+        if not connect:
+            self.connection = None
+            self.cursor = None
+            return
+        self.connection = self._open_connection()
+        self.cursor = self.connection.cursor()
+        self.log("Database connection established")
+    def _open_connection(self):
+        """Open (or borrow from the pool) a connection using this importer's settings."""
+        if self.pool:
+            return self.pool.acquire()
+        return mysql.connector.connect(
+            **self._connect_args,
+            connect_timeout=10,
+            autocommit=False  #manage transactions explicitly
+        )
+    def _close_connection(self, connection):
+        """Close a connection, or hand it back to the pool it came from."""
+        self._close_prepared_inserts(connection)
+        if self.pool:
+            self.pool.release(connection)
+        else:
+            connection.close()
+    def log(self, message: str):
+        """
+        Send status messages to callback if provided, always print to console.
+        """
+        if self.log_prefix:
+            message = self.log_prefix + message
+        if self.status_callback:
+            self.status_callback(message)
+        print(message)
+    def _determine_column_type(self, values: List[Any]) -> str:
+        """
+        Determine the most appropriate MySQL column type for a list of values.
+        
+        This method implements a precedence hierarchy:
+        1. JSON - for nested structures (dicts/lists)
+        2. TEXT - for long strings or mixed types
+        3. VARCHAR(255) - for short strings
+        4. DOUBLE - for any floating point
+        5. BIGINT - for large integers
+        6. INT - for small integers
+        7. BOOLEAN - for boolean values
+        
+        Args:
+            values: List of values to analyze (all values for a single column)
+        
+        Returns:
+            MySQL column type as string
+        
+        Note: We scan ALL values because a column might have mixed types
+        in different rows (e.g., some nulls, some integers, some floats).
+        We need to pick a type that can accommodate all of them.
+        """
+        # The precedence rules live in ColumnStats.column_type(), which the
+        # import path also uses to infer types while rows are being parsed
+        stats = ColumnStats()
+        for value in values:
+            if value is not None:
+                stats.add(value)
+        return stats.column_type()
+    def create_table_from_json(self, table_name: str, json_data: List[Dict]) -> Tuple[bool, List[str]]:
+        """
+        Create MySQL table based on JSON data structure.
+        
+        This method analyzes all records to create a table schema that can
+        accommodate all fields across all records (union of all keys).
+        
+        Args:
+            table_name: Name for the new table
+            json_data: List of JSON objects (dictionaries)
+        
+        Returns:
+            Tuple of (success: bool, columns: List[str])
+            - success: True if table was created, False if skipped
+            - columns: Ordered list of column names for use in INSERT statements
+        
+        Important: This function DROPS the existing table if it exists.
+        This is intentional behavior for data conversion/import workflows.
+        """
+        if not json_data:
+            self.log(f"No data in {table_name}.json - skipping")
+            return False, []
+
+        # Step 1: Collect all unique keys from all records
+        # In SQL terms, this is like doing a UNION of all possible columns
+        buffer = RowBuffer()
+        for record in json_data:
+            buffer.add(record)
+        buffer.finalize()
+        sorted_columns = buffer.columns
+        self.log(f"Columns to be created for {table_name}: {sorted_columns}")
+
+        # Step 2: Determine appropriate MySQL type for each column
+        column_types = buffer.column_types()
+
+        # Step 3: Drop and recreate the table
+        self._create_table(self.cursor, table_name, sorted_columns, column_types)
+        
+        # Return success and the column order for INSERT statements
+        return True, sorted_columns
+    def _create_table(self, cursor, table_name: str, columns: List[str], column_types: Dict[str, str],
+                      primary_key: Tuple[str, ...] = ()):
+        """
+        Drop (if present) and create a table with the given column types.
+        
+        Every table gets an auto-increment primary key named 'id' as its first
+        column, followed by the data columns in the order given. With a
+        primary_key (natural key columns), those columns are the primary key
+        and 'id' is only a unique key.
+        """
+        # Drop existing table (this is intentional - see create_table_from_json)
+        drop_sql = f"DROP TABLE IF EXISTS `{table_name}`"
+        cursor.execute(drop_sql)
+        self.log(f"Dropped table {table_name} if it existed")
+
+        # Create the new table
+        cursor.execute(self._create_table_sql(table_name, columns, column_types, primary_key))
+        
+        # Don't commit yet - we'll commit after data insertion succeeds
+        self.log(f"Created table {table_name} with {len(columns)} columns")
+    @staticmethod
+    def _create_table_sql(table_name: str, columns: List[str], column_types: Dict[str, str],
+                          primary_key: Tuple[str, ...] = ()) -> str:
+        """CREATE TABLE statement used by _create_table (also shown by dry runs)."""
+        if not primary_key:
+            columns_sql = ["id BIGINT AUTO_INCREMENT PRIMARY KEY"]
+            columns_sql.extend([f"`{key}` {column_types[key]}" for key in columns])
+            return f"CREATE TABLE `{table_name}` ({', '.join(columns_sql)})"
+        
+        # InnoDB clusters rows by the primary key, so lookups by the natural
+        # key read the row directly; id stays unique for the id-based load
+        # logic (explicit ids, retries) and for child tables' parent_id
+        columns_sql = ["id BIGINT AUTO_INCREMENT UNIQUE"]
+        columns_sql.extend([f"`{key}` {column_types[key]}{' NOT NULL' if key in primary_key else ''}"
+                            for key in columns])
+        columns_sql.append(f"PRIMARY KEY ({', '.join(f'`{key}`' for key in primary_key)})")
+        return f"CREATE TABLE `{table_name}` ({', '.join(columns_sql)})"
+    def insert_json_data(self, table_name: str, json_data: List, columns: List[str],
+                         checksum: Optional[RowChecksum] = None, first_id: Optional[int] = None):
+        """
+        Insert JSON records into the specified table.
+        
+        Args:
+            table_name: Target table name
+            json_data: List of JSON objects to insert, or row tuples already
+                aligned to columns (as produced by RowBuffer)
+            columns: Ordered list of column names (from create_table_from_json)
+            checksum: Optional RowChecksum updated with every inserted row
+            first_id: Write the id column explicitly, numbering the rows
+                first_id, first_id + 1, ... (default: AUTO_INCREMENT ids)
+        
+        Note: This uses parameterized queries (%s placeholders) which prevents
+        SQL injection attacks. It's like using sp_executesql with parameters in SQL Server.
+        """
+        if not json_data:
+            return
+
+        if isinstance(json_data[0], dict):
+            rows = [tuple(record.get(col) for col in columns) for record in json_data]
+        else:
+            rows = json_data
+
+        engine = self._select_insert_engine(table_name, rows, columns)
+        inserted = self._insert_records(self.connection, table_name, rows, columns,
+                                        first_id=first_id, engine=engine, checksum=checksum)
+        self.log(f"Inserted {inserted} records into {table_name}")
+    def _max_allowed_packet(self, connection) -> int:
+        """Server's max_allowed_packet in bytes (read once per importer)."""
+        if self._max_packet is None:
+            cursor = connection.cursor()
+            try:
+                cursor.execute("SELECT @@max_allowed_packet")
+                row = cursor.fetchone()
+            finally:
+                cursor.close()
+            self._max_packet = int(row[0]) if row and row[0] else self.DEFAULT_MAX_ALLOWED_PACKET
+        return self._max_packet
+    def _batch_step(self, engine: str, width: int) -> int:
+        """
+        Granularity of batch sizes for an engine.
+        
+        Prepared batches are whole multiples of the prepared statement's row
+        count, so the leftover (re-prepared) statement is only needed at the
+        very end.
+        """
+        if engine != 'prepared':
+            return 1
+        return max(1, min(self.PREPARED_BATCH_ROWS, self.MAX_PREPARED_PLACEHOLDERS // width))
+    def _batch_sizer(self, connection, rows: List[tuple], step: int = 1) -> AdaptiveBatchSizer:
+        """AdaptiveBatchSizer for these rows, capped so a batch fits in one packet."""
+        row_bytes = AdaptiveBatchSizer.estimate_row_bytes(rows)
+        packet_rows = int(self._max_allowed_packet(connection) * self.PACKET_FILL_RATIO / row_bytes)
+        return AdaptiveBatchSizer(self.INSERT_BATCH_SIZE, self.ADAPTIVE_MIN_BATCH_ROWS,
+                                  min(self.ADAPTIVE_MAX_BATCH_ROWS, packet_rows), step)
+    def _insert_records(self, connection, table_name: str, rows: List[tuple], columns: List[str],
+                        first_id: Optional[int] = None, engine: str = 'text',
+                        checksum: Optional[RowChecksum] = None, adaptive: bool = True,
+                        sizer: Optional[AdaptiveBatchSizer] = None) -> int:
+        """
+        Insert row tuples in batches over the given connection.
+        
+        Batch sizes adapt to the measured throughput (see AdaptiveBatchSizer),
+        starting from INSERT_BATCH_SIZE; every batch is recorded in
+        batch_history. With adaptive=False every batch is INSERT_BATCH_SIZE
+        rows. A sizer can be passed in to keep what it learned across calls.
+        
+        When first_id is given, the 'id' column is written explicitly, numbering
+        the rows first_id, first_id + 1, ... This keeps ids in file order even
+        when several connections insert different parts of one file at once.
+        
+        Returns:
+            Number of rows inserted
+        """
+        insert_columns = (['id'] if first_id is not None else []) + list(columns)
+
+        # Build INSERT statement with proper column names and placeholders
+        placeholders = ', '.join(['%s'] * len(insert_columns))
+        column_names = ', '.join([f'`{col}`' for col in insert_columns])
+        insert_sql = f"INSERT INTO `{table_name}` ({column_names}) VALUES ({placeholders})"
+
+        # Prepared batches are whole multiples of the statement's row count
+        step = self._batch_step(engine, len(insert_columns))
+        rows_per_statement = step
+        if adaptive and sizer is None:
+            sizer = self._batch_sizer(connection, rows, step)
+        fixed_size = step * max(1, self.INSERT_BATCH_SIZE // step)
+
+        # Prepared cursors are cached across calls (see _prepared_insert)
+        cursor = None if engine == 'prepared' else connection.cursor()
+        try:
+            offset = 0
+            while offset < len(rows):
+                batch_size = sizer.size if adaptive else fixed_size
+                batch = rows[offset:offset + batch_size]
+
+                if checksum:
+                    checksum.update(batch)
+
+                # Rows are already tuples in column order - only the id is added
+                if first_id is None:
+                    values = batch
+                else:
+                    start_id = first_id + offset
+                    values = [(start_id + i,) + row for i, row in enumerate(batch)]
+
+                started = time.perf_counter()
+                if engine == 'prepared':
+                    self._execute_prepared_batch(connection, table_name, column_names,
+                                                 len(insert_columns), rows_per_statement, values)
+                else:
+                    # Execute batch insert - more efficient than inserting one row at a time
+                    cursor.executemany(insert_sql, values)
+                elapsed = time.perf_counter() - started
+                
+                if adaptive:
+                    sizer.record(len(batch), elapsed)
+                    self.batch_history.append(
+                        (len(batch), len(batch) / elapsed if elapsed > 0 else float('inf'))
+                    )
+                offset += len(batch)
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+        return len(rows)
+    def _execute_prepared_batch(self, connection, table_name: str, column_names: str, width: int,
+                                rows_per_statement: int, values: List[Tuple]):
+        """
+        Insert rows with a reusable multi-row prepared statement.
+        
+        The statement holds a fixed number of rows, so it is prepared on the
+        server once and then only re-executed with new parameters, which travel
+        in MySQL's binary protocol (no client-side escaping, no SQL re-parsing).
+        A shorter statement is prepared once for any leftover rows.
+        """
+        for start in range(0, len(values), rows_per_statement):
+            rows = values[start:start + rows_per_statement]
+            cursor, statement = self._prepared_insert(connection, table_name, column_names,
+                                                      width, len(rows))
+            cursor.execute(statement, [value for row in rows for value in row])
+    def _prepared_insert(self, connection, table_name: str, column_names: str, width: int,
+                         row_count: int) -> Tuple[Any, str]:
+        """
+        Prepared cursor and statement text that insert row_count rows into a table.
+        
+        mysql-connector only reuses a server-side prepared statement when the
+        very same string object is executed again on the same cursor (an
+        identity check), so both are cached per connection, table and row
+        count until the file is done (see _close_prepared_inserts). Full
+        batches and the shorter leftover statement get a cursor each, so
+        neither replaces the other's prepared statement.
+        """
+        key = (id(connection), table_name, row_count)
+        with self._prepared_lock:
+            cached = self._prepared_inserts.get(key)
+        if cached is None:
+            row_placeholders = '(' + ', '.join(['%s'] * width) + ')'
+            statement = (f"INSERT INTO `{table_name}` ({column_names}) VALUES "
+                         + ', '.join([row_placeholders] * row_count))
+            cached = (connection, connection.cursor(prepared=True), statement)
+            with self._prepared_lock:
+                self._prepared_inserts[key] = cached
+        return cached[1], cached[2]
+    def _close_prepared_inserts(self, connection=None):
+        """Close the cached prepared insert cursors of one connection (default: all)."""
+        with self._prepared_lock:
+            keys = [key for key, (owner, _, _) in self._prepared_inserts.items()
+                    if connection is None or owner is connection]
+            closing = [self._prepared_inserts.pop(key) for key in keys]
+        for _, cursor, _ in closing:
+            try:
+                cursor.close()
+            except mysql.connector.Error:
+                pass  # Session already gone, and its statements with it
+    def benchmark_insert_engines(self, table_name: str, rows: List[tuple],
+                                 columns: List[str]) -> Dict[str, float]:
+        """
+        Measure insert throughput (rows/sec) of every engine against a table.
+        
+        Each engine inserts the same sample of rows into its own
+        TEMPORARY copy of the table (CREATE TEMPORARY TABLE ... LIKE), so the
+        real table is untouched and no implicit commit happens.
+        """
+        sample = rows[:self.ENGINE_BENCHMARK_SAMPLE_ROWS]
+        results = {}
+        for engine in self.INSERT_ENGINES:
+            bench_table = f"{table_name}__bench_{engine}"
+            self.cursor.execute(f"CREATE TEMPORARY TABLE `{bench_table}` LIKE `{table_name}`")
+            try:
+                started = time.perf_counter()
+                self._insert_records(self.connection, bench_table, sample, columns,
+                                     engine=engine, adaptive=False)
+                elapsed = time.perf_counter() - started
+            finally:
+                self.cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS `{bench_table}`")
+            results[engine] = len(sample) / elapsed if elapsed > 0 else float('inf')
+        return results
+    def _select_insert_engine(self, table_name: str, rows: List[tuple], columns: List[str],
+                              row_count: Optional[int] = None) -> str:
+        """
+        Pick the insert engine for a file.
+        
+        With insert_engine='auto', small files use the text engine. For large
+        files both engines are benchmarked once per table shape (column count
+        and row count, bucketed by powers of two) and the faster one is reused
+        for similar files for the rest of the session.
+        
+        row_count is the file's total row count when rows is only its first
+        part (streaming imports).
+        """
+        row_count = len(rows) if row_count is None else row_count
+        if self.insert_engine != 'auto':
+            engine = self.insert_engine
+        elif row_count < self.ENGINE_BENCHMARK_MIN_ROWS:
+            engine = 'text'
+        else:
+            shape = (self._connect_args['host'], self._connect_args['database'],
+                     len(columns).bit_length(), row_count.bit_length())
+            if shape not in self._engine_choices:
+                results = self.benchmark_insert_engines(table_name, rows, columns)
+                self._engine_choices[shape] = max(results, key=results.get)
+                measured = ', '.join(f"{engine} {rate:,.0f} rows/sec" for engine, rate in results.items())
+                self.log(f"Insert engine benchmark for {table_name}: {measured}")
+            
+            engine = self._engine_choices[shape]
+            self.log(f"Using {engine} insert engine for {table_name}")
+        
+        # The file's main table picks first; child tables don't overwrite it
+        if self.file_engine is None:
+            self.file_engine = engine
+        return engine
+    def _is_transient_error(self, error: Exception) -> bool:
+        """True for MySQL errors that may succeed on retry (see TRANSIENT_ERRNOS)."""
+        return isinstance(error, mysql.connector.Error) and error.errno in self.TRANSIENT_ERRNOS
+    def _recover_connection(self, connection, error: Exception, attempt: int, what: str):
+        """
+        Back off after a transient error and make the connection usable again.
+        
+        Lock wait timeouts and deadlocks only need the transaction rolled
+        back; a lost connection is re-established in place (same object), so
+        callers holding it keep working.
+        """
+        delay = self.RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1))
+        self.log(f"Transient error during {what}: {error} - "
+                 f"retry {attempt} of {self.TRANSIENT_RETRIES} in {delay:g}s")
+        try:
+            connection.rollback()
+        except mysql.connector.Error:
+            pass  # Connection is gone - the server already discarded the transaction
+        # Statements prepared on a lost session no longer exist on the server
+        self._close_prepared_inserts(connection)
+        time.sleep(delay)
+        
+        if not connection.is_connected():
+            connection.reconnect(attempts=self.TRANSIENT_RETRIES, delay=int(max(1, delay)))
+            self.log("Reconnected to the database")
+        if connection is self.connection:
+            self.cursor = connection.cursor()
+    def _insert_chunk(self, connection, table_name: str, rows: List[tuple], columns: List[str],
+                      first_id: int, engine: str, checksum: Optional[RowChecksum] = None,
+                      sizer: Optional[AdaptiveBatchSizer] = None, after_insert=None):
+        """
+        Insert and commit one chunk of rows with explicit ids, retrying transient errors.
+        
+        The chunk is idempotent: before a retry its id range is deleted, so rows
+        that a failed (or lost) COMMIT may or may not have kept are never
+        duplicated. Only this chunk is redone - earlier chunks stay committed.
+        
+        Args:
+            after_insert: Optional function(connection) run in the same
+                transaction just before the commit (e.g. a checkpoint update)
+        """
+        last_id = first_id + len(rows) - 1
+        attempt = 0
+        while True:
+            chunk_checksum = checksum.copy_empty() if checksum else None
+            try:
+                if attempt:
+                    cursor = connection.cursor()
+                    try:
+                        cursor.execute(f"DELETE FROM `{table_name}` WHERE id BETWEEN %s AND %s",
+                                       (first_id, last_id))
+                    finally:
+                        cursor.close()
+                self._insert_records(connection, table_name, rows, columns, first_id=first_id,
+                                     engine=engine, checksum=chunk_checksum, sizer=sizer)
+                if after_insert:
+                    after_insert(connection)
+                connection.commit()
+                break
+            except mysql.connector.Error as e:
+                attempt += 1
+                if not self._is_transient_error(e) or attempt > self.TRANSIENT_RETRIES:
+                    raise
+                self._recover_connection(connection, e, attempt,
+                                         f"{table_name} rows {first_id}-{last_id}")
+        
+        if checksum:
+            checksum.merge(chunk_checksum)
+    def _create_and_insert(self, table_name: str, rows: List[tuple], columns: List[str],
+                           column_types: Dict[str, str], checksum: Optional[RowChecksum] = None,
+                           primary_key: Tuple[str, ...] = (), first_id: Optional[int] = None):
+        """
+        Create a table and insert a (small) file's rows in the import transaction.
+        
+        The file is its own chunk here: on a transient error the table is
+        recreated and the rows inserted again, up to TRANSIENT_RETRIES times.
+        With first_id the ids are written explicitly (see insert_json_data).
+        """
+        attempt = 0
+        while True:
+            attempt_checksum = checksum.copy_empty() if checksum else None
+            try:
+                self.log(f"Columns to be created for {table_name}: {columns}")
+                self._create_table(self.cursor, table_name, columns, column_types, primary_key)
+                
+                # Insert data using the correct column order
+                self.insert_json_data(table_name, rows, columns, attempt_checksum, first_id)
+                break
+            except mysql.connector.Error as e:
+                attempt += 1
+                if not self._is_transient_error(e) or attempt > self.TRANSIENT_RETRIES:
+                    raise
+                self._recover_connection(self.connection, e, attempt, f"loading {table_name}")
+        
+        if checksum:
+            checksum.merge(attempt_checksum)
+    def _parallel_insert_json_data(self, table_name: str, rows: List[tuple], columns: List[str],
+                                   column_types: Dict[str, str], checksum: Optional[RowChecksum] = None,
+                                   primary_key: Tuple[str, ...] = (), child_tables: List[str] = ()):
+        """
+        Load one large file over several connections, then swap it in.
+        
+        The rows are split into contiguous row ranges, one per worker. Every
+        worker opens its own connection and inserts its range into a shared
+        staging table in committed chunks of RETRY_CHUNK_ROWS (see
+        _insert_chunk - a transient error only redoes one chunk). Only after all
+        workers succeed is the staging table renamed over the real table.
+        
+        All-or-nothing: if any worker fails the staging table is dropped and the
+        existing table is left exactly as it was. child_tables (see
+        _stage_child_tables) are swapped in, or dropped, together with it.
+        """
+        staging_table = f"{table_name}{self.STAGING_SUFFIX}"
+        self._create_table(self.cursor, staging_table, columns, column_types, primary_key)
+        self.connection.commit()
+        
+        workers = min(self.load_workers, len(rows))
+        range_size = -(-len(rows) // workers)  # Ceiling division
+        row_ranges = [(start, min(start + range_size, len(rows)))
+                      for start in range(0, len(rows), range_size)]
+        self.log(f"Loading {table_name} over {len(row_ranges)} connections")
+        
+        engine = self._select_insert_engine(staging_table, rows, columns)
+        
+        step = self._batch_step(engine, len(columns) + 1)
+        
+        def load_range(start: int, end: int) -> Tuple[int, Optional[RowChecksum]]:
+            connection = self._open_connection()
+            range_checksum = checksum.copy_empty() if checksum else None
+            try:
+                sizer = self._batch_sizer(connection, rows[start:end], step)
+                for chunk_start in range(start, end, self.RETRY_CHUNK_ROWS):
+                    chunk_end = min(chunk_start + self.RETRY_CHUNK_ROWS, end)
+                    self._insert_chunk(connection, staging_table, rows[chunk_start:chunk_end],
+                                       columns, chunk_start + 1, engine, range_checksum, sizer)
+                return end - start, range_checksum
+            except Exception:
+                try:
+                    connection.rollback()
+                except mysql.connector.Error:
+                    pass  # Connection is gone - report why the range failed, not the rollback
+                raise
+            finally:
+                self._close_connection(connection)
+        
+        try:
+            with ThreadPoolExecutor(max_workers=len(row_ranges)) as executor:
+                futures = [executor.submit(load_range, start, end) for start, end in row_ranges]
+                inserted = 0
+                for future in futures:
+                    range_inserted, range_checksum = future.result()
+                    inserted += range_inserted
+                    if checksum:
+                        checksum.merge(range_checksum)
+        except Exception:
+            for staged_table in [table_name] + list(child_tables):
+                self.cursor.execute(f"DROP TABLE IF EXISTS `{staged_table}{self.STAGING_SUFFIX}`")
+            raise
+        
+        self._swap_in_staging_table(table_name, staging_table, child_tables)
+        self.log(f"Inserted {inserted} records into {table_name}")
+    def _ensure_checkpoint_table(self):
+        """Create the checkpoint table used by resumable imports if it is missing."""
+        self.cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS `{self.CHECKPOINT_TABLE}` ("
+            "table_name VARCHAR(64) PRIMARY KEY, "
+            "source_file VARCHAR(1024), "
+            "file_signature CHAR(32) NOT NULL, "
+            "rows_committed BIGINT NOT NULL, "
+            "updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP)"
+        )
+    def _file_signature(self, json_file_path: str, column_types: Dict[str, str],
+                        primary_key: Tuple[str, ...] = (), dropped: Iterable[int] = ()) -> str:
+        """
+        Fingerprint a source file, the schema inferred from it, and the row order.
+        
+        A checkpoint is only resumed when the file has the same size and
+        modification time, and produced the same columns, as the failed run.
+        The options that decide which rows are loaded and in what order are
+        part of it too - dropping duplicates, the natural-key sort and
+        flattening - since resuming at a row offset is only correct when
+        the rows line up exactly with the ones already committed.
+        
+        With dedupe, which rows were dropped (their indexes in the file) is
+        part of it as well: a key is also a duplicate when another file
+        loaded it first, and with file_workers > 1 which file that is can
+        differ from run to run.
+        """
+        stat = os.stat(json_file_path)
+        dedupe = bool(self.duplicate_keys) and self.on_duplicate == 'dedupe'
+        fingerprint = json.dumps([stat.st_size, stat.st_mtime_ns, sorted(column_types.items()),
+                                  list(self.duplicate_keys) if dedupe else None,
+                                  sorted(dropped) if dedupe else None,
+                                  list(self.natural_key), list(primary_key), self.flatten])
+        return hashlib.md5(fingerprint.encode('utf-8')).hexdigest()
+    def _resumable_insert_json_data(self, table_name: str, json_file_path: str, rows: List[tuple],
+                                    columns: List[str], column_types: Dict[str, str],
+                                    checksum: Optional[RowChecksum] = None,
+                                    primary_key: Tuple[str, ...] = (), child_tables: List[str] = (),
+                                    dropped: List[int] = ()):
+        """
+        Load a file in committed chunks that survive a failed run.
+        
+        Rows go into a staging table, checkpoint_rows at a time. Each chunk is
+        committed together with an update of rows_committed in the checkpoint
+        table, so the checkpoint always matches what is really in staging.
+        
+        If the run fails (lost connection, server restart), the staging table
+        and checkpoint are kept. Rerunning the same unchanged file resumes from
+        the last committed row instead of row zero. When every row is loaded,
+        the staging table is swapped in and the checkpoint is removed.
+        child_tables (see _stage_child_tables) are swapped in together with it;
+        they are reloaded in full on every run. dropped lists the duplicate
+        rows left out of rows (see _file_signature).
+        """
+        staging_table = f"{table_name}{self.STAGING_SUFFIX}"
+        signature = self._file_signature(json_file_path, column_types, primary_key, dropped)
+        offset = self._open_checkpoint(table_name, json_file_path, staging_table, columns,
+                                       column_types, primary_key, signature)
+        if offset:
+            self.log(f"Resuming {table_name} from checkpoint at record {offset} of {len(rows)}")
+        
+        if checksum and offset:
+            # Rows committed by the earlier run are part of the final table too
+            checksum.update(rows[:offset])
+        
+        engine = self._select_insert_engine(staging_table, rows, columns)
+        # One sizer for all chunks, so the batch size learned carries over
+        sizer = self._batch_sizer(self.connection, rows, self._batch_step(engine, len(columns) + 1))
+        try:
+            while offset < len(rows):
+                chunk = rows[offset:offset + self.checkpoint_rows]
+                committed = offset + len(chunk)
+                
+                # Rows and checkpoint commit together - like one BEGIN TRAN...COMMIT;
+                # a transient error retries just this chunk (see _insert_chunk)
+                self._insert_chunk(self.connection, staging_table, chunk, columns, offset + 1,
+                                   engine, checksum, sizer,
+                                   after_insert=self._checkpoint_update(table_name, committed))
+                offset = committed
+                self.log(f"Checkpoint: {offset} of {len(rows)} records committed to {staging_table}")
+        except Exception:
+            self.log(f"Checkpoint kept at record {offset} for {table_name} - rerun to resume")
+            raise
+        
+        self._swap_in_staging_table(table_name, staging_table, child_tables)
+        self.cursor.execute(f"DELETE FROM `{self.CHECKPOINT_TABLE}` WHERE table_name = %s", (table_name,))
+        self.log(f"Inserted {len(rows)} records into {table_name}")
+    def _open_checkpoint(self, table_name: str, json_file_path: str, staging_table: str,
+                         columns: List[str], column_types: Dict[str, str],
+                         primary_key: Tuple[str, ...], signature: str) -> int:
+        """
+        Rows of a file already committed to its staging table by a failed run.
+        
+        A checkpoint only counts when its signature matches (see
+        _file_signature) and the staging table still exists. Otherwise the
+        staging table is created afresh, a new checkpoint at row 0 is
+        recorded, and 0 is returned.
+        """
+        self._ensure_checkpoint_table()
+        self.cursor.execute(
+            f"SELECT file_signature, rows_committed FROM `{self.CHECKPOINT_TABLE}` WHERE table_name = %s",
+            (table_name,)
+        )
+        checkpoint = self.cursor.fetchone()
+        if checkpoint and checkpoint[0] == signature and self._table_exists(staging_table):
+            return checkpoint[1]
+        
+        self._create_table(self.cursor, staging_table, columns, column_types, primary_key)
+        self.cursor.execute(
+            f"REPLACE INTO `{self.CHECKPOINT_TABLE}` "
+            "(table_name, source_file, file_signature, rows_committed) VALUES (%s, %s, %s, 0)",
+            (table_name, str(json_file_path), signature)
+        )
+        self.connection.commit()
+        return 0
+    def _checkpoint_update(self, table_name: str, committed: int):
+        """after_insert function for _insert_chunk that moves the checkpoint to committed rows."""
+        def update_checkpoint(connection):
+            cursor = connection.cursor()
+            try:
+                cursor.execute(
+                    f"UPDATE `{self.CHECKPOINT_TABLE}` SET rows_committed = %s "
+                    "WHERE table_name = %s",
+                    (committed, table_name)
+                )
+            finally:
+                cursor.close()
+        return update_checkpoint
+    def _should_stream(self, json_file_path: str, source_path: str) -> bool:
+        """True when a file is large enough for the two-pass streaming import."""
+        if self.stream_min_bytes is None or os.path.getsize(source_path) < self.stream_min_bytes:
+            return False
+        if self.flatten:
+            # Child tables and their parent ids need all of the file's rows at once
+            self.log(f"Loading {Path(json_file_path).name} in memory rather than streaming it "
+                     f"(flatten needs all of its rows)")
+            return False
+        # Consolidated exception files need all their rows for EntityType tagging
+        return not (self.consolidate and self._file_entity(json_file_path))
+    def _streaming_insert_json_data(self, table_name: str, json_file_path: str, source_path: str,
+                                    json_profile: Optional[JsonPathProfile] = None,
+                                    stream: Optional[SharedFileStream] = None
+                                    ) -> Tuple[int, List[str], Optional[RowChecksum],
+                                               Optional[JsonPathProfile], Optional[List], List[int]]:
+        """
+        Import a file larger than memory in two passes over the file.
+        
+        Pass one streams every record into a TableProfile, which keeps only
+        column statistics, to infer the schema and count the rows; it also
+        collects the key values for the duplicate check, which runs before
+        anything is loaded (see _profile_stream). Pass two streams the file
+        again (see _stream_rows) and inserts STREAM_CHUNK_ROWS rows at a time
+        into a staging table, which is swapped in at the end. Beyond the keys,
+        only a few chunks of rows are held in memory. A json_profile is fed
+        in pass one.
+        
+        The chunks load the way a file held in memory does: with
+        checkpoint_rows each chunk commits together with its checkpoint and a
+        failed run resumes after the last one (see _open_checkpoint); without
+        it, load_workers > 1 inserts the chunks of a large file over several
+        connections (see ChunkLoadPool). Every chunk is committed on its own
+        and retried on transient errors (see _insert_chunk).
+        
+        In a fan-out, stream is shared by all target databases: both passes
+        read the file once for all of them (see SharedFileStream), and every
+        target gets the result of the one pass one.
+        
+        Returns:
+            Tuple of (rows loaded, columns, checksum or None, json_profile,
+            keys and duplicate row indexes from the duplicate check)
+        """
+        started = time.perf_counter()
+        file_size = os.path.getsize(source_path)
+        self.log(f"Streaming {Path(json_file_path).name} ({file_size / (1024 * 1024):,.0f} MB) "
+                 f"in two passes instead of loading it into memory")
+        
+        # Pass 1: schema, row count and the duplicate check - run as the
+        # importer the file belongs to, which has the duplicate tracker
+        owner = stream.owner if stream else self
+        read_profile = partial(owner._profile_stream, table_name, source_path, json_profile)
+        profile, json_profile, keys, duplicates, dropped = (stream.profile(read_profile) if stream
+                                                            else read_profile())
+        if not profile.rows:
+            return 0, [], None, json_profile, None, []
+        
+        columns = profile.columns
+        column_types = profile.column_types()
+        expected = profile.rows - len(dropped)
+        self.phase_seconds['parse'] = time.perf_counter() - started
+        self.log(f"Pass 1: {profile.rows} records, columns for {table_name}: {columns}")
+        
+        primary_key = self._natural_primary_key(table_name, column_types, profile.value_count, profile.rows)
+        if primary_key:
+            self.log(f"Clustering {table_name} on {', '.join(primary_key)} "
+                     f"(rows sorted in runs of {self.SORT_RUN_ROWS:,} and merged)")
+        
+        staging_table = f"{table_name}{self.STAGING_SUFFIX}"
+        resume_at = 0
+        if self.checkpoint_rows:
+            signature = self._file_signature(json_file_path, column_types, primary_key, dropped)
+            resume_at = self._open_checkpoint(table_name, json_file_path, staging_table, columns,
+                                              column_types, primary_key, signature)
+            if resume_at:
+                self.log(f"Resuming {table_name} from checkpoint at record {resume_at} of {expected}")
+        else:
+            self._create_table(self.cursor, staging_table, columns, column_types, primary_key)
+            self.connection.commit()
+        checksum = RowChecksum.for_columns(columns, column_types) if self.verify else None
+        json_positions = [i for i, column in enumerate(columns) if column_types[column] == 'JSON']
+        float_text_positions = [i for i, column in enumerate(columns)
+                                if profile.stats[column].stores_float_as_text()]
+        chunk_rows = (min(self.checkpoint_rows, self.STREAM_CHUNK_ROWS) if self.checkpoint_rows
+                      else self.STREAM_CHUNK_ROWS)
+        
+        # Pass 2: decode again and insert chunk by chunk (in key order with a
+        # natural key - sorted on disk, see _external_sort)
+        def read_chunks():
+            rows = self._stream_rows(source_path, columns)
+            if dropped:
+                rows = (row for i, row in enumerate(rows) if i not in dropped)
+            if primary_key:
+                sort_key = _natural_sort_key([columns.index(key) for key in primary_key],
+                                             [column_types[key] for key in primary_key])
+                rows = _unique_sorted(_external_sort(rows, sort_key, self.SORT_RUN_ROWS), sort_key)
+            while True:
+                chunk = list(islice(rows, chunk_rows))
+                if not chunk:
+                    return
+                _encode_json_values(chunk, json_positions)
+                _encode_float_text(chunk, float_text_positions)
+                yield chunk
+        
+        engine = None
+        sizer = None
+        pool = None
+        loaded = 0
+        try:
+            try:
+                for chunk in (stream.chunks(self, read_chunks) if stream else read_chunks()):
+                    first_id = loaded + 1
+                    loaded += len(chunk)
+                    if loaded <= resume_at:
+                        # Already in staging from the failed run; only checksummed
+                        if checksum:
+                            checksum.update(chunk)
+                        continue
+                    if first_id <= resume_at:
+                        if checksum:
+                            checksum.update(chunk[:resume_at + 1 - first_id])
+                        chunk, first_id = chunk[resume_at + 1 - first_id:], resume_at + 1
+                    
+                    if engine is None:
+                        engine = self._select_insert_engine(staging_table, chunk, columns, expected)
+                        if (not self.checkpoint_rows and self.load_workers > 1
+                                and expected >= self.PARALLEL_LOAD_MIN_ROWS):
+                            pool = ChunkLoadPool(self, staging_table, columns, engine,
+                                                 self.load_workers, checksum)
+                            self.log(f"Loading {table_name} over {self.load_workers} connections")
+                        else:
+                            sizer = self._batch_sizer(self.connection, chunk,
+                                                      self._batch_step(engine, len(columns) + 1))
+                    if pool:
+                        pool.submit(chunk, first_id)
+                    else:
+                        # With checkpoints, rows and checkpoint commit together
+                        self._insert_chunk(self.connection, staging_table, chunk, columns, first_id,
+                                           engine, checksum, sizer,
+                                           after_insert=(self._checkpoint_update(table_name, loaded)
+                                                         if self.checkpoint_rows else None))
+                if pool:
+                    pool.finish()
+            finally:
+                if pool:
+                    pool.close()
+        except Exception:
+            if self.checkpoint_rows:
+                self.log(f"Checkpoint kept for {table_name} - rerun to resume")
+            else:
+                self.cursor.execute(f"DROP TABLE IF EXISTS `{staging_table}`")
+            raise
+        
+        if loaded != expected:
+            self.cursor.execute(f"DROP TABLE IF EXISTS `{staging_table}`")
+            raise ValueError(f"File changed while importing: pass 1 read {expected} records, "
+                             f"pass 2 read {loaded}")
+        
+        self._swap_in_staging_table(table_name, staging_table)
+        if self.checkpoint_rows:
+            self.cursor.execute(f"DELETE FROM `{self.CHECKPOINT_TABLE}` WHERE table_name = %s",
+                                (table_name,))
+        self.log(f"Inserted {loaded} records into {table_name}")
+        return loaded, columns, checksum, json_profile, keys, duplicates
+    def _profile_stream(self, table_name: str, source_path: str,
+                        json_profile: Optional[JsonPathProfile] = None
+                        ) -> Tuple[TableProfile, Optional[JsonPathProfile], Optional[List],
+                                   List[int], set]:
+        """
+        Pass one of a streaming import (see _streaming_insert_json_data).
+        
+        Large JSON Lines files are profiled in parallel byte ranges, one
+        worker process each, as _read_ndjson_file parses them - unless a
+        json_profile needs to see the records in file order. Only the key
+        columns of each record are kept, and the duplicate check (see
+        _find_duplicate_keys) runs on them once the whole file is read.
+        
+        Returns:
+            Tuple of (TableProfile, json_profile, keys and duplicate row
+            indexes from the duplicate check, set of row indexes that pass two
+            leaves out - the duplicates with on_duplicate='dedupe')
+        """
+        key_columns = self.duplicate_keys + ('EntityType',) if self.duplicate_tracker else ()
+        profile = TableProfile()
+        key_rows: List[tuple] = []
+        workers = os.cpu_count() or 1
+        if (Path(source_path).suffix.lower() in self.NDJSON_EXTENSIONS and json_profile is None
+                and workers > 1 and os.path.getsize(source_path) >= self.NDJSON_PARALLEL_MIN_BYTES):
+            ranges = self._split_ndjson_ranges(source_path, workers)
+            self.log(f"Profiling {Path(source_path).name} in {len(ranges)} parallel range(s)")
+            with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+                futures = [executor.submit(_profile_ndjson_range, source_path, start, end, key_columns)
+                           for start, end in ranges]
+                # Merged in file order, so key row i is the file's record i
+                for future in futures:
+                    range_profile, range_keys = future.result()
+                    profile.merge(range_profile)
+                    key_rows.extend(range_keys)
+        else:
+            for record in _iter_json_records(source_path, json.JSONDecoder()):
+                profile.add(record)
+                if json_profile:
+                    json_profile.add(record)
+                if key_columns:
+                    key_rows.append(tuple(map(record.get, key_columns)))
+        
+        keys, duplicates = None, []
+        if key_columns and profile.rows:
+            # Only the key columns the file has, as a file held in memory has them
+            present = [i for i, column in enumerate(key_columns) if column in profile.stats]
+            if len(present) < len(key_columns):
+                key_rows = [tuple([row[i] for i in present]) for row in key_rows]
+            with self._tracker_lock:
+                keys, duplicates = self._find_duplicate_keys(
+                    table_name, [key_columns[i] for i in present], key_rows)
+        dropped = set(duplicates) if self.on_duplicate == 'dedupe' else set()
+        if dropped:
+            self.log(f"Dropping {len(dropped)} duplicate row(s) while loading, "
+                     f"keeping the first occurrence")
+        return profile, json_profile, keys, duplicates, dropped
+    def _stream_rows(self, source_path: str, columns: List[str]):
+        """
+        Pass two of a streaming import: the file's rows, as tuples aligned to
+        columns, in file order.
+        
+        Large JSON Lines files are decoded STREAM_RANGE_BYTES at a time by
+        worker processes, at most one range per worker ahead of the rows
+        handed out, so decoding keeps pace with several loading connections.
+        """
+        workers = os.cpu_count() or 1
+        file_size = os.path.getsize(source_path)
+        if (Path(source_path).suffix.lower() not in self.NDJSON_EXTENSIONS or workers < 2
+                or file_size < self.NDJSON_PARALLEL_MIN_BYTES):
+            decoder = _json_decoder(self.intern_values)
+            for record in _iter_json_records(source_path, decoder):
+                yield tuple(map(record.get, columns))
+            return
+        
+        ranges = self._split_ndjson_ranges(source_path,
+                                           max(workers, -(-file_size // self.STREAM_RANGE_BYTES)))
+        self.log(f"Decoding {Path(source_path).name} in {len(ranges)} ranges over {workers} processes")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for start, end in ranges:
+                pending.append(executor.submit(_ndjson_range_rows, source_path, start, end,
+                                               columns, self.intern_values))
+                if len(pending) >= workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+    def _natural_primary_key(self, table_name: str, column_types: Dict[str, str],
+                             value_counts: Dict[str, int], row_count: int) -> Tuple[str, ...]:
+        """
+        natural_key if it can be this table's primary key, else ().
+        
+        Every key column must be present, of a NATURAL_KEY_TYPES type and
+        never null (value_counts: non-null values per column, out of
+        row_count). Otherwise the table keeps the id primary key and the
+        reason is logged. Uniqueness is checked once the rows are sorted.
+        """
+        if not self.natural_key:
+            return ()
+        problems = []
+        for key in self.natural_key:
+            if key not in column_types:
+                problems.append(f"{key} is missing")
+            elif column_types[key] not in self.NATURAL_KEY_TYPES:
+                problems.append(f"{key} is {column_types[key]}")
+            elif value_counts.get(key, 0) < row_count:
+                problems.append(f"{key} has nulls")
+        if problems:
+            self.log(f"Natural key not used for {table_name} ({', '.join(problems)}) - keeping id")
+            return ()
+        return self.natural_key
+    def _sort_by_natural_key(self, table_name: str, records: RowBuffer) -> Tuple[str, ...]:
+        """
+        Sort a file's rows by the natural key and return the key, or () if unusable.
+        
+        Inserting in primary key order appends each row at the end of the
+        clustered index instead of splitting pages all over it, the way a
+        clustered index load in SQL Server wants its input sorted. Rows whose
+        keys repeat cannot share a primary key; then the rows stay sorted but
+        the table keeps the id primary key.
+        """
+        if not self.natural_key:
+            return ()
+        column_types = records.column_types()
+        positions = [records.columns.index(key) for key in self.natural_key if key in column_types]
+        value_counts = {records.columns[position]: sum(1 for row in records.rows if row[position] is not None)
+                        for position in positions}
+        primary_key = self._natural_primary_key(table_name, column_types, value_counts, len(records.rows))
+        if not primary_key:
+            return ()
+        
+        sort_key = _natural_sort_key(positions, [column_types[key] for key in primary_key])
+        records.rows.sort(key=sort_key)
+        keys = list(map(sort_key, records.rows))
+        repeated = sum(1 for previous, current in zip(keys, keys[1:]) if previous == current)
+        if repeated:
+            self.log(f"Natural key not used for {table_name} ({repeated} repeated key value(s)) - keeping id")
+            return ()
+        self.log(f"Clustering {table_name} on {', '.join(primary_key)} (rows sorted by key)")
+        return primary_key
+    def _flatten_records(self, table_name: str, records: RowBuffer
+                         ) -> Tuple[RowBuffer, Dict[str, RowBuffer]]:
+        """
+        Flatten a file's nested values (see RecordFlattener).
+        
+        Row i of the file (counting from 1) is loaded with the explicit id i on
+        every load path, so that is the parent_id its child rows get.
+        
+        Returns:
+            Tuple of (flattened records, child table buffers by table name)
+        """
+        if not any(stats.has_nested for stats in records.stats):
+            return records, {}
+        
+        flattener = RecordFlattener()
+        flat = RowBuffer()
+        columns = records.columns
+        for row_id, row in enumerate(records.rows, 1):
+            flat.add(flattener.flatten(dict(zip(columns, row)), table_name, row_id))
+        records.rows = []
+        flat.finalize()
+        
+        children = flattener.finalize()
+        for child_table, child in children.items():
+            self.log(f"Flattened {len(child)} nested records of {table_name} into {child_table}")
+        return flat, children
+    def _check_child_table_names(self, children: Dict[str, RowBuffer], suffix: str = ''):
+        """ValueError, before any table is touched, if a child table name is too long for MySQL."""
+        for child_table in children:
+            if len(child_table + suffix) > self.MAX_TABLE_NAME_CHARS:
+                raise ValueError(f"Child table name {child_table + suffix} is longer than "
+                                 f"{self.MAX_TABLE_NAME_CHARS} characters - shorten the nested "
+                                 f"key or import without flatten")
+    def _create_child_tables(self, children: Dict[str, RowBuffer], suffix: str = ''):
+        """Create the (empty) child tables of a flattened file, parent_id indexed for joins."""
+        for child_table, child in children.items():
+            self._create_table(self.cursor, child_table + suffix, child.columns, child.column_types())
+            self.cursor.execute(f"CREATE INDEX `idx_parent_id` ON `{child_table + suffix}` (`parent_id`)")
+    def _insert_child_rows(self, children: Dict[str, RowBuffer]):
+        """
+        Insert the rows of a flattened file's child tables in the file's transaction.
+        
+        Child rows, like the parent's, get explicit ids 1, 2, ... - the ids
+        RecordFlattener numbered them with and their own children's
+        parent_id - so the links never depend on AUTO_INCREMENT settings
+        (auto_increment_increment / auto_increment_offset).
+        """
+        for child_table, child in children.items():
+            self.insert_json_data(child_table, child.rows, child.columns, first_id=1)
+    def _stage_child_tables(self, children: Dict[str, RowBuffer]):
+        """
+        Load a flattened file's child tables into staging tables of their own.
+        
+        For parents that are loaded through a staging table: the rows are
+        committed in chunks with explicit ids (see _insert_chunk), and the
+        parent's swap renames the child tables in with it, in one atomic
+        RENAME (see _swap_in_staging_table).
+        """
+        self._check_child_table_names(children, self.STAGING_SUFFIX)
+        self._create_child_tables(children, self.STAGING_SUFFIX)
+        self.connection.commit()
+        for child_table, child in children.items():
+            staging_table = f"{child_table}{self.STAGING_SUFFIX}"
+            engine = self._select_insert_engine(staging_table, child.rows, child.columns)
+            for start in range(0, len(child.rows), self.RETRY_CHUNK_ROWS):
+                self._insert_chunk(self.connection, staging_table,
+                                   child.rows[start:start + self.RETRY_CHUNK_ROWS], child.columns,
+                                   start + 1, engine)
+            self.log(f"Inserted {len(child.rows)} records into {staging_table}")
+    def _json_path_profile(self, table_name: str, records: Optional[RowBuffer] = None
+                           ) -> Optional[JsonPathProfile]:
+        """
+        JsonPathProfile for a table when json_indexes is set, else None.
+        
+        When records are given their JSON columns are profiled right away;
+        otherwise the caller feeds the profile (streaming imports).
+        """
+        if self.json_indexes is None:
+            return None
+        profile = JsonPathProfile(self.json_indexes.get(table_name, []),
+                                  self.JSON_INDEX_SAMPLE_ROWS, self.JSON_INDEX_DISTINCT_LIMIT)
+        if records is not None:
+            positions = records.json_positions()
+            if not positions and not profile.paths:
+                return None
+            columns = records.columns
+            for row in records.rows:
+                profile.add({columns[i]: row[i] for i in positions})
+        return profile
+    @staticmethod
+    def _json_path_literal(keys: List[str]) -> str:
+        """SQL string literal of the JSON path for keys, e.g. '$."City"'."""
+        path = '$' + ''.join('."' + key.replace('\\', '\\\\').replace('"', '\\"') + '"' for key in keys)
+        return "'" + path.replace('\\', '\\\\').replace("'", "''") + "'"
+    def _add_json_path_indexes(self, table_name: str, profile: JsonPathProfile):
+        """
+        Index the configured JSON paths of a loaded table, and log suggestions.
+        
+        Each path gets a generated column named like the column flattening
+        would create (Address__City), typed from the values found there, and
+        an index on it. A filter written against that column - or, on MySQL
+        8.0, against the identical JSON expression - becomes an index lookup
+        instead of a JSON_EXTRACT over every row. The JSON column itself is
+        unchanged. JSON null and missing keys give SQL NULL.
+        
+        Runs after the file is committed, so an index that cannot be added
+        is logged and skipped; the loaded rows stand.
+        """
+        for path, keys in profile.paths.items():
+            stats = profile.stats[path]
+            column_type = profile.column_type(path)
+            if not stats.has_value or column_type == 'JSON':
+                self.log(f"JSON index on {table_name}.{path} skipped - no scalar values at that path")
+                continue
+            
+            generated = RecordFlattener.SEPARATOR.join(keys)
+            extracted = f"JSON_EXTRACT(`{keys[0]}`, {self._json_path_literal(keys[1:])})"
+            value = f"JSON_UNQUOTE({extracted})"
+            if column_type == 'BOOLEAN':
+                value = f"({value} = 'true')"
+            expression = f"CASE WHEN JSON_TYPE({extracted}) = 'NULL' THEN NULL ELSE {value} END"
+            # TEXT can only be indexed on a prefix
+            prefix = '(255)' if column_type == 'TEXT' else ''
+            
+            started = time.perf_counter()
+            try:
+                self.cursor.execute(
+                    f"ALTER TABLE `{table_name}` "
+                    f"ADD COLUMN `{generated}` {column_type} GENERATED ALWAYS AS ({expression}) "
+                    f"{self.generated_columns}, "
+                    f"ADD INDEX `idx_{generated}` (`{generated}`{prefix})"
+                )
+            except mysql.connector.Error as e:
+                self.log(f"JSON index on {table_name}.{path} could not be added: {e}")
+                continue
+            self.log(f"Indexed JSON path {path} of {table_name} as {generated} {column_type} "
+                     f"({time.perf_counter() - started:.1f}s)")
+        
+        suggestions = profile.suggestions(self.JSON_INDEX_MIN_PRESENCE, self.JSON_INDEX_MIN_SELECTIVITY)
+        if suggestions:
+            listed = ', '.join(f"{path} ({selectivity:.0%} distinct)" for path, selectivity in suggestions[:5])
+            self.log(f"JSON paths of {table_name} worth indexing: {listed}")
+    def _lookup_loaded_keys(self, entity: str, tables: List[str], keys: List[Tuple]) -> set:
+        """
+        Which of the given (entity, key values...) keys are already in the tables.
+        
+        Used to verify Bloom filter hits against files loaded earlier in the
+        run - an indexed-style IN lookup of just the candidates. The keys are
+        normalized (see DuplicateKeyTracker), and so are the values found, so
+        they compare the way the column's collation matched them.
+        """
+        key_columns = self.duplicate_keys
+        found = set()
+        for table_name in tables:
+            table_columns = self._table_columns(table_name)
+            where_entity = "`EntityType` = %s AND " if 'EntityType' in table_columns else ""
+            select = ', '.join(f"CAST(`{column}` AS CHAR)" for column in key_columns)
+            target = '(' + ', '.join(f"`{column}`" for column in key_columns) + ')'
+            for start in range(0, len(keys), self.INSERT_BATCH_SIZE):
+                chunk = keys[start:start + self.INSERT_BATCH_SIZE]
+                row_placeholder = '(' + ', '.join(['%s'] * len(key_columns)) + ')'
+                query = (f"SELECT {select} FROM `{table_name}` WHERE {where_entity}"
+                         f"{target} IN ({', '.join([row_placeholder] * len(chunk))})")
+                params = ([entity] if where_entity else []) + [value for key in chunk for value in key[1:]]
+                self.cursor.execute(query, params)
+                found.update((entity,) + tuple(map(_collation_key, row))
+                             for row in self.cursor.fetchall())
+        return found
+    def _check_duplicate_keys(self, table_name: str, records: RowBuffer) -> Tuple[Optional[List], List[int]]:
+        """
+        Check a parsed file for repeated keys (see _find_duplicate_keys).
+        
+        With on_duplicate='dedupe' the repeated rows are dropped from records.
+        """
+        keys, duplicates = self._find_duplicate_keys(table_name, records.columns, records.rows)
+        if duplicates and self.on_duplicate == 'dedupe':
+            skip = set(duplicates)
+            records.rows = [row for i, row in enumerate(records.rows) if i not in skip]
+            self.log(f"Dropped {len(duplicates)} duplicate row(s), keeping the first occurrence")
+        return keys, duplicates
+    def _find_duplicate_keys(self, table_name: str, columns: List[str], rows: List[tuple]
+                             ) -> Tuple[Optional[List], List[int]]:
+        """
+        Check a file's rows for repeated keys before anything is loaded.
+        
+        rows need only hold the key columns (and EntityType). Duplicates are
+        logged, and with on_duplicate='reject' the file is refused
+        (ValueError). Returns the row keys and the indexes of the duplicate
+        rows.
+        """
+        tracker = self.duplicate_tracker
+        mode = tracker.mode
+        keys, duplicates, earlier = tracker.find_duplicates(
+            table_name, columns, rows, self._lookup_loaded_keys
+        )
+        if keys is None:
+            return None, []
+        if mode != tracker.mode:
+            self.log(f"Over {self.EXACT_KEY_LIMIT:,} keys tracked - "
+                     f"switched duplicate-key check to a Bloom filter")
+        if not duplicates:
+            return keys, []
+        
+        # Keys are normalized - the examples show the values as in the file
+        key_names = ', '.join(self.duplicate_keys)
+        positions = [columns.index(column) for column in self.duplicate_keys]
+        examples = ', '.join('/'.join(str(rows[i][position]) for position in positions)
+                             for i in duplicates[:5])
+        self.log(f"{len(duplicates)} duplicate {key_names} value(s) in {table_name} "
+                 f"({len(duplicates) - earlier} within the file, {earlier} already loaded "
+                 f"from earlier files), e.g. {examples}")
+        
+        if self.on_duplicate == 'reject':
+            raise ValueError(f"{len(duplicates)} duplicate {key_names} value(s) - file rejected")
+        return keys, duplicates
+    def _verify_load(self, table_name: str, columns: List[str], checksum: RowChecksum) -> bool:
+        """
+        Compare the loaded table with the count and checksum taken while inserting.
+        
+        Costs one aggregate query on the server instead of a manual COUNT(*)
+        and spot checks. Runs inside the import transaction, so it sees the
+        rows just inserted.
+        """
+        self.cursor.execute(checksum.server_query(table_name, columns))
+        server_count, server_total = self.cursor.fetchone()
+        passed = int(server_count) == checksum.count and int(server_total) == checksum.total
+        
+        if passed:
+            self.log(f"Verified {table_name}: {checksum.count} rows, checksum {checksum.total}")
+        else:
+            self.log(f"VERIFICATION FAILED for {table_name}: expected {checksum.count} rows "
+                     f"(checksum {checksum.total}), table has {server_count} rows "
+                     f"(checksum {server_total})")
+        return passed
+    def _table_exists(self, table_name: str) -> bool:
+        """Check whether a table exists in the current database."""
+        self.cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name = %s",
+            (table_name,)
+        )
+        return self.cursor.fetchone()[0] > 0
+    def _swap_in_staging_table(self, table_name: str, staging_table: str,
+                               child_tables: List[str] = ()):
+        """
+        Replace table_name with a fully loaded staging table.
+        
+        RENAME TABLE with several renames is atomic in MySQL, so readers see
+        either the old table or the new one, never a missing or half-loaded table.
+        child_tables are swapped in from their own <name>__staging tables by
+        the same RENAME, so a parent never appears without its children.
+        """
+        swaps = [(table_name, staging_table)]
+        swaps.extend((child_table, f"{child_table}{self.STAGING_SUFFIX}") for child_table in child_tables)
+        renames = []
+        retired_tables = []
+        for name, staged_table in swaps:
+            retired_table = f"{name}{self.RETIRED_SUFFIX}"
+            self.cursor.execute(f"DROP TABLE IF EXISTS `{retired_table}`")
+            if self._table_exists(name):
+                renames.append(f"`{name}` TO `{retired_table}`")
+                retired_tables.append(retired_table)
+            renames.append(f"`{staged_table}` TO `{name}`")
+        
+        self.cursor.execute(f"RENAME TABLE {', '.join(renames)}")
+        for retired_table in retired_tables:
+            self.cursor.execute(f"DROP TABLE IF EXISTS `{retired_table}`")
+        
+        self.log(f"Swapped loaded data into {', '.join(name for name, _ in swaps)}")
+    def _file_entity(self, json_file_path: str) -> Optional[str]:
+        """Entity of an Alliance_Exception_<entity> file, or None for other files."""
+        stem = Path(json_file_path).stem
+        if stem.startswith(self.EXPORT_FILE_PREFIX) and len(stem) > len(self.EXPORT_FILE_PREFIX):
+            return stem[len(self.EXPORT_FILE_PREFIX):]
+        return None
+    def _tag_entity_rows(self, records: RowBuffer, file_entity: str) -> str:
+        """
+        Make sure every row carries its EntityType, the partitioning column.
+        
+        The entity is the file's single EntityType value, or the one from the
+        file name when the records have none. A file mixing several entities
+        cannot go into one partition and is refused (ValueError).
+        """
+        if 'EntityType' not in records.columns:
+            records._add_column('EntityType')
+            records.stats[-1].add(file_entity)
+            records.rows = [row + (file_entity,) for row in records.rows]
+            records.finalize()
+            return file_entity
+        
+        position = records.columns.index('EntityType')
+        values = {row[position] for row in records.rows} - {None}
+        if len(values) > 1:
+            raise ValueError(f"File holds several EntityType values ({', '.join(sorted(map(str, values)))}) "
+                             f"- cannot load it into one partition")
+        entity = str(values.pop()) if values else file_entity
+        if None in {row[position] for row in records.rows}:
+            records.rows = [row if row[position] is not None
+                            else row[:position] + (entity,) + row[position + 1:]
+                            for row in records.rows]
+        return entity
+    @staticmethod
+    def _partition_name(entity: str) -> str:
+        """Partition holding one entity's rows, e.g. p_case."""
+        return "p_" + re.sub(r'\W', '_', entity)
+    def _widen_column_type(self, current: str, incoming: str) -> str:
+        """Narrowest type (see TYPE_WIDENING_ORDER) that holds both kinds of values."""
+        if current == incoming:
+            return current
+        if current == 'JSON' or incoming == 'JSON':
+            return 'TEXT'
+        order = self.TYPE_WIDENING_ORDER
+        if current not in order or incoming not in order:
+            return current  # Not one of ours - leave the column alone
+        return max(current, incoming, key=order.index)
+    def _unified_column_types(self) -> Dict[str, str]:
+        """Data column types of the unified table (empty if it does not exist)."""
+        self.cursor.execute(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_schema = DATABASE() AND table_name = %s ORDER BY ordinal_position",
+            (self.UNIFIED_TABLE,)
+        )
+        return {name: self.MYSQL_TYPE_NAMES.get(data_type.lower(), data_type.upper())
+                for name, data_type in self.cursor.fetchall() if name != 'id'}
+    def _create_unified_table(self, columns: List[str], column_types: Dict[str, str], entity: str):
+        """
+        Create the unified table with a first partition for one entity.
+        
+        MySQL requires the partitioning column in every unique key, so the
+        primary key is (id, EntityType). The duplicate-key columns are
+        indexed so cross-entity lookups are a single indexed query, pruned
+        to one partition when EntityType is given.
+        """
+        columns_sql = ["id BIGINT AUTO_INCREMENT"]
+        columns_sql.extend([f"`{key}` {column_types[key]}" for key in columns if key != 'EntityType'])
+        columns_sql.append("`EntityType` VARCHAR(255) NOT NULL")
+        columns_sql.append("PRIMARY KEY (id, `EntityType`)")
+        for key in self.duplicate_keys:
+            if column_types.get(key) in ('VARCHAR(255)', 'INT', 'BIGINT'):
+                columns_sql.append(f"KEY `ix_{key}` (`{key}`)")
+        
+        self.cursor.execute(
+            f"CREATE TABLE `{self.UNIFIED_TABLE}` ({', '.join(columns_sql)}) "
+            f"PARTITION BY LIST COLUMNS(`EntityType`) "
+            f"(PARTITION `{self._partition_name(entity)}` VALUES IN (%s))",
+            (entity,)
+        )
+        self.log(f"Created {self.UNIFIED_TABLE}, partitioned by EntityType")
+    def _merge_unified_columns(self, existing: Dict[str, str], columns: List[str],
+                               column_types: Dict[str, str]):
+        """Add the file's new columns to the unified table and widen changed ones."""
+        for key in columns:
+            if key == 'EntityType':
+                continue
+            if key not in existing:
+                self.cursor.execute(
+                    f"ALTER TABLE `{self.UNIFIED_TABLE}` ADD COLUMN `{key}` {column_types[key]}"
+                )
+                self.log(f"Added column {key} {column_types[key]} to {self.UNIFIED_TABLE}")
+                continue
+            widened = self._widen_column_type(existing[key], column_types[key])
+            if widened == existing[key]:
+                continue
+            if widened in ('TEXT', 'JSON'):
+                # TEXT cannot stay in a plain index - drop ours before widening
+                self.cursor.execute(
+                    "SELECT DISTINCT index_name FROM information_schema.statistics "
+                    "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s "
+                    "AND index_name <> 'PRIMARY'",
+                    (self.UNIFIED_TABLE, key)
+                )
+                for (index_name,) in self.cursor.fetchall():
+                    self.cursor.execute(f"ALTER TABLE `{self.UNIFIED_TABLE}` DROP INDEX `{index_name}`")
+            self.cursor.execute(f"ALTER TABLE `{self.UNIFIED_TABLE}` MODIFY COLUMN `{key}` {widened}")
+            self.log(f"Widened {self.UNIFIED_TABLE}.{key} from {existing[key]} to {widened}")
+    def _load_entity_partition(self, entity: str, rows: List[tuple], columns: List[str],
+                               column_types: Dict[str, str],
+                               checksum: Optional[RowChecksum] = None) -> Optional[bool]:
+        """
+        Replace one entity's partition of the unified table with a file's rows.
+        
+        The unified table gets the file's columns merged in (new columns added,
+        types widened) and a partition for the entity if it is new. The rows
+        are loaded into a non-partitioned copy of the table, which is then
+        swapped with the entity's partition by EXCHANGE PARTITION - a metadata
+        operation, so other entities are never touched and readers see either
+        the old or the new rows for this entity.
+        
+        Returns the verification result (None when not verifying).
+        """
+        unified_table = self.UNIFIED_TABLE
+        staging_table = f"{unified_table}{self.STAGING_SUFFIX}"
+        partition = self._partition_name(entity)
+        
+        existing = self._unified_column_types()
+        if not existing:
+            self._create_unified_table(columns, column_types, entity)
+        else:
+            self._merge_unified_columns(existing, columns, column_types)
+            self.cursor.execute(
+                "SELECT COUNT(*) FROM information_schema.partitions "
+                "WHERE table_schema = DATABASE() AND table_name = %s AND partition_name = %s",
+                (unified_table, partition)
+            )
+            if self.cursor.fetchone()[0] == 0:
+                self.cursor.execute(
+                    f"ALTER TABLE `{unified_table}` ADD PARTITION "
+                    f"(PARTITION `{partition}` VALUES IN (%s))",
+                    (entity,)
+                )
+                self.log(f"Added partition {partition} to {unified_table}")
+        
+        # EXCHANGE PARTITION needs an identical, non-partitioned table
+        self.cursor.execute(f"DROP TABLE IF EXISTS `{staging_table}`")
+        self.cursor.execute(f"CREATE TABLE `{staging_table}` LIKE `{unified_table}`")
+        self.cursor.execute(f"ALTER TABLE `{staging_table}` REMOVE PARTITIONING")
+        
+        engine = self._select_insert_engine(staging_table, rows, columns)
+        sizer = self._batch_sizer(self.connection, rows, self._batch_step(engine, len(columns) + 1))
+        for start in range(0, len(rows), self.RETRY_CHUNK_ROWS):
+            self._insert_chunk(self.connection, staging_table, rows[start:start + self.RETRY_CHUNK_ROWS],
+                               columns, start + 1, engine, checksum, sizer)
+        
+        verified = self._verify_load(staging_table, columns, checksum) if checksum else None
+        
+        self.cursor.execute(
+            f"ALTER TABLE `{unified_table}` EXCHANGE PARTITION `{partition}` "
+            f"WITH TABLE `{staging_table}`"
+        )
+        # The staging table now holds the entity's previous rows
+        self.cursor.execute(f"DROP TABLE IF EXISTS `{staging_table}`")
+        self.log(f"Replaced partition {partition} of {unified_table} ({len(rows)} rows)")
+        return verified
+    @classmethod
+    def find_json_files(cls, directory_path: str) -> List[Path]:
+        """
+        List every importable file in a directory.
+        
+        Picks up regular JSON documents (.json) and JSON Lines exports
+        (.jsonl/.ndjson). Files are returned in directory glob order, one
+        pattern after another.
+        """
+        directory = Path(directory_path)
+        json_files = []
+        for pattern in cls.JSON_FILE_PATTERNS:
+            json_files.extend(directory.glob(pattern))
+        return json_files
+    def _split_ndjson_ranges(self, json_file_path: str, parts: int) -> List[Tuple[int, int]]:
+        """
+        Split a JSON Lines file into byte ranges that start on line boundaries.
+        
+        Each range is roughly file_size / parts bytes. The split points are
+        nudged forward to the next newline so that no record straddles two
+        ranges and every worker can parse its range independently.
+        """
+        file_size = os.path.getsize(json_file_path)
+        chunk_size = max(1, file_size // parts)
+        
+        boundaries = [0]
+        with open(json_file_path, 'rb') as f:
+            for i in range(1, parts):
+                target = i * chunk_size
+                if target <= boundaries[-1]:
+                    continue
+                f.seek(target - 1)
+                # If target-1 is a newline, target already starts a line;
+                # otherwise readline() consumes the rest of the partial line
+                f.readline()
+                boundary = f.tell()
+                if boundary >= file_size:
+                    break
+                if boundary > boundaries[-1]:
+                    boundaries.append(boundary)
+        boundaries.append(file_size)
+        
+        return [(boundaries[i], boundaries[i + 1]) for i in range(len(boundaries) - 1)]
+    def _read_ndjson_file(self, json_file_path: str) -> RowBuffer:
+        """
+        Read a JSON Lines (NDJSON) file: one JSON record per line.
+        
+        Small files are parsed line by line in this process. Large files are
+        split at newline boundaries into byte ranges, each range is parsed by
+        its own worker process, and the per-range buffers are merged in file
+        order so the rows load exactly as they appear in the file.
+        
+        Note: Worker processes (not threads) are used because JSON parsing is
+        CPU bound and threads would serialize on Python's GIL.
+        """
+        file_size = os.path.getsize(json_file_path)
+        workers = os.cpu_count() or 1
+        
+        if file_size < self.NDJSON_PARALLEL_MIN_BYTES or workers < 2:
+            return _parse_ndjson_range(json_file_path, 0, file_size, self.intern_values)
+        
+        ranges = self._split_ndjson_ranges(json_file_path, workers)
+        self.log(f"Parsing {Path(json_file_path).name} in {len(ranges)} parallel range(s)")
+        
+        records = RowBuffer()
+        with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+            futures = [
+                executor.submit(_parse_ndjson_range, json_file_path, start, end, self.intern_values)
+                for start, end in ranges
+            ]
+            # Merge in submission order to preserve the original record order
+            for future in futures:
+                records.merge(future.result())
+        return records
+    def _load_json_records(self, json_file_path: str) -> RowBuffer:
+        """
+        Load the records of a JSON or JSON Lines file as compact rows.
+        
+        A single object becomes a one-row buffer; empty files, empty arrays and
+        empty objects produce an empty buffer. The returned buffer is finalized
+        (columns sorted, rows padded to full width).
+        """
+        if Path(json_file_path).suffix.lower() in self.NDJSON_EXTENSIONS:
+            records = self._read_ndjson_file(json_file_path)
+        else:
+            with open(json_file_path, 'r', encoding='utf-8') as f:
+                json_data = _json_decoder(self.intern_values).decode(f.read())
+            
+            # Normalize to list format (convert single object to list)
+            if isinstance(json_data, dict):
+                json_data = [json_data] if json_data else []
+            
+            records = RowBuffer()
+            if json_data:
+                # Dicts are released one by one as they become tuples
+                records.add_records(json_data)
+        
+        records.finalize()
+        return records
+    @staticmethod
+    def is_network_path(path: str) -> bool:
+        """
+        Check whether a path is on a network share.
+        
+        Recognizes UNC paths (\\\\server\\share) everywhere and, on Windows,
+        mapped network drive letters.
+        """
+        path = str(path)
+        if path.startswith('\\\\') or path.startswith('//'):
+            return True
+        if sys.platform == 'win32':
+            import ctypes
+            drive = os.path.splitdrive(os.path.abspath(path))[0]
+            DRIVE_REMOTE = 4
+            return bool(drive) and ctypes.windll.kernel32.GetDriveTypeW(drive + '\\') == DRIVE_REMOTE
+        return False
+    def import_json_file(self, json_file_path: str, read_path: Optional[str] = None) -> Tuple[bool, str]:
+        """
+        Import a single JSON or JSON Lines file into a MySQL table.
+        
+        This method wraps the entire import process in a transaction.
+        If anything fails, all changes are rolled back automatically.
+        Whatever the outcome, the attempt is recorded in RUN_HISTORY_TABLE
+        (see _record_import_run). With targets added (see add_target) the file
+        is imported into every target database at once.
+        
+        Args:
+            json_file_path: Full path to JSON file
+            read_path: Optional local copy to read the data from (see
+                FilePrefetcher); names and messages still use json_file_path
+        
+        Returns:
+            Tuple of (success: bool, message: str)
+        
+        Transaction behavior: a file's rows are all-or-nothing, like
+        BEGIN TRAN...COMMIT/ROLLBACK, but MySQL commits DDL on its own. Small
+        files drop and create their tables (committed) and then insert in
+        one transaction, so a failure leaves the table empty. Staged loads
+        (parallel, checkpointed and streamed files) commit into staging
+        tables and replace the real tables by one atomic RENAME at the end,
+        so a failure leaves them as they were. JSON path indexes and the
+        run history are written after the commit.
+        """
+        if self.targets:
+            return self._import_fan_out(json_file_path, read_path)
+        return self._import_with_history(json_file_path, read_path)
+    def _import_with_history(self, json_file_path: str, read_path: Optional[str],
+                             shared: Optional[SharedFileParse] = None) -> Tuple[bool, str]:
+        """Import one file into this importer's database and record the attempt."""
+        started_at = datetime.datetime.now()
+        self.batch_history = []
+        self.file_engine = None
+        self.phase_seconds = {}
+        
+        try:
+            success, message = self._import_json_file(json_file_path, read_path, shared)
+        finally:
+            self._close_prepared_inserts()
+        if self.record_history:
+            self._record_import_run(json_file_path, read_path or json_file_path,
+                                    started_at, success, message)
+        return success, message
+    def add_target(self, host: str, user: str, password: str, database: str,
+                   port: int = 3306) -> 'JSONtoMySQL':
+        """
+        Also import every file into another database (fan-out).
+        
+        With targets added, each file is parsed and its schema inferred once,
+        and the same rows are loaded into this importer's database and every
+        target in parallel - each over its own connection, in its own per-file
+        transaction, with its own verification and run history (see
+        _import_fan_out). Targets use this importer's settings; the duplicate
+        check depends only on the files, so it runs once, here.
+        
+        Returns:
+            The target's importer (closed by close())
+        """
+        target = self._clone(host, user, password, database, port)
+        target.log_prefix = f"[{target.target_label}] "
+        self.targets.append(target)
+        return target
+    def _clone(self, host: str, user: str, password: str, database: str, port: int,
+               pool: Optional[ConnectionPool] = None) -> 'JSONtoMySQL':
+        """New importer with this importer's settings and run id, without a duplicate check."""
+        clone = JSONtoMySQL(
+            host, user, password, database, port, status_callback=self.status_callback,
+            load_workers=self.load_workers, checkpoint_rows=self.checkpoint_rows, pool=pool,
+            insert_engine=self.insert_engine, intern_values=self.intern_values,
+            verify=self.verify, duplicate_keys=None, consolidate=self.consolidate,
+            stream_min_bytes=self.stream_min_bytes, flatten=self.flatten,
+            json_indexes=self.json_indexes, generated_columns=self.generated_columns,
+            record_history=self.record_history, natural_key=self.natural_key
+        )
+        clone.run_id = self.run_id
+        return clone
+    def _file_worker(self, number: int) -> 'JSONtoMySQL':
+        """
+        Another importer on this database, for loading files side by side.
+        
+        It has its own connection (from the pool, if any) and shares this
+        importer's duplicate-key tracker under _tracker_lock, so keys are
+        still checked across files. Files that are loading at the same time
+        are not checked against each other, though: a file's keys are only
+        added to the tracker once it commits.
+        """
+        worker = self._clone(**self._connect_args, pool=self.pool)
+        worker.duplicate_keys = self.duplicate_keys
+        worker.on_duplicate = self.on_duplicate
+        worker.duplicate_tracker = self.duplicate_tracker
+        worker._tracker_lock = self._tracker_lock
+        worker.log_prefix = f"[file worker {number}] "
+        return worker
+    def _import_fan_out(self, json_file_path: str, read_path: Optional[str]) -> Tuple[bool, str]:
+        """
+        Import one file into this database and every target at the same time.
+        
+        The file is parsed once (SharedFileParse) and each importer loads the
+        shared rows from its own thread, so the run takes about as long as the
+        slowest single target instead of the sum of all of them. Streamed
+        files are read once for all targets too (SharedFileStream).
+        
+        Returns:
+            Tuple of (True if every target imported the file, message); the
+            per-target results are kept in target_results
+        """
+        importers = [self] + self.targets
+        stream = SharedFileStream(importers)
+        shared = SharedFileParse(partial(self._prepare_file, json_file_path, read_path or json_file_path),
+                                 stream)
+        
+        def import_into(importer: 'JSONtoMySQL') -> Tuple[bool, str]:
+            try:
+                return importer._import_with_history(json_file_path, read_path, shared)
+            finally:
+                stream.leave(importer)  # Never keep the shared reader waiting
+        
+        with ThreadPoolExecutor(max_workers=len(importers)) as executor:
+            results = list(executor.map(import_into, importers))
+        
+        self.target_results = {importer.target_label: result for importer, result in zip(importers, results)}
+        failures = [f"[{label}] {message}" for label, (success, message) in self.target_results.items()
+                    if not success]
+        if failures:
+            return False, '; '.join(failures)
+        return True, f"{results[0][1]} into {len(importers)} databases"
+    def _import_json_file(self, json_file_path: str, read_path: Optional[str],
+                          shared: Optional['SharedFileParse'] = None) -> Tuple[bool, str]:
+        """
+        The import itself (see import_json_file).
+        
+        In a fan-out, shared is the file's SharedFileParse, so it is parsed
+        once for all target databases rather than once per target.
+        """
+        table_name = Path(json_file_path).stem
+        started = time.perf_counter()
+        
+        try:
+            source_path = read_path or json_file_path
+            if self._should_stream(json_file_path, source_path):
+                # Too large to hold in memory: two streaming passes
+                row_count, columns, checksum, json_profile, keys, duplicates = \
+                    self._streaming_insert_json_data(table_name, json_file_path, source_path,
+                                                     self._json_path_profile(table_name),
+                                                     shared.stream if shared else None)
+                if not row_count:
+                    msg = f"Skipped {json_file_path} - File is empty or contains no data"
+                    self.log(msg)
+                    return False, msg
+                self.phase_seconds['load'] = (time.perf_counter() - started
+                                              - self.phase_seconds['parse'])
+                return self._finish_import(json_file_path, table_name, row_count, columns,
+                                           checksum, keys=keys, duplicates=duplicates,
+                                           started=started, json_profile=json_profile)
+            
+            # Parsed here, or by whichever importer of a fan-out got there first
+            prepared = shared.get() if shared else self._prepare_file(json_file_path, source_path)
+            
+            # Handle empty files or empty arrays
+            if prepared is None:
+                msg = f"Skipped {json_file_path} - File is empty or contains no data"
+                self.log(msg)
+                return False, msg
+            
+            table_name = prepared['table']
+            entity = prepared['entity']
+            rows = prepared['records'].rows
+            columns = prepared['records'].columns
+            column_types = prepared['records'].column_types()
+            
+            parsed = time.perf_counter()
+            self.phase_seconds['parse'] = parsed - started
+            
+            # Row count and checksum are accumulated as the rows are inserted
+            checksum = RowChecksum.for_columns(columns, column_types) if self.verify else None
+            
+            # Flattened child tables are created (DDL commits implicitly in
+            # MySQL) or staged before any of the parent's rows are inserted,
+            # so one commit - or one swap - covers the parent and its children
+            children = prepared['children']
+            parallel = self.load_workers > 1 and len(rows) >= self.PARALLEL_LOAD_MIN_ROWS
+            staged = bool(self.checkpoint_rows) or parallel
+            if children and staged:
+                self._stage_child_tables(children)
+            elif children:
+                self._check_child_table_names(children)
+                self._create_child_tables(children)
+            
+            verified = None
+            if entity is not None:
+                verified = self._load_entity_partition(entity, rows, columns, column_types, checksum)
+            elif self.checkpoint_rows:
+                # Resumable mode: chunked commits into staging with a checkpoint
+                # (see _resumable_insert_json_data)
+                self._resumable_insert_json_data(table_name, json_file_path, rows,
+                                                 columns, column_types, checksum,
+                                                 prepared['primary_key'], list(children),
+                                                 prepared['duplicates'])
+            elif parallel:
+                # Large file: load row ranges over several connections into a
+                # staging table, then swap it in (see _parallel_insert_json_data)
+                self._parallel_insert_json_data(table_name, rows, columns, column_types, checksum,
+                                                prepared['primary_key'], list(children))
+            else:
+                # Create table with the inferred schema and insert the rows
+                # (retried as a whole on transient errors); with children the
+                # ids are explicit, as their parent_id values expect
+                self._create_and_insert(table_name, rows, columns, column_types, checksum,
+                                        prepared['primary_key'], 1 if children else None)
+                if children:
+                    self._insert_child_rows(children)
+            
+            self.phase_seconds['load'] = time.perf_counter() - parsed
+            
+            return self._finish_import(json_file_path, table_name, len(rows), columns, checksum,
+                                       verified, prepared['keys'], prepared['duplicates'], started,
+                                       prepared['json_profile'])
+            
+        except json.JSONDecodeError as e:
+            # Roll back any partial changes
+            self._rollback_failed_file()
+            error_msg = f"Skipped {json_file_path} - Invalid JSON format: {str(e)}"
+            self.log(error_msg)
+            return False, error_msg
+            
+        except Exception as e:
+            # Roll back any partial changes
+            self._rollback_failed_file()
+            error_msg = f"ERROR importing {json_file_path}: {str(e)}"
+            self.log(error_msg)
+            return False, error_msg
+    def _rollback_failed_file(self):
+        """
+        Roll back a failed file without letting a dead connection end the run.
+        
+        When the connection was lost (retries ran out, or a reconnect failed)
+        the rollback raises as well - the server has already discarded the
+        transaction. The connection is then re-established once (see
+        _recover_connection) so the next file can load; if that fails too it
+        is only logged, and each following file fails on its own.
+        """
+        try:
+            self.connection.rollback()
+        except Exception as e:
+            try:
+                self._recover_connection(self.connection, e, 1, "rollback")
+            except Exception as reconnect_error:
+                self.log(f"Could not re-establish the database connection: {reconnect_error}")
+    def _prepare_file(self, json_file_path: str, source_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Parse a file and get its rows ready to load, or None if it has none.
+        
+        Everything here depends only on the file, not on the target database,
+        so in a fan-out it runs once and its result is loaded into every
+        target; the rows must not be modified afterwards.
+        
+        Returns:
+            Dictionary with 'table' (the target table), 'entity' (consolidation
+            mode), 'records' (finalized RowBuffer, JSON values encoded),
+            'children' (flattened child tables), 'json_profile', and 'keys' /
+            'duplicates' from the duplicate check, and 'primary_key' (natural
+            key columns, or () for the id column)
+        """
+        table_name = Path(json_file_path).stem
+        
+        # Read and parse JSON (or JSON Lines) file straight into compact
+        # rows; the schema is inferred while parsing
+        records = self._load_json_records(source_path)
+        if not records.rows:
+            return None
+        
+        # Consolidation mode: exception files go into the entity's partition
+        # of the unified table, so every row must carry its EntityType
+        entity = self._file_entity(json_file_path) if self.consolidate else None
+        if entity is not None:
+            entity = self._tag_entity_rows(records, entity)
+            table_name = self.UNIFIED_TABLE
+        
+        # Repeated keys are found before loading (see DuplicateKeyTracker)
+        keys, duplicates = None, []
+        if self.duplicate_tracker:
+            with self._tracker_lock:
+                keys, duplicates = self._check_duplicate_keys(table_name, records)
+        
+        # Natural key: put the rows in key order now, so the ids (and the
+        # parent_ids of flattened children) follow the order they load in
+        primary_key = () if entity is not None else self._sort_by_natural_key(table_name, records)
+        
+        # Flatten after any dedupe and sorting, so parent ids match the rows loaded
+        children = {}
+        if self.flatten and entity is None:
+            records, children = self._flatten_records(table_name, records)
+        json_profile = None if entity is not None else self._json_path_profile(table_name, records)
+        _encode_json_values(records.rows, records.json_positions())
+        _encode_float_text(records.rows, records.float_text_positions())
+        for child in children.values():
+            _encode_json_values(child.rows, child.json_positions())
+            _encode_float_text(child.rows, child.float_text_positions())
+        
+        return {'table': table_name, 'entity': entity, 'records': records, 'children': children,
+                'json_profile': json_profile, 'keys': keys, 'duplicates': duplicates,
+                'primary_key': primary_key}
+    def _finish_import(self, json_file_path: str, table_name: str, row_count: int, columns: List[str],
+                       checksum: Optional[RowChecksum], verified: Optional[bool] = None,
+                       keys: Optional[List] = None, duplicates: List[int] = (),
+                       started: float = 0.0,
+                       json_profile: Optional[JsonPathProfile] = None) -> Tuple[bool, str]:
         """
-        Initialize database connection.
+        Verify and commit a loaded file and record its run metrics.
+        
+        Part of import_json_file (runs inside its error handling). The JSON
+        path indexes (json_profile) are added only once the rows are
+        committed and verified: ALTER TABLE commits implicitly, so it must
+        not run while the file's rows are still a transaction that could be
+        rolled back.
         """
-        self.status_callback = status_callback
-        self.connection = mysql.connector.connect(
-            host=host,
-            user=user,
-            password=password,
-            database=database,
-            port=port,
-            connect_timeout=10,
-            autocommit=False  #manage transactions explicitly
+        metrics = {'table': table_name, 'rows': row_count, 'verification': 'skipped',
+                   'seconds': time.perf_counter() - started,
+                   'duplicates': len(duplicates),
+                   'engine': self.file_engine,
+                   'phases': self.phase_seconds,
+                   'batch_curve': self.batch_history}
+        if self.batch_history:
+            best_rows, best_rate = max(self.batch_history, key=lambda batch: batch[1])
+            sizes = [batch[0] for batch in self.batch_history]
+            metrics['best_batch_rows'] = best_rows
+            self.log(f"Batch sizes {min(sizes)}-{max(sizes)} rows "
+                     f"(last {sizes[-1]}), best {best_rate:,.0f} rows/sec at {best_rows} rows")
+        if checksum:
+            if verified is None:
+                verify_started = time.perf_counter()
+                verified = self._verify_load(table_name, columns, checksum)
+                self.phase_seconds['verify'] = time.perf_counter() - verify_started
+            metrics['verification'] = 'passed' if verified else 'failed'
+        self.run_metrics[Path(json_file_path).name] = metrics
+        
+        # Commit the transaction - this makes all changes permanent
+        self.connection.commit()
+        
+        if self.duplicate_tracker and keys is not None:
+            # Dropped duplicates were never loaded, so they are not recorded
+            with self._tracker_lock:
+                self.duplicate_tracker.add(
+                    table_name, keys, duplicates if self.on_duplicate == 'dedupe' else []
+                )
+        
+        if json_profile:
+            self._add_json_path_indexes(table_name, json_profile)
+        
+        success_msg = f"Successfully imported {json_file_path} ({row_count} records)"
+        self.log(success_msg)
+        return True, success_msg
+    def _ensure_run_history_table(self):
+        """Create RUN_HISTORY_TABLE if it is missing."""
+        self.cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS `{self.RUN_HISTORY_TABLE}` ("
+            "id BIGINT AUTO_INCREMENT PRIMARY KEY, "
+            "run_id CHAR(32) NOT NULL, "
+            "file_name VARCHAR(255) NOT NULL, "
+            "table_name VARCHAR(255) NOT NULL, "
+            "started_at DATETIME(3) NOT NULL, "
+            "finished_at DATETIME(3) NOT NULL, "
+            "file_bytes BIGINT, "
+            "rows_loaded BIGINT, "
+            "engine VARCHAR(16), "
+            "parse_seconds DOUBLE, "
+            "load_seconds DOUBLE, "
+            "verify_seconds DOUBLE, "
+            "total_seconds DOUBLE, "
+            "outcome VARCHAR(16) NOT NULL, "
+            "verification VARCHAR(16), "
+            "message TEXT, "
+            "INDEX idx_table_started (table_name, started_at))"
         )
-        self.cursor = self.connection.cursor()
-        self.log("Database connection established")
-    def log(self, message: str):
-        """
-        Send status messages to callback if provided, always print to console.
+    def _record_import_run(self, json_file_path: str, source_path: str,
+                           started_at: datetime.datetime, success: bool, message: str):
         """
-        if self.status_callback:
-            self.status_callback(message)
-        print(message)
-    def _determine_column_type(self, values: List[Any]) -> str:
+        Write one file's outcome to RUN_HISTORY_TABLE, in its own transaction.
+        
+        outcome is 'imported', 'skipped' (empty or invalid JSON) or 'failed'.
+        The history is best effort: if it cannot be written (e.g. the
+        connection is gone) that is logged and the import result stands.
         """
-        Determine the most appropriate MySQL column type for a list of values.
+        finished_at = datetime.datetime.now()
+        metrics = self.run_metrics.get(Path(json_file_path).name, {}) if success else {}
+        if success:
+            outcome = 'imported'
+        else:
+            outcome = 'skipped' if message.startswith('Skipped') else 'failed'
+        try:
+            file_bytes = os.path.getsize(source_path)
+        except OSError:
+            file_bytes = None
         
-        This method implements a precedence hierarchy:
-        1. JSON - for nested structures (dicts/lists)
-        2. TEXT - for long strings or mixed types
-        3. VARCHAR(255) - for short strings
-        4. DOUBLE - for any floating point
-        5. BIGINT - for large integers
-        6. INT - for small integers
-        7. BOOLEAN - for boolean values
+        try:
+            self._ensure_run_history_table()
+            self.cursor.execute(
+                f"INSERT INTO `{self.RUN_HISTORY_TABLE}` (run_id, file_name, table_name, "
+                "started_at, finished_at, file_bytes, rows_loaded, engine, parse_seconds, "
+                "load_seconds, verify_seconds, total_seconds, outcome, verification, message) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                (self.run_id, Path(json_file_path).name,
+                 metrics.get('table', Path(json_file_path).stem), started_at, finished_at,
+                 file_bytes, metrics.get('rows'), self.file_engine,
+                 self.phase_seconds.get('parse'), self.phase_seconds.get('load'),
+                 self.phase_seconds.get('verify'), (finished_at - started_at).total_seconds(),
+                 outcome, metrics.get('verification'), message[:2000])
+            )
+            self.connection.commit()
+        except mysql.connector.Error as e:
+            self.log(f"Could not record run history for {Path(json_file_path).name}: {e}")
+    def throughput_report(self, recent_runs: Optional[int] = None,
+                          baseline_runs: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Compare each table's recent load rate with its historical baseline.
         
-        Args:
-            values: List of values to analyze (all values for a single column)
+        For every table in RUN_HISTORY_TABLE, the median rows/sec of its latest
+        recent_runs successful imports is compared with the median of the
+        baseline_runs imports before those. A table whose recent rate is below
+        REGRESSION_RATIO of its baseline is flagged, along with the phase
+        (parse, load or verify) whose time per row grew the most - a slower
+        parse points at the data or the client machine, a slower load at the
+        server. The report is logged and returned, slowest tables first.
         
         Returns:
-            MySQL column type as string
+            List of dicts with 'table', 'recent_rows_per_sec',
+            'baseline_rows_per_sec', 'ratio', 'regressed' and 'slowest_phase'
+        """
+        recent_runs = recent_runs or self.REPORT_RECENT_RUNS
+        baseline_runs = baseline_runs or self.REPORT_BASELINE_RUNS
+        self._ensure_run_history_table()
+        self.cursor.execute(
+            "SELECT table_name, rows_loaded, total_seconds, parse_seconds, load_seconds, verify_seconds "
+            f"FROM `{self.RUN_HISTORY_TABLE}` "
+            "WHERE outcome = 'imported' AND rows_loaded > 0 AND total_seconds > 0 "
+            "ORDER BY table_name, started_at DESC"
+        )
+        runs_by_table: Dict[str, List[tuple]] = {}
+        for row in self.cursor.fetchall():
+            runs = runs_by_table.setdefault(row[0], [])
+            if len(runs) < recent_runs + baseline_runs:
+                runs.append(row[1:])
         
-        Note: We scan ALL values because a column might have mixed types
-        in different rows (e.g., some nulls, some integers, some floats).
-        We need to pick a type that can accommodate all of them.
+        def median(values: List[float]) -> float:
+            values = sorted(values)
+            middle = len(values) // 2
+            return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+        
+        def phase_per_row(runs: List[tuple], index: int) -> float:
+            return median([(run[index] or 0) / run[0] for run in runs])
+        
+        report = []
+        for table_name, runs in runs_by_table.items():
+            recent, baseline = runs[:recent_runs], runs[recent_runs:]
+            if not baseline:
+                continue  # Nothing to compare with yet
+            recent_rate = median([run[0] / run[1] for run in recent])
+            baseline_rate = median([run[0] / run[1] for run in baseline])
+            ratio = recent_rate / baseline_rate
+            growth = {phase: phase_per_row(recent, index) - phase_per_row(baseline, index)
+                      for phase, index in (('parse', 2), ('load', 3), ('verify', 4))}
+            slowest_phase = max(growth, key=growth.get)
+            report.append({
+                'table': table_name,
+                'recent_rows_per_sec': recent_rate,
+                'baseline_rows_per_sec': baseline_rate,
+                'ratio': ratio,
+                'regressed': ratio < self.REGRESSION_RATIO,
+                'slowest_phase': slowest_phase if growth[slowest_phase] > 0 else None
+            })
+        report.sort(key=lambda entry: entry['ratio'])
+        
+        self.log(f"\nThroughput: last {recent_runs} vs previous {baseline_runs} imports per table")
+        if not report:
+            self.log("Not enough run history yet - each table needs more than "
+                     f"{recent_runs} successful imports")
+        for entry in report:
+            line = (f"{entry['table']}: {entry['recent_rows_per_sec']:,.0f} rows/sec "
+                    f"vs {entry['baseline_rows_per_sec']:,.0f} ({entry['ratio']:.0%})")
+            if entry['regressed']:
+                line = f"SLOWER  {line}"
+                if entry['slowest_phase']:
+                    line += f" - {entry['slowest_phase']} phase grew the most"
+            self.log(line)
+        return report
+    def _history_bytes_per_sec(self) -> Optional[float]:
         """
-        # Filter out None values for type checking
-        non_null_values = [v for v in values if v is not None]
+        Bytes/sec of one file worker over the latest imports in RUN_HISTORY_TABLE.
         
-        if not non_null_values:
-            return "TEXT"  # If all values are None, default to TEXT
+        Only used to put a time on the planned critical path; None when there
+        is no history (or no connection) yet.
+        """
+        if not self.record_history or self.connection is None:
+            return None
+        try:
+            self.cursor.execute(
+                "SELECT SUM(file_bytes), SUM(total_seconds) FROM ("
+                f"SELECT file_bytes, total_seconds FROM `{self.RUN_HISTORY_TABLE}` "
+                "WHERE outcome = 'imported' AND file_bytes > 0 AND total_seconds > 0 "
+                "ORDER BY started_at DESC LIMIT %s) recent",
+                (self.REPORT_BASELINE_RUNS,)
+            )
+            row = self.cursor.fetchone()
+        except mysql.connector.Error:
+            return None  # History table not created yet
+        if not row or not row[0] or not row[1]:
+            return None
+        return float(row[0]) / float(row[1])
+    def _is_too_small_for_data(self, path: Path) -> bool:
+        """True if the file is under MIN_DATA_BYTES, judged from its size alone."""
+        try:
+            return path.stat().st_size < self.MIN_DATA_BYTES
+        except OSError:
+            return False  # Unreadable files are reported by the import itself
+    def _plan_file_order(self, json_files: List[Path], workers: int) -> Tuple[List[Path], List[Path]]:
+        """
+        Order a run's files largest first and set aside files too small to hold data.
         
-        # Check for nested structures first (highest precedence)
-        has_nested = any(isinstance(v, (dict, list)) for v in non_null_values)
-        if has_nested:
-            return "JSON"
+        Every file is stat'ed up front and none is opened. Files under
+        MIN_DATA_BYTES (empty, or just a newline - most charge, hearing and
+        warrant exports) are returned separately and never imported. The rest
+        are sorted by size, biggest first: the longest-processing-time rule.
+        With several file workers each one takes the next largest file as
+        soon as it is free, so a huge file starts early instead of being
+        picked up last while the other workers sit idle, and the workers
+        finish close together.
         
-        # Check for strings
-        has_string = any(isinstance(v, str) for v in non_null_values)
-        if has_string:
-            # Check if any string is longer than 255 characters
-            max_length = max((len(v) for v in non_null_values if isinstance(v, str)), default=0)
-            return "TEXT" if max_length > 255 else "VARCHAR(255)"
+        The planned critical path - the bytes of the busiest worker under that
+        plan - is logged, with a time estimate when the run history has a
+        load rate. No schedule finishes sooner than the largest single file.
         
-        # Check for floating point numbers
-        has_float = any(isinstance(v, float) for v in non_null_values)
-        if has_float:
-            return "DOUBLE"
+        Returns:
+            Tuple of (files to import in order, files skipped as empty)
+        """
+        sizes: Dict[Path, int] = {}
+        empty_files = []
+        for path in json_files:
+            if self._is_too_small_for_data(path):
+                empty_files.append(path)
+                continue
+            try:
+                sizes[path] = path.stat().st_size
+            except OSError:
+                sizes[path] = 0  # Let the import report why it cannot be read
         
-        # Check for integers (excluding booleans, since in Python bool is a subclass of int)
-        integers = [v for v in non_null_values if isinstance(v, int) and not isinstance(v, bool)]
-        if integers:
-            max_value = max(abs(v) for v in integers)
-            return "BIGINT" if max_value >= 2147483648 else "INT"
+        if empty_files:
+            self.log(f"Skipping {len(empty_files)} empty file(s) (under {self.MIN_DATA_BYTES} bytes) "
+                     f"without opening them")
+        ordered = sorted(sizes, key=sizes.get, reverse=True)
+        if not ordered:
+            return ordered, empty_files
         
-        # Check for booleans
-        has_bool = any(isinstance(v, bool) for v in non_null_values)
-        if has_bool:
-            return "BOOLEAN"
+        # Simulate the schedule: each file goes to the least loaded worker
+        loads = [0] * min(workers, len(ordered))
+        for path in ordered:
+            heapq.heapreplace(loads, loads[0] + sizes[path])
+        critical_bytes = max(loads)
         
-        # Default fallback
-        return "TEXT"
-    def create_table_from_json(self, table_name: str, json_data: List[Dict]) -> Tuple[bool, List[str]]:
+        mb = 1024 * 1024
+        plan = (f"Import order: largest first, {sum(loads) / mb:,.1f} MB on {len(loads)} "
+                f"worker(s); planned critical path {critical_bytes / mb:,.1f} MB "
+                f"(largest file {ordered[0].name}, {sizes[ordered[0]] / mb:,.1f} MB)")
+        bytes_per_sec = self._history_bytes_per_sec()
+        if bytes_per_sec:
+            plan += f", about {self._format_duration(critical_bytes / bytes_per_sec)}"
+        self.log(plan)
+        return ordered, empty_files
+    def measured_rows_per_sec(self) -> Optional[float]:
+        """Load rate of the files imported in the last run (None if nothing was loaded)."""
+        rows = sum(metrics['rows'] for metrics in self.run_metrics.values())
+        seconds = sum(metrics['seconds'] for metrics in self.run_metrics.values())
+        if not rows or seconds <= 0:
+            return None
+        return rows / seconds
+    @staticmethod
+    def _format_duration(seconds: float) -> str:
+        """Format a duration as e.g. '2h 05m 09s'."""
+        seconds = int(round(seconds))
+        hours, seconds = divmod(seconds, 3600)
+        minutes, seconds = divmod(seconds, 60)
+        if hours:
+            return f"{hours}h {minutes:02d}m {seconds:02d}s"
+        if minutes:
+            return f"{minutes}m {seconds:02d}s"
+        return f"{seconds}s"
+    def preflight_json_file(self, json_file_path: str, sample_rows: int = 0,
+                            rows_per_sec: Optional[float] = None) -> Dict[str, Any]:
         """
-        Create MySQL table based on JSON data structure.
+        Plan the import of one file without touching the database.
         
-        This method analyzes all records to create a table schema that can
-        accommodate all fields across all records (union of all keys).
+        Reads every record (so malformed files are found now rather than hours
+        into a load) and infers the schema from all of them, or from the first
+        sample_rows. The file is streamed and profiled without keeping its rows
+        (see TableProfile), so memory use does not grow with the file.
+        
+        Returns:
+            Dictionary describing the planned table:
+            {
+                'file': str, 'table': str, 'rows': int,
+                'column_types': Dict[str, str], 'create_sql': str,
+                'estimated_bytes': int, 'estimated_seconds': float,
+                'error': Optional[str]
+            }
+        """
+        table_name = Path(json_file_path).stem
+        plan = {
+            'file': Path(json_file_path).name,
+            'table': table_name,
+            'rows': 0,
+            'column_types': {},
+            'create_sql': None,
+            'estimated_bytes': 0,
+            'estimated_seconds': 0.0,
+            'error': None
+        }
+        profile = TableProfile(sample_rows)
+        
+        try:
+            for record in _iter_json_records(json_file_path, json.JSONDecoder()):
+                profile.add(record)
+        except json.JSONDecodeError as e:
+            plan['error'] = f"Invalid JSON format: {str(e)}"
+            return plan
+        except Exception as e:
+            plan['error'] = str(e)
+            return plan
+        
+        columns = profile.columns
+        column_types = profile.column_types()
+        plan['rows'] = profile.rows
+        plan['column_types'] = {key: column_types[key] for key in columns}
+        if profile.rows:
+            primary_key = self._natural_primary_key(table_name, column_types, profile.value_count,
+                                                    profile.profiled_rows)
+            plan['create_sql'] = self._create_table_sql(table_name, columns, column_types, primary_key)
+            plan['estimated_bytes'] = profile.estimated_bytes()
+            plan['estimated_seconds'] = profile.rows / (rows_per_sec or self.DRY_RUN_ROWS_PER_SEC)
+        return plan
+    def preflight_directory(self, directory_path: str, sample_rows: int = 0,
+                            rows_per_sec: Optional[float] = None,
+                            progress_callback=None) -> Dict[str, Any]:
+        """
+        Dry run of import_directory: report what a load would do, without MySQL.
+        
+        No connection is opened and no DDL runs - this works on an importer
+        created with connect=False. For every file the planned CREATE TABLE,
+        row count, estimated on-disk size and predicted load time are logged.
+        Files under MIN_DATA_BYTES are reported as empty without being opened,
+        exactly as import_directory skips them.
         
         Args:
-            table_name: Name for the new table
-            json_data: List of JSON objects (dictionaries)
+            directory_path: Path to directory containing JSON files
+            sample_rows: Infer types from only the first N records of each file
+                (0 = all records). Every record is still parsed and counted.
+            rows_per_sec: Load rate for the time prediction. Defaults to the rate
+                measured by the last import on this importer, then to
+                DRY_RUN_ROWS_PER_SEC.
+            progress_callback: Optional function called as
+                progress_callback(files_done, total_files) after each file
         
         Returns:
-            Tuple of (success: bool, columns: List[str])
-            - success: True if table was created, False if skipped
-            - columns: Ordered list of column names for use in INSERT statements
-        
-        Important: This function DROPS the existing table if it exists.
-        This is intentional behavior for data conversion/import workflows.
+            Dictionary containing summary statistics:
+            {
+                'total': int,
+                'ready': int,
+                'failed': int,
+                'failed_files': List[str],
+                'empty_files': List[str],
+                'tables': List[Dict] (see preflight_json_file),
+                'rows': int,
+                'estimated_bytes': int,
+                'estimated_seconds': float,
+                'rows_per_sec': float
+            }
         """
-        if not json_data:
-            self.log(f"No data in {table_name}.json - skipping")
-            return False, []
-
-        # Step 1: Collect all unique keys from all records
-        # In SQL terms, this is like doing a UNION of all possible columns
-        all_keys = set()
-        for record in json_data:
-            all_keys.update(record.keys())
+        json_files = self.find_json_files(directory_path)
         
-        # Sort keys for deterministic, consistent table structure
-        sorted_columns = sorted(list(all_keys))
-        self.log(f"Columns to be created for {table_name}: {sorted_columns}")
-
-        # Step 2: Determine appropriate MySQL type for each column
-        column_types = {}
-        for key in sorted_columns:
-            # Gather all values for this key across all records
-            values = [record.get(key) for record in json_data]
-            column_types[key] = self._determine_column_type(values)
-
-        # Step 3: Build CREATE TABLE statement
-        # Every table gets an auto-increment primary key named 'id'
-        columns_sql = ["id BIGINT AUTO_INCREMENT PRIMARY KEY"]
-        columns_sql.extend([f"`{key}` {column_types[key]}" for key in sorted_columns])
-
-        # Drop existing table (this is intentional - see function docstring)
-        drop_sql = f"DROP TABLE IF EXISTS `{table_name}`"
-        self.cursor.execute(drop_sql)
-        self.log(f"Dropped table {table_name} if it existed")
-
-        # Create the new table
-        create_sql = f"CREATE TABLE `{table_name}` ({', '.join(columns_sql)})"
-        self.cursor.execute(create_sql)
+        rate_source = "given"
+        if not rows_per_sec:
+            rows_per_sec = self.measured_rows_per_sec()
+            rate_source = "measured"
+        if not rows_per_sec:
+            rows_per_sec = self.DRY_RUN_ROWS_PER_SEC
+            rate_source = "default"
         
-        # Don't commit yet - we'll commit after data insertion succeeds
-        self.log(f"Created table {table_name} with {len(sorted_columns)} columns")
+        self.log(f"\nDRY RUN - {len(json_files)} file(s), no database connection is used")
+        self.log(f"Predicting load time at {rows_per_sec:,.0f} rows/sec ({rate_source})\n")
         
-        # Return success and the column order for INSERT statements
-        return True, sorted_columns
-    def insert_json_data(self, table_name: str, json_data: List[Dict], columns: List[str]):
+        plans = []
+        failed_files = []
+        empty_files = []
+        for idx, json_file in enumerate(json_files, 1):
+            if self._is_too_small_for_data(json_file):
+                empty_files.append(json_file.name)
+                self.log(f"Would skip {json_file.name} - empty (under {self.MIN_DATA_BYTES} bytes)")
+                if progress_callback:
+                    progress_callback(idx, len(json_files))
+                continue
+            
+            plan = self.preflight_json_file(str(json_file), sample_rows, rows_per_sec)
+            plans.append(plan)
+            
+            if plan['error']:
+                failed_files.append(plan['file'])
+                self.log(f"MALFORMED {plan['file']}: {plan['error']}")
+            elif not plan['rows']:
+                self.log(f"Would skip {plan['file']} - File is empty or contains no data")
+            else:
+                self.log(f"{plan['table']}: {plan['rows']:,} rows, "
+                         f"{len(plan['column_types'])} columns, "
+                         f"~{plan['estimated_bytes'] / (1024 * 1024):,.1f} MB, "
+                         f"~{self._format_duration(plan['estimated_seconds'])}")
+                self.log(f"  {plan['create_sql']}")
+            
+            if progress_callback:
+                progress_callback(idx, len(json_files))
+        
+        total_rows = sum(plan['rows'] for plan in plans)
+        total_bytes = sum(plan['estimated_bytes'] for plan in plans)
+        total_seconds = sum(plan['estimated_seconds'] for plan in plans)
+        
+        # Log summary
+        self.log("\n" + "="*60)
+        self.log("DRY RUN SUMMARY")
+        self.log("="*60)
+        self.log(f"Total files checked: {len(json_files)}")
+        self.log(f"Ready to import: {len(plans) - len(failed_files)}")
+        self.log(f"Malformed: {len(failed_files)}")
+        if empty_files:
+            self.log(f"Empty (skipped): {len(empty_files)}")
+        
+        if failed_files:
+            self.log("\nMalformed files:")
+            for filename in failed_files:
+                self.log(f"  - {filename}")
+        
+        self.log(f"Rows: {total_rows:,}")
+        self.log(f"Estimated table size: {total_bytes / (1024 * 1024):,.1f} MB")
+        self.log(f"Estimated load time: {self._format_duration(total_seconds)}")
+        self.log("="*60)
+        
+        return {
+            'total': len(json_files),
+            'ready': len(plans) - len(failed_files),
+            'failed': len(failed_files),
+            'failed_files': failed_files,
+            'empty_files': empty_files,
+            'tables': plans,
+            'rows': total_rows,
+            'estimated_bytes': total_bytes,
+            'estimated_seconds': total_seconds,
+            'rows_per_sec': rows_per_sec
+        }
+    def import_directory(self, directory_path: str, prefetch: Optional[bool] = None,
+                         progress_callback=None, dry_run: bool = False,
+                         files: Optional[List[Path]] = None,
+                         keep_duplicate_keys: bool = False) -> Dict[str, Any]:
         """
-        Insert JSON records into the specified table.
+        Import all JSON and JSON Lines files from a directory.
         
         Args:
-            table_name: Target table name
-            json_data: List of JSON objects to insert
-            columns: Ordered list of column names (from create_table_from_json)
+            directory_path: Path to directory containing JSON files
+            prefetch: Read upcoming files ahead into a local temp directory while
+                the current file loads. None (default) enables it automatically
+                for network shares.
+            progress_callback: Optional function called as
+                progress_callback(files_done, total_files) after each file
+            dry_run: Only plan the import - see preflight_directory, whose
+                summary is returned instead
+            files: Import only these files of the directory (default: every
+                JSON file in it); used by watch_directory
+            keep_duplicate_keys: Check duplicate keys against the files of
+                earlier calls as well, instead of starting a new
+                DuplicateKeyTracker for this run; used by watch_directory
         
-        Note: This uses parameterized queries (%s placeholders) which prevents
-        SQL injection attacks. It's like using sp_executesql with parameters in SQL Server.
+        Files are imported largest first, by file_workers importers at once
+        when that is above 1 (see _plan_file_order); files too small to hold
+        a record are skipped without being opened and listed in empty_files.
+        
+        Returns:
+            Dictionary containing summary statistics:
+            {
+                'total': int,
+                'successful': int,
+                'failed': int,
+                'success_files': List[str],
+                'failed_files': List[str],
+                'verification_failed_files': List[str],
+                'duplicate_key_files': List[str],
+                'empty_files': List[str],
+                'rows_per_sec': Optional[float],
+                'target_failed_files': Dict[str, List[str]] (fan-out only)
+            }
         """
-        if not json_data:
-            return
-
-        # Build INSERT statement with proper column names and placeholders
-        placeholders = ', '.join(['%s'] * len(columns))
-        column_names = ', '.join([f'`{col}`' for col in columns])
-        insert_sql = f"INSERT INTO `{table_name}` ({column_names}) VALUES ({placeholders})"
-
-        # Prepare all rows for batch insertion
-        # Using None for missing fields - MySQL will insert NULL
-        values = []
-        for record in json_data:
-            row = tuple(record.get(col) for col in columns)
-            values.append(row)
-
-        # Execute batch insert - more efficient than inserting one row at a time
-        self.cursor.executemany(insert_sql, values)
-        self.log(f"Inserted {len(values)} records into {table_name}")
-    def import_json_file(self, json_file_path: str) -> Tuple[bool, str]:
+        if dry_run:
+            return self.preflight_directory(directory_path, progress_callback=progress_callback)
+        
+        json_files = self.find_json_files(directory_path) if files is None else [Path(f) for f in files]
+        
+        if not json_files:
+            self.log("No JSON files found in the selected directory")
+            return {
+                'total': 0,
+                'successful': 0,
+                'failed': 0,
+                'success_files': [],
+                'failed_files': [],
+                'verification_failed_files': [],
+                'duplicate_key_files': [],
+                'empty_files': [],
+                'rows_per_sec': None,
+                'target_failed_files': {}
+            }
+        
+        self.log(f"\nFound {len(json_files)} JSON file(s) to import\n")
+        
+        # Track results for summary
+        successful_imports = []
+        failed_imports = []
+        self.run_metrics = {}
+        self.run_id = uuid.uuid4().hex
+        target_failures: Dict[str, List[str]] = (
+            {importer.target_label: [] for importer in [self] + self.targets} if self.targets else {}
+        )
+        for target in self.targets:
+            target.run_metrics = {}
+            target.run_id = self.run_id
+        if self.duplicate_tracker and not keep_duplicate_keys:
+            # Duplicates are checked across the files of one run
+            self.duplicate_tracker = DuplicateKeyTracker(self.duplicate_keys, self.EXACT_KEY_LIMIT)
+        
+        workers = self.file_workers
+        if workers > 1 and (self.targets or self.consolidate):
+            # Targets already load in parallel; unified-table DDL must not interleave
+            self.log("Loading one file at a time (fan-out or consolidation in use)")
+            workers = 1
+        total_files = len(json_files)
+        json_files, empty_files = self._plan_file_order(json_files, workers)
+        workers = min(workers, len(json_files)) or 1
+        
+        if prefetch is None:
+            prefetch = self.is_network_path(directory_path)
+        prefetcher = None
+        if prefetch and json_files:
+            prefetcher = FilePrefetcher(json_files, self.PREFETCH_BUDGET_BYTES, workers)
+            self.log(f"Reading ahead up to {workers * self.PREFETCH_BUDGET_BYTES // (1024 * 1024)} MB "
+                     f"of upcoming files into local storage")
+        
+        # Workers take the next file off the largest-first list as they free up
+        pending = iter(json_files)
+        lock = threading.Lock()
+        files_done = len(empty_files)
+        run_started = time.perf_counter()
+        worker_seconds: List[float] = []
+        
+        def run_worker(importer: 'JSONtoMySQL'):
+            nonlocal files_done
+            while True:
+                with lock:
+                    json_file = next(pending, None)
+                if json_file is None:
+                    break
+                read_path = prefetcher.fetch(json_file) if prefetcher else None
+                success, message = importer.import_json_file(str(json_file), read_path=read_path)
+                if prefetcher:
+                    prefetcher.release(json_file)
+                
+                with lock:
+                    if success:
+                        successful_imports.append(json_file.name)
+                    else:
+                        failed_imports.append(json_file.name)
+                    for label, (target_success, _) in importer.target_results.items():
+                        if not target_success:
+                            target_failures[label].append(json_file.name)
+                    files_done += 1
+                    if progress_callback:
+                        progress_callback(files_done, total_files)
+            worker_seconds.append(time.perf_counter() - run_started)
+        
+        file_workers: List['JSONtoMySQL'] = []
+        try:
+            if empty_files and progress_callback:
+                progress_callback(files_done, total_files)
+            if workers == 1:
+                run_worker(self)
+            else:
+                for number in range(2, workers + 1):
+                    file_workers.append(self._file_worker(number))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(run_worker, [self] + file_workers))
+                self.log(f"{workers} file workers finished within "
+                         f"{max(worker_seconds) - min(worker_seconds):.1f}s of each other "
+                         f"(last after {self._format_duration(max(worker_seconds))})")
+        finally:
+            for worker in file_workers:
+                self.run_metrics.update(worker.run_metrics)
+                worker.close()
+            if prefetcher:
+                prefetcher.close()
+        
+        # Log summary
+        self.log("\n" + "="*60)
+        self.log("IMPORT SUMMARY")
+        self.log("="*60)
+        self.log(f"Total files processed: {total_files}")
+        self.log(f"Successfully imported: {len(successful_imports)}")
+        self.log(f"Failed imports: {len(failed_imports)}")
+        if empty_files:
+            self.log(f"Skipped as empty: {len(empty_files)}")
+        
+        if failed_imports:
+            self.log("\nFailed files:")
+            for filename in failed_imports:
+                self.log(f"  - {filename}")
+        
+        verification_failed = [name for name in successful_imports
+                               if self.run_metrics.get(name, {}).get('verification') == 'failed']
+        if self.verify:
+            self.log(f"Verified (row count + checksum): "
+                     f"{len(successful_imports) - len(verification_failed)} passed, "
+                     f"{len(verification_failed)} failed")
+            for filename in verification_failed:
+                self.log(f"  ! {filename}")
+        
+        duplicate_files = [name for name in successful_imports
+                           if self.run_metrics.get(name, {}).get('duplicates')]
+        if duplicate_files:
+            self.log(f"Files with duplicate {', '.join(self.duplicate_keys)} values "
+                     f"({'dropped' if self.on_duplicate == 'dedupe' else 'loaded'}):")
+            for filename in duplicate_files:
+                self.log(f"  * {filename}: {self.run_metrics[filename]['duplicates']}")
+        
+        rows_per_sec = self.measured_rows_per_sec()
+        if rows_per_sec:
+            self.log(f"Load rate: {rows_per_sec:,.0f} rows/sec")
+        
+        if self.targets:
+            self.log("\nPer target database:")
+            for importer in [self] + self.targets:
+                failures = target_failures[importer.target_label]
+                unverified = sum(1 for metrics in importer.run_metrics.values()
+                                 if metrics.get('verification') == 'failed')
+                line = (f"  {importer.target_label}: {len(json_files) - len(failures)} imported, "
+                        f"{len(failures)} failed")
+                if unverified:
+                    line += f", {unverified} failed verification"
+                self.log(line)
+        
+        self.log("="*60)
+        
+        return {
+            'total': total_files,
+            'successful': len(successful_imports),
+            'failed': len(failed_imports),
+            'success_files': successful_imports,
+            'failed_files': failed_imports,
+            'verification_failed_files': verification_failed,
+            'duplicate_key_files': duplicate_files,
+            'empty_files': [path.name for path in empty_files],
+            'rows_per_sec': rows_per_sec,
+            'target_failed_files': target_failures
+        }
+    def _scan_directory(self, directory_path: str) -> Dict[str, Tuple[int, int]]:
+        """Stat index of the directory: path -> (size, modification time in ns)."""
+        index = {}
+        for path in self.find_json_files(directory_path):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # Removed between listing and stat
+            index[str(path)] = (stat.st_size, stat.st_mtime_ns)
+        return index
+    def watch_directory(self, directory_path: str, poll_seconds: Optional[float] = None,
+                        settle_seconds: Optional[float] = None, stop_event=None,
+                        import_existing: bool = False, max_scans: Optional[int] = None) -> Dict[str, Any]:
         """
-        Import a single JSON file into a MySQL table.
+        Keep importing new or changed files from a directory until stopped.
         
-        This method wraps the entire import process in a transaction.
-        If anything fails, all changes are rolled back automatically.
+        The directory is polled every poll_seconds. Each scan only stats the
+        files and compares (size, modification time) with a cached index of
+        what was last imported - nothing is read or hashed. A new or changed
+        file is imported once it has stopped changing for settle_seconds (EJ
+        may still be writing it); each batch of ready files goes through
+        import_directory, so other files are never reloaded.
+        
+        A file that fails to import is not retried until it changes again.
+        
+        Duplicate keys are checked across every batch of the session, not
+        just within one: the session keeps one DuplicateKeyTracker. Files
+        that were already there at start and not imported are not in it.
         
         Args:
-            json_file_path: Full path to JSON file
+            directory_path: Directory to watch
+            poll_seconds: Seconds between scans (default WATCH_POLL_SECONDS)
+            settle_seconds: Seconds a file must stay unchanged (default
+                WATCH_SETTLE_SECONDS)
+            stop_event: threading.Event that ends the watch when set
+            import_existing: Also import the files already present at start
+                (by default they are assumed to be loaded)
+            max_scans: Stop after this many scans (None = until stop_event)
         
         Returns:
-            Tuple of (success: bool, message: str)
-        
-        Transaction behavior: Each file import is atomic - either the entire
-        file imports successfully, or nothing is changed in the database.
-        This is similar to wrapping operations in BEGIN TRAN...COMMIT/ROLLBACK.
+            Dictionary with 'scans', 'imported_files' and 'failed_files'
         """
-        table_name = Path(json_file_path).stem
+        poll_seconds = self.WATCH_POLL_SECONDS if poll_seconds is None else poll_seconds
+        settle_seconds = self.WATCH_SETTLE_SECONDS if settle_seconds is None else settle_seconds
+        stop_event = stop_event or threading.Event()
         
-        try:
-            # Read and parse JSON file
-            with open(json_file_path, 'r', encoding='utf-8') as f:
-                json_data = json.load(f)
+        # path -> (size, mtime) as of the last import attempt
+        imported = {} if import_existing else self._scan_directory(directory_path)
+        # path -> ((size, mtime), time first seen with that signature)
+        pending: Dict[str, Tuple[Tuple[int, int], float]] = {}
+        imported_files = []
+        failed_files = []
+        scans = 0
+        if self.duplicate_tracker:
+            self.duplicate_tracker = DuplicateKeyTracker(self.duplicate_keys, self.EXACT_KEY_LIMIT)
+        
+        self.log(f"Watching {directory_path} for new or changed JSON files "
+                 f"(every {poll_seconds:g}s, {len(imported)} existing file(s) skipped)")
+        
+        while not stop_event.is_set():
+            scans += 1
+            now = time.monotonic()
+            index = self._scan_directory(directory_path)
             
-            # Handle empty files or empty arrays
-            if not json_data or (isinstance(json_data, list) and len(json_data) == 0):
-                msg = f"Skipped {json_file_path} - File is empty or contains no data"
-                self.log(msg)
-                return False, msg
+            ready = []
+            for path, signature in index.items():
+                if imported.get(path) == signature:
+                    pending.pop(path, None)
+                    continue
+                seen = pending.get(path)
+                if seen is None or seen[0] != signature:
+                    pending[path] = (signature, now)  # New, or still growing
+                elif now - seen[1] >= settle_seconds:
+                    ready.append(path)
             
-            # Normalize to list format (convert single object to list)
-            if isinstance(json_data, dict):
-                json_data = [json_data]
+            # Forget files that were removed
+            for path in list(imported):
+                if path not in index:
+                    del imported[path]
+            for path in list(pending):
+                if path not in index:
+                    del pending[path]
             
-            # Create table and get column order
-            success, columns = self.create_table_from_json(table_name, json_data)
+            if ready:
+                summary = self.import_directory(directory_path, files=ready, keep_duplicate_keys=True)
+                imported_files.extend(summary['success_files'])
+                failed_files.extend(summary['failed_files'])
+                for path in ready:
+                    imported[path] = pending.pop(path)[0]
             
-            if not success:
-                return False, f"Failed to create table for {json_file_path}"
+            if max_scans is not None and scans >= max_scans:
+                break
+            stop_event.wait(poll_seconds)
+        
+        self.log(f"Stopped watching {directory_path}: {len(imported_files)} file(s) imported, "
+                 f"{len(failed_files)} failed")
+        return {
+            'scans': scans,
+            'imported_files': imported_files,
+            'failed_files': failed_files
+        }
+    @staticmethod
+    def _json_default(value: Any) -> Any:
+        """Convert MySQL result values that json.dumps cannot serialize."""
+        if isinstance(value, decimal.Decimal):
+            return int(value) if value == value.to_integral_value() else float(value)
+        if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+            return value.isoformat()
+        if isinstance(value, datetime.timedelta):
+            return str(value)
+        if isinstance(value, (bytes, bytearray)):
+            return value.decode('utf-8', errors='replace')
+        if isinstance(value, set):
+            return sorted(value)
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+    def _estimate_row_count(self, table_name: str) -> int:
+        """
+        Approximate row count from table statistics (no table scan).
+        
+        Used only for progress reporting, so InnoDB's estimate is good enough.
+        """
+        self.cursor.execute(
+            "SELECT COALESCE(table_rows, 0) FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name = %s",
+            (table_name,)
+        )
+        row = self.cursor.fetchone()
+        return int(row[0]) if row else 0
+    def _write_json_array(self, cursor, output_path: str, progress_callback=None,
+                          total_estimate: int = 0) -> int:
+        """
+        Stream the rows of an executed SELECT into a JSON array file.
+        
+        Rows are fetched EXPORT_CHUNK_ROWS at a time and written immediately,
+        so memory use does not depend on the size of the result set. The file
+        is written under a temporary name and renamed when complete, so a
+        failed export never leaves a truncated file behind.
+        
+        Returns:
+            Number of rows written
+        """
+        columns = [column[0] for column in cursor.description]
+        # MySQL JSON columns come back as text - decode them so they are
+        # written as nested JSON rather than as quoted strings
+        json_columns = {i for i, column in enumerate(cursor.description)
+                        if column[1] == mysql.connector.FieldType.JSON}
+        
+        partial_path = f"{output_path}.partial"
+        written = 0
+        try:
+            with open(partial_path, 'w', encoding='utf-8') as f:
+                f.write('[')
+                while True:
+                    chunk = cursor.fetchmany(self.EXPORT_CHUNK_ROWS)
+                    if not chunk:
+                        break
+                    parts = []
+                    for row in chunk:
+                        record = dict(zip(columns, row))
+                        for i in json_columns:
+                            value = row[i]
+                            if isinstance(value, (str, bytes, bytearray)):
+                                record[columns[i]] = json.loads(value)
+                        parts.append(json.dumps(record, separators=(',', ':'), ensure_ascii=False,
+                                                default=self._json_default))
+                    f.write((',' if written else '') + ','.join(parts))
+                    written += len(chunk)
+                    if progress_callback:
+                        progress_callback(written, max(total_estimate, written))
+                f.write(']')
+            os.replace(partial_path, output_path)
+        except Exception:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+        return written
+    def export_table_to_json(self, table_name: str, output_path: str,
+                             progress_callback=None) -> Tuple[bool, str]:
+        """
+        Export a table to a JSON file (an array of objects, one per row).
+        
+        The result set is streamed with an unbuffered cursor - rows are read
+        from the server as they are fetched instead of being loaded into memory
+        first - and written to disk in chunks, so memory stays flat whatever the
+        size of the table.
+        
+        Args:
+            table_name: Table to export
+            output_path: Destination .json file (replaced if it exists)
+            progress_callback: Optional function called as
+                progress_callback(rows_written, estimated_total_rows)
+        
+        Returns:
+            Tuple of (success: bool, message: str)
+        """
+        try:
+            total_estimate = self._estimate_row_count(table_name)
+            self.log(f"Exporting {table_name} to {output_path} (about {total_estimate} rows)")
             
-            # Insert data using the correct column order
-            self.insert_json_data(table_name, json_data, columns)
+            cursor = self.connection.cursor(buffered=False)
+            try:
+                cursor.execute(f"SELECT * FROM `{table_name}`")
+                written = self._write_json_array(cursor, output_path, progress_callback, total_estimate)
+            finally:
+                cursor.close()
             
-            # Commit the transaction - this makes all changes permanent
-            self.connection.commit()
+            # End the read-only transaction opened by the SELECT
+            self.connection.rollback()
             
-            success_msg = f"Successfully imported {json_file_path} ({len(json_data)} records)"
+            success_msg = f"Successfully exported {table_name} to {output_path} ({written} records)"
             self.log(success_msg)
             return True, success_msg
             
-        except json.JSONDecodeError as e:
-            # Roll back any partial changes
-            self.connection.rollback()
-            error_msg = f"Skipped {json_file_path} - Invalid JSON format: {str(e)}"
-            self.log(error_msg)
-            return False, error_msg
-            
         except Exception as e:
-            # Roll back any partial changes
             self.connection.rollback()
-            error_msg = f"ERROR importing {json_file_path}: {str(e)}"
+            error_msg = f"ERROR exporting {table_name}: {str(e)}"
             self.log(error_msg)
             return False, error_msg
-    def import_directory(self, directory_path: str) -> Dict[str, Any]:
+    def _table_columns(self, table_name: str) -> List[str]:
+        """List a table's column names in table order."""
+        self.cursor.execute(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_schema = DATABASE() AND table_name = %s ORDER BY ordinal_position",
+            (table_name,)
+        )
+        return [row[0] for row in self.cursor.fetchall()]
+    def _range_key_column(self, table_name: str) -> str:
+        """
+        Integer column to split a table into key ranges by.
+        
+        That is the single-column primary key when it is an integer, and
+        otherwise 'id' - tables with a natural (e.g. VARCHAR) primary key keep
+        id as a unique BIGINT. Raises ValueError when neither is an integer.
+        """
+        self.cursor.execute(
+            "SELECT k.column_name, c.data_type FROM information_schema.key_column_usage k "
+            "JOIN information_schema.columns c ON c.table_schema = k.table_schema "
+            "AND c.table_name = k.table_name AND c.column_name = k.column_name "
+            "WHERE k.table_schema = DATABASE() AND k.table_name = %s AND k.constraint_name = 'PRIMARY' "
+            "ORDER BY k.ordinal_position",
+            (table_name,)
+        )
+        key_columns = self.cursor.fetchall()
+        if len(key_columns) == 1 and key_columns[0][1].lower() in self.INTEGER_DATA_TYPES:
+            return key_columns[0][0]
+        
+        self.cursor.execute(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = 'id'",
+            (table_name,)
+        )
+        row = self.cursor.fetchone()
+        if row and row[0].lower() in self.INTEGER_DATA_TYPES:
+            return 'id'
+        raise ValueError(f"{table_name} has no integer key to split into ranges - "
+                         f"export it without range_entity")
+    def _export_query_to_file(self, query: str, params: Tuple, output_path: str,
+                              progress_callback=None) -> int:
         """
-        Import all JSON files from a directory.
+        Run one SELECT on its own connection and stream it into a JSON file.
+        
+        Used by the partitioned export so that every partition has its own
+        connection, cursor and writer and they can all run at the same time.
+        """
+        connection = self._open_connection()
+        try:
+            cursor = connection.cursor(buffered=False)
+            try:
+                cursor.execute(query, params)
+                return self._write_json_array(cursor, output_path, progress_callback)
+            finally:
+                cursor.close()
+        finally:
+            connection.rollback()
+            self._close_connection(connection)
+    def _concatenate_json_arrays(self, part_paths: List[str], output_path: str):
+        """
+        Join JSON array files written by _write_json_array into one array.
+        
+        Each part is exactly '[' + rows + ']', so the rows are copied across
+        byte for byte without parsing them again.
+        """
+        partial_path = f"{output_path}.partial"
+        with open(partial_path, 'wb') as out:
+            out.write(b'[')
+            wrote_rows = False
+            for part_path in part_paths:
+                size = os.path.getsize(part_path)
+                if size <= 2:
+                    continue  # Empty array
+                if wrote_rows:
+                    out.write(b',')
+                with open(part_path, 'rb') as part:
+                    part.seek(1)
+                    remaining = size - 2
+                    while remaining > 0:
+                        block = part.read(min(remaining, 1024 * 1024))
+                        out.write(block)
+                        remaining -= len(block)
+                wrote_rows = True
+            out.write(b']')
+        os.replace(partial_path, output_path)
+        for part_path in part_paths:
+            os.remove(part_path)
+    def export_partitioned(self, table_name: str, output_directory: str,
+                           partition_column: str = 'EntityType', range_entity: Optional[str] = None,
+                           range_parts: Optional[int] = None, workers: Optional[int] = None,
+                           progress_callback=None) -> Dict[str, Any]:
+        """
+        Export a table as one JSON file per partition, in parallel.
+        
+        By default the table is split by its partition_column (EntityType) and
+        each value is written to Alliance_Exception_<value>.json - the same
+        names as the exception files we receive from EJ.
+        
+        If range_entity is given, only that entity is exported, split into
+        range_parts primary-key ranges that are read concurrently and then
+        joined into the single Alliance_Exception_<entity>.json file.
+        
+        Every partition runs on its own connection with its own writer, so
+        a large export scales with the number of connections instead of
+        being limited by one cursor.
         
         Args:
-            directory_path: Path to directory containing JSON files
+            table_name: Table to export
+            output_directory: Folder that receives the JSON files
+            partition_column: Column whose values define the partitions
+            range_entity: Export only this value, split by primary-key ranges
+            range_parts: Number of ranges for range_entity (default: workers)
+            workers: Concurrent connections (default: load_workers)
+            progress_callback: Optional function called as
+                progress_callback(rows_written, estimated_total_rows)
         
         Returns:
-            Dictionary containing summary statistics:
-            {
-                'total': int,
-                'successful': int,
-                'failed': int,
-                'success_files': List[str],
-                'failed_files': List[str]
-            }
+            Dictionary of summary statistics, like import_directory()
         """
-        json_files = list(Path(directory_path).glob('*.json'))
+        workers = max(1, workers or self.load_workers)
+        output_directory = Path(output_directory)
         
-        if not json_files:
-            self.log("No JSON files found in the selected directory")
-            return {
-                'total': 0,
-                'successful': 0,
-                'failed': 0,
-                'success_files': [],
-                'failed_files': []
-            }
+        def file_for(value: Any) -> str:
+            # Keep file names safe whatever the entity value contains
+            safe_value = re.sub(r'[^A-Za-z0-9_-]', '_', str(value))
+            return str(output_directory / f"{self.EXPORT_FILE_PREFIX}{safe_value}.json")
         
-        self.log(f"\nFound {len(json_files)} JSON file(s) to import\n")
+        base_query = f"SELECT * FROM `{table_name}` WHERE `{partition_column}` = %s"
         
-        # Track results for summary
-        successful_imports = []
-        failed_imports = []
+        # Each task: (label, query, params, output path)
+        tasks = []
+        range_outputs = {}
+        if range_entity is not None:
+            key = self._range_key_column(table_name)
+            self.cursor.execute(
+                f"SELECT MIN(`{key}`), MAX(`{key}`) FROM `{table_name}` WHERE `{partition_column}` = %s",
+                (range_entity,)
+            )
+            low, high = self.cursor.fetchone()
+            final_path = file_for(range_entity)
+            if low is None:
+                tasks.append((str(range_entity), base_query, (range_entity,), final_path))
+            else:
+                parts = max(1, min(range_parts or workers, high - low + 1))
+                step = -(-(high - low + 1) // parts)  # Ceiling division
+                part_paths = []
+                for i in range(parts):
+                    start = low + i * step
+                    end = min(start + step - 1, high)
+                    part_path = f"{final_path}.part{i:03d}"
+                    part_paths.append(part_path)
+                    tasks.append((f"{range_entity} [{key} {start}-{end}]",
+                                  f"{base_query} AND `{key}` BETWEEN %s AND %s",
+                                  (range_entity, start, end), part_path))
+                range_outputs[final_path] = part_paths
+        else:
+            self.cursor.execute(f"SELECT DISTINCT `{partition_column}` FROM `{table_name}`")
+            values = [row[0] for row in self.cursor.fetchall()]
+            if None in values:
+                self.log(f"Skipping rows with NULL {partition_column} (no file to write them to)")
+            for value in values:
+                if value is not None:
+                    tasks.append((str(value), base_query, (value,), file_for(value)))
         
-        for json_file in json_files:
-            success, message = self.import_json_file(str(json_file))
-            
-            if success:
-                successful_imports.append(json_file.name)
+        total_estimate = self._estimate_row_count(table_name)
+        self.connection.rollback()
+        self.log(f"Exporting {table_name} in {len(tasks)} partition(s) over "
+                 f"{min(workers, max(1, len(tasks)))} connection(s)")
+        
+        # Combine the progress of all partitions into one running total
+        progress_lock = threading.Lock()
+        written_by_task = {}
+        
+        def task_progress(label: str):
+            def report(written: int, _estimate: int):
+                with progress_lock:
+                    written_by_task[label] = written
+                    total_written = sum(written_by_task.values())
+                if progress_callback:
+                    progress_callback(total_written, max(total_estimate, total_written))
+            return report
+        
+        successful_exports = []
+        failed_exports = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self._export_query_to_file, query, params, path, task_progress(label)): (label, path)
+                for label, query, params, path in tasks
+            }
+            for future, (label, path) in futures.items():
+                try:
+                    written = future.result()
+                    self.log(f"Exported {label}: {written} records to {Path(path).name}")
+                    successful_exports.append(Path(path).name)
+                except Exception as e:
+                    self.log(f"ERROR exporting {label}: {str(e)}")
+                    failed_exports.append(Path(path).name)
+        
+        # Join key-range parts into the entity's single file
+        for final_path, part_paths in range_outputs.items():
+            part_names = {Path(part).name for part in part_paths}
+            if part_names & set(failed_exports):
+                for part in part_paths:
+                    if os.path.exists(part):
+                        os.remove(part)
+                failed_exports = [name for name in failed_exports if name not in part_names]
+                failed_exports.append(Path(final_path).name)
             else:
-                failed_imports.append(json_file.name)
+                self._concatenate_json_arrays(part_paths, final_path)
+            successful_exports = [name for name in successful_exports if name not in part_names]
+            if Path(final_path).name not in failed_exports:
+                successful_exports.append(Path(final_path).name)
         
         # Log summary
         self.log("\n" + "="*60)
-        self.log("IMPORT SUMMARY")
+        self.log("EXPORT SUMMARY")
         self.log("="*60)
-        self.log(f"Total files processed: {len(json_files)}")
-        self.log(f"Successfully imported: {len(successful_imports)}")
-        self.log(f"Failed imports: {len(failed_imports)}")
-        
-        if failed_imports:
-            self.log("\nFailed files:")
-            for filename in failed_imports:
-                self.log(f"  - {filename}")
-        
+        self.log(f"Files written: {len(successful_exports)}")
+        self.log(f"Failed exports: {len(failed_exports)}")
+        for filename in successful_exports:
+            self.log(f"  + {filename}")
+        for filename in failed_exports:
+            self.log(f"  - {filename}")
         self.log("="*60)
         
         return {
-            'total': len(json_files),
-            'successful': len(successful_imports),
-            'failed': len(failed_imports),
-            'success_files': successful_imports,
-            'failed_files': failed_imports
+            'total': len(successful_exports) + len(failed_exports),
+            'successful': len(successful_exports),
+            'failed': len(failed_exports),
+            'success_files': successful_exports,
+            'failed_files': failed_exports
         }
     def close(self):
-        """Close database connection and clean up resources."""
-        self.cursor.close()
-        self.connection.close()
-        self.log("Database connection closed")
+        """Close database connection and clean up resources (safe to call twice)."""
+        for target in self.targets:
+            target.close()
+        if self.connection is None:
+            return  # Dry-run importer (connect=False), or already closed
+        connection, self.connection = self.connection, None
+        try:
+            self.cursor.close()
+        finally:
+            self._close_connection(connection)
+        if self.pool:
+            self.log("Database connection returned to session pool")
+        else:
+            self.log("Database connection closed")
     def __enter__(self):
         """Context manager support - enables 'with' statement usage."""
         return self
@@ -341,16 +4856,34 @@ class ImporterGUI:
     # Configuration file for saving connection settings
     CONFIG_FILE = "importer_config.json"
     
+    # Table written out by the Export button
+    EXPORT_TABLE = "PostScript_AllianceMerge"
+    
     def __init__(self, root):
         """Initialize the GUI components."""
         self.root = root
         self.root.title("JSON to MySQL Importer")
-        self.root.geometry("650x700")
+        self.root.geometry("650x825")
         self.root.resizable(False, False)
         
         # Connection state tracking
         self.connection_verified = False
         
+        # Connections kept open for the session once the test succeeds
+        self.connection_pool = None
+        
+        # Background tasks using the pool, and pools discarded while they ran
+        # (closed when the last task finishes, see discard_connection_pool)
+        self.pool_lock = threading.Lock()
+        self.pool_users = 0
+        self.retired_pools = []
+        
+        # Load rate of the last import (rows/sec), used to predict dry-run load times
+        self.measured_rows_per_sec = None
+        
+        # Set to stop a running folder watch (None when not watching)
+        self.watch_stop = None
+        
         # Create all GUI components
         self.create_connection_frame()
         self.create_test_connection_button()
@@ -364,6 +4897,9 @@ class ImporterGUI:
         
         # Initial state - disable import button
         self.update_import_button_state()
+        
+        # Close pooled connections when the window is closed
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
     def create_connection_frame(self):
         """Create database connection input fields."""
         frame = tk.LabelFrame(self.root, text="Database Connection", padx=10, pady=10)
@@ -465,16 +5001,46 @@ class ImporterGUI:
         )
         self.execute_btn.pack(padx=10, pady=(10,5), fill="x")
 
-        # Export button (placeholder for future functionality)
+        # Dry run button (reads the files only - no connection needed)
+        self.dry_run_btn = tk.Button(
+            self.root,
+            text="Dry Run - Check Files and Estimate Load (no database changes)",
+            command=self.execute_dry_run,
+            font=("Arial", 10),
+            state="disabled"  # Initially disabled
+        )
+        self.dry_run_btn.pack(padx=10, pady=(0,5), fill="x")
+
+        # Watch button (toggles a background watch of the selected folder)
+        self.watch_btn = tk.Button(
+            self.root,
+            text="Watch Folder - Import New Files Automatically",
+            command=self.toggle_watch,
+            font=("Arial", 10),
+            state="disabled"  # Initially disabled
+        )
+        self.watch_btn.pack(padx=10, pady=(0,5), fill="x")
+
+        # Run history report (needs a tested connection, like export)
+        self.history_btn = tk.Button(
+            self.root,
+            text="Throughput Report - Compare Recent Imports with Past Runs",
+            command=self.execute_history_report,
+            font=("Arial", 10),
+            state="disabled"  # Initially disabled
+        )
+        self.history_btn.pack(padx=10, pady=(0,5), fill="x")
+
+        # Export button
         self.export_btn = tk.Button(
             self.root,
-            text="Future Enhancement: Export PostScript_AllianceMerge to JSON Files",
-            command=lambda: None,  # Placeholder - no functionality yet
+            text=f"Export {self.EXPORT_TABLE} to JSON Files",
+            command=self.execute_export,
             bg="#2196F3",
             fg="white",
             font=("Arial", 12, "bold"),
             height=2,
-            state="disabled"  # Disabled until we add this functionality
+            state="disabled"  # Initially disabled
         )
         self.export_btn.pack(padx=10, pady=(0,10), fill="x")
     def create_status_window(self):
@@ -487,20 +5053,34 @@ class ImporterGUI:
     def on_connection_field_changed(self, event=None):
         """Reset connection verification when connection fields change."""
         self.connection_verified = False
+        self.discard_connection_pool()
         self.conn_status_label.config(text="Connection not tested", fg="gray")
         self.update_import_button_state()
     def update_import_button_state(self):
         """
-        Enable/disable import button based on prerequisites.
+        Enable/disable import and export buttons based on prerequisites.
         
         Import button is only enabled when:
         1. Connection has been tested successfully
         2. A directory has been selected
+        
+        Export and throughput report buttons only need a successful
+        connection test, and the dry run button only needs a directory. The watch button follows the
+        import button; while a watch runs only its Stop button is enabled.
         """
+        if self.watch_stop:
+            return
+        
         if self.connection_verified and self.directory_var.get().strip():
             self.execute_btn.config(state="normal")
         else:
             self.execute_btn.config(state="disabled")
+        
+        self.dry_run_btn.config(state="normal" if self.directory_var.get().strip() else "disabled")
+        self.watch_btn.config(state=self.execute_btn["state"])
+        
+        self.export_btn.config(state="normal" if self.connection_verified else "disabled")
+        self.history_btn.config(state=self.export_btn["state"])
     def test_connection(self):
         """
         Test database connection with provided credentials.
@@ -521,16 +5101,18 @@ class ImporterGUI:
     def run_connection_test(self):
         """Execute the connection test."""
         try:
-            # Attempt to connect
-            test_conn = mysql.connector.connect(
+            # Attempt to connect - the verified connection is kept in a session
+            # pool so the import can reuse it instead of reconnecting
+            pool = ConnectionPool(
                 host=self.host_entry.get().strip(),
                 user=self.user_entry.get().strip(),
                 password=self.password_entry.get().strip(),
                 database=self.database_entry.get().strip(),
-                port=int(self.port_entry.get().strip()),
-                connect_timeout=10
+                port=int(self.port_entry.get().strip())
             )
-            test_conn.close()
+            pool.release(pool.acquire())
+            self.discard_connection_pool()
+            self.connection_pool = pool
             
             # Success
             self.connection_verified = True
@@ -622,6 +5204,9 @@ class ImporterGUI:
         
         # Disable buttons during import
         self.execute_btn.config(state="disabled")
+        self.dry_run_btn.config(state="disabled")
+        self.watch_btn.config(state="disabled")
+        self.export_btn.config(state="disabled")
         self.test_conn_btn.config(state="disabled")
         
         # Clear status window and reset progress bar
@@ -640,71 +5225,294 @@ class ImporterGUI:
         This method runs in a background thread, so we need to be careful
         about updating the UI (must use update_idletasks).
         """
+        pool = self.use_connection_pool()
+        importer = None
         try:
             self.log_status("Starting import process...\n")
         
-            # Create importer instance with callback
+            # Create importer instance with callback, reusing the session's
+            # verified connections
             importer = JSONtoMySQL(
                 host=self.host_entry.get().strip(),
                 user=self.user_entry.get().strip(),
                 password=self.password_entry.get().strip(),
                 database=self.database_entry.get().strip(),
                 port=int(self.port_entry.get().strip()),
-                status_callback=self.log_status
+                status_callback=self.log_status,
+                pool=pool
             )
         
-            # Get list of files for progress tracking
+            # import_directory() logs each file and the summary through our
+            # callback; we only need to move the progress bar
             directory = self.directory_var.get().strip()
-            json_files = list(Path(directory).glob('*.json'))
-            total_files = len(json_files)
+            summary = importer.import_directory(directory, progress_callback=self.update_progress)
         
-            if total_files == 0:
-                self.log_status("No JSON files found in the selected directory")
-                importer.close()
-                return
+            importer.close()
+            
+            # Remember the load rate so dry runs can predict load times
+            if summary['rows_per_sec']:
+                self.measured_rows_per_sec = summary['rows_per_sec']
+                self.save_config()
+        
+            # Complete progress bar
+            self.progress_bar["value"] = 100
+        
+            messagebox.showinfo("Success", "Import process completed!\nCheck status window for details.")
+        
+        except mysql.connector.Error as err:
+            error_msg = f"Database Error: {err}"
+            self.log_status(f"\nERROR: {error_msg}")
+            messagebox.showerror("Database Error", error_msg)
+        
+        except Exception as e:
+            error_msg = f"Error: {str(e)}"
+            self.log_status(f"\nERROR: {error_msg}")
+            messagebox.showerror("Error", error_msg)
+        
+        finally:
+            self.close_importer(importer)
+            # Re-enable buttons
+            self.execute_btn.config(state="normal")
+            self.dry_run_btn.config(state="normal")
+            self.watch_btn.config(state="normal")
+            self.export_btn.config(state="normal")
+            self.test_conn_btn.config(state="normal")    
+    def toggle_watch(self):
+        """Start watching the selected folder, or stop the running watch."""
+        if self.watch_stop:
+            self.watch_stop.set()
+            self.watch_btn.config(state="disabled", text="Stopping...")
+            return
+        
+        if not self.validate_import_inputs():
+            return
+        
+        # Only the Stop button stays enabled while watching
+        self.watch_stop = threading.Event()
+        self.execute_btn.config(state="disabled")
+        self.dry_run_btn.config(state="disabled")
+        self.export_btn.config(state="disabled")
+        self.test_conn_btn.config(state="disabled")
+        self.watch_btn.config(text="Stop Watching Folder")
+        
+        thread = threading.Thread(target=self.run_watch, args=(self.watch_stop,))
+        thread.start()
+    def run_watch(self, stop_event):
+        """
+        Import new or changed files until the watch is stopped (background thread).
+        """
+        pool = self.use_connection_pool()
+        importer = None
+        try:
+            importer = JSONtoMySQL(
+                host=self.host_entry.get().strip(),
+                user=self.user_entry.get().strip(),
+                password=self.password_entry.get().strip(),
+                database=self.database_entry.get().strip(),
+                port=int(self.port_entry.get().strip()),
+                status_callback=self.log_status,
+                pool=pool
+            )
+            importer.watch_directory(self.directory_var.get().strip(), stop_event=stop_event)
+        
+        except mysql.connector.Error as err:
+            error_msg = f"Database Error: {err}"
+            self.log_status(f"\nERROR: {error_msg}")
+            messagebox.showerror("Database Error", error_msg)
+        
+        except Exception as e:
+            error_msg = f"Error: {str(e)}"
+            self.log_status(f"\nERROR: {error_msg}")
+            messagebox.showerror("Error", error_msg)
+        
+        finally:
+            self.close_importer(importer)
+            # Re-enable buttons
+            self.watch_stop = None
+            self.watch_btn.config(text="Watch Folder - Import New Files Automatically")
+            self.update_import_button_state()
+            self.test_conn_btn.config(state="normal")
+    def execute_dry_run(self):
+        """Check the selected directory's files without touching the database."""
+        if not self.directory_var.get().strip():
+            messagebox.showerror("Validation Error", "JSON files directory is required")
+            return
+        
+        # Disable buttons during the dry run
+        self.execute_btn.config(state="disabled")
+        self.dry_run_btn.config(state="disabled")
+        self.watch_btn.config(state="disabled")
+        self.export_btn.config(state="disabled")
+        self.test_conn_btn.config(state="disabled")
         
-            self.log_status(f"Found {total_files} JSON file(s) to import\n")
+        # Clear status window and reset progress bar
+        self.status_text.config(state="normal")
+        self.status_text.delete(1.0, "end")
+        self.status_text.config(state="disabled")
+        self.progress_bar["value"] = 0
         
-            # Track results manually since we're not using import_directory()
-            successful_imports = []
-            failed_imports = []
+        # Run the dry run in separate thread to prevent UI freezing
+        thread = threading.Thread(target=self.run_dry_run)
+        thread.start()
+    def run_dry_run(self):
+        """
+        Run the dry run with progress tracking (background thread).
         
-            # Import with progress updates
-            for idx, json_file in enumerate(json_files, 1):
-                success, message = importer.import_json_file(str(json_file))
+        No connection is opened, so this works before the connection test.
+        """
+        try:
+            importer = JSONtoMySQL(
+                host=self.host_entry.get().strip(),
+                user=self.user_entry.get().strip(),
+                password=self.password_entry.get().strip(),
+                database=self.database_entry.get().strip(),
+                status_callback=self.log_status,
+                connect=False
+            )
             
-                # Track results
-                if success:
-                    successful_imports.append(json_file.name)
-                else:
-                    failed_imports.append(json_file.name)
+            directory = self.directory_var.get().strip()
+            summary = importer.preflight_directory(
+                directory, rows_per_sec=self.measured_rows_per_sec,
+                progress_callback=self.update_progress
+            )
             
-                # Update progress bar
-                progress = (idx / total_files) * 100
-                self.progress_bar["value"] = progress
-                self.root.update_idletasks()
+            self.progress_bar["value"] = 100
+            
+            if summary['failed']:
+                messagebox.showwarning(
+                    "Dry Run",
+                    f"{summary['failed']} malformed file(s) found.\nCheck status window for details."
+                )
+            else:
+                messagebox.showinfo("Dry Run", "All files are ready to import.\nCheck status window for details.")
+        
+        except Exception as e:
+            error_msg = f"Error: {str(e)}"
+            self.log_status(f"\nERROR: {error_msg}")
+            messagebox.showerror("Error", error_msg)
         
-            # Display summary manually (mimicking what import_directory() does)
-            self.log_status("\n" + "="*60)
-            self.log_status("IMPORT SUMMARY")
-            self.log_status("="*60)
-            self.log_status(f"Total files processed: {total_files}")
-            self.log_status(f"Successfully imported: {len(successful_imports)}")
-            self.log_status(f"Failed imports: {len(failed_imports)}")
+        finally:
+            # Re-enable buttons
+            self.update_import_button_state()
+            self.test_conn_btn.config(state="normal")
+    def execute_history_report(self):
+        """Show each table's recent import throughput against its history."""
+        if not self.connection_verified:
+            messagebox.showerror("Validation Error", "Please test the database connection first")
+            return
         
-            if failed_imports:
-                self.log_status("\nFailed files:")
-                for filename in failed_imports:
-                    self.log_status(f"  - {filename}")
+        self.history_btn.config(state="disabled")
         
-            self.log_status("="*60)
+        # Clear status window
+        self.status_text.config(state="normal")
+        self.status_text.delete(1.0, "end")
+        self.status_text.config(state="disabled")
         
+        # Query in separate thread to prevent UI freezing
+        thread = threading.Thread(target=self.run_history_report)
+        thread.start()
+    def run_history_report(self):
+        """Run throughput_report over the session's connection (background thread)."""
+        pool = self.use_connection_pool()
+        importer = None
+        try:
+            importer = JSONtoMySQL(
+                host=self.host_entry.get().strip(),
+                user=self.user_entry.get().strip(),
+                password=self.password_entry.get().strip(),
+                database=self.database_entry.get().strip(),
+                port=int(self.port_entry.get().strip()),
+                status_callback=self.log_status,
+                pool=pool
+            )
+            report = importer.throughput_report()
             importer.close()
+            
+            regressed = [entry['table'] for entry in report if entry['regressed']]
+            if regressed:
+                messagebox.showwarning(
+                    "Throughput Report",
+                    f"{len(regressed)} table(s) importing slower than usual.\nCheck status window for details."
+                )
         
-            # Complete progress bar
-            self.progress_bar["value"] = 100
+        except mysql.connector.Error as err:
+            error_msg = f"Database Error: {err}"
+            self.log_status(f"\nERROR: {error_msg}")
+            messagebox.showerror("Database Error", error_msg)
         
-            messagebox.showinfo("Success", "Import process completed!\nCheck status window for details.")
+        except Exception as e:
+            error_msg = f"Error: {str(e)}"
+            self.log_status(f"\nERROR: {error_msg}")
+            messagebox.showerror("Error", error_msg)
+        
+        finally:
+            self.close_importer(importer)
+            self.update_import_button_state()
+    def execute_export(self):
+        """Ask for an output folder and export the merge table to JSON."""
+        if not self.connection_verified:
+            messagebox.showerror("Validation Error", "Please test the database connection first")
+            return
+        
+        output_directory = filedialog.askdirectory(title="Select Export Destination Folder")
+        if not output_directory:
+            return
+        
+        # Disable buttons during export
+        self.execute_btn.config(state="disabled")
+        self.dry_run_btn.config(state="disabled")
+        self.watch_btn.config(state="disabled")
+        self.export_btn.config(state="disabled")
+        self.test_conn_btn.config(state="disabled")
+        
+        # Clear status window and reset progress bar
+        self.status_text.config(state="normal")
+        self.status_text.delete(1.0, "end")
+        self.status_text.config(state="disabled")
+        self.progress_bar["value"] = 0
+        
+        # Run export in separate thread to prevent UI freezing
+        thread = threading.Thread(target=self.run_export, args=(output_directory,))
+        thread.start()
+    def run_export(self, output_directory: str):
+        """
+        Run the export with progress tracking (background thread).
+        """
+        pool = self.use_connection_pool()
+        importer = None
+        try:
+            self.log_status("Starting export process...\n")
+            
+            importer = JSONtoMySQL(
+                host=self.host_entry.get().strip(),
+                user=self.user_entry.get().strip(),
+                password=self.password_entry.get().strip(),
+                database=self.database_entry.get().strip(),
+                port=int(self.port_entry.get().strip()),
+                status_callback=self.log_status,
+                pool=pool
+            )
+            
+            if 'EntityType' in importer._table_columns(self.EXPORT_TABLE):
+                # One Alliance_Exception_<entity>.json file per entity, in parallel
+                summary = importer.export_partitioned(
+                    self.EXPORT_TABLE, output_directory, progress_callback=self.update_progress
+                )
+                success = summary['failed'] == 0
+                message = f"{summary['failed']} file(s) failed to export - see status window"
+            else:
+                output_path = str(Path(output_directory) / f"{self.EXPORT_TABLE}.json")
+                success, message = importer.export_table_to_json(
+                    self.EXPORT_TABLE, output_path, progress_callback=self.update_progress
+                )
+            
+            importer.close()
+            
+            if success:
+                self.progress_bar["value"] = 100
+                messagebox.showinfo("Success", "Export process completed!\nCheck status window for details.")
+            else:
+                messagebox.showerror("Export Error", message)
         
         except mysql.connector.Error as err:
             error_msg = f"Database Error: {err}"
@@ -717,22 +5525,77 @@ class ImporterGUI:
             messagebox.showerror("Error", error_msg)
         
         finally:
+            self.close_importer(importer)
             # Re-enable buttons
-            self.execute_btn.config(state="normal")
-            self.test_conn_btn.config(state="normal")    
+            self.update_import_button_state()
+            self.test_conn_btn.config(state="normal")
+    def update_progress(self, done: int, total: int):
+        """Update the progress bar (files imported or rows exported so far)."""
+        self.progress_bar["value"] = (done / total) * 100 if total else 0
+        self.root.update_idletasks()
+    def use_connection_pool(self) -> Optional[ConnectionPool]:
+        """Session pool for a background task; the task ends with close_importer."""
+        with self.pool_lock:
+            self.pool_users += 1
+            return self.connection_pool
+    def close_importer(self, importer: Optional[JSONtoMySQL]):
+        """
+        Close a background task's importer and let go of the session pool.
+        
+        Runs in the task's finally block, so connections go back to the pool
+        even when the task failed (closing an importer twice is harmless). A
+        pool discarded while tasks were running is closed once the last of
+        them gets here.
+        """
+        try:
+            if importer:
+                importer.close()
+        except Exception as e:
+            self.log_status(f"Could not close the database connection: {e}")
+        finally:
+            with self.pool_lock:
+                self.pool_users -= 1
+                retired = [] if self.pool_users else self.retired_pools
+                if not self.pool_users:
+                    self.retired_pools = []
+            for pool in retired:
+                pool.close_all()
+    def discard_connection_pool(self):
+        """
+        Close the session's pooled connections (e.g. credentials changed).
+        
+        While an import, watch, export or report is still using the pool it is
+        only detached here, and closed when that task finishes (see
+        close_importer) - closing it now would pull the connections out from
+        under the running task.
+        """
+        with self.pool_lock:
+            pool, self.connection_pool = self.connection_pool, None
+            if pool and self.pool_users:
+                self.retired_pools.append(pool)
+                return
+        if pool:
+            pool.close_all()
+    def on_close(self):
+        """Stop any folder watch, release pooled connections and close the window."""
+        if self.watch_stop:
+            self.watch_stop.set()
+        self.discard_connection_pool()
+        self.root.destroy()
     def save_config(self):
-        """Save host and port to configuration file."""
+        """Save host, port and the last measured load rate to configuration file."""
         try:
             config = {
                 'host': self.host_entry.get().strip(),
-                'port': self.port_entry.get().strip()
+                'port': self.port_entry.get().strip(),
+                'rows_per_sec': self.measured_rows_per_sec
             }
             with open(self.CONFIG_FILE, 'w') as f:
                 json.dump(config, f)
         except Exception as e:
             print(f"Could not save configuration: {e}")
     def load_config(self):
-        """Load host and port from configuration file if it exists."""
+        """Load host, port and the last load rate from configuration file if it exists."""
         try:
             if Path(self.CONFIG_FILE).exists():
                 with open(self.CONFIG_FILE, 'r') as f:
@@ -746,10 +5609,15 @@ class ImporterGUI:
                 if 'port' in config and config['port']:
                     self.port_entry.delete(0, 'end')
                     self.port_entry.insert(0, config['port'])
+                
+                if config.get('rows_per_sec'):
+                    self.measured_rows_per_sec = config['rows_per_sec']
         except Exception as e:
             print(f"Could not load configuration: {e}")
 
 if __name__ == "__main__":
+    # Required for parallel NDJSON parsing in the frozen (PyInstaller) executable
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = ImporterGUI(root)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,960 @@
+"""
+Tests for JSONtoMySQL that run without a MySQL server.
+
+mysql.connector.connect is replaced by FakeConnection, which records every
+statement and returns canned results, so the import logic can be exercised
+end to end against temporary JSON files.
+"""
+
+import json
+import re
+import sys
+import tempfile
+import unittest
+import zlib
+from operator import itemgetter
+from pathlib import Path
+from unittest import mock
+
+import mysql.connector
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import JSONtoMySQL as importer_module
+from JSONtoMySQL import JSONtoMySQL
+
+
+class FakeCursor:
+    """Cursor that logs statements on its connection and returns canned rows."""
+    def __init__(self, connection, **kwargs):
+        self.connection = connection
+        self.kwargs = kwargs
+        self.rows = []
+        self.rowcount = 0
+        self.description = None
+        self.executed = None
+    def execute(self, sql, params=None, **kwargs):
+        self.connection.check('execute')
+        self.connection.statements.append((sql, params))
+        if self.kwargs.get('prepared') and sql is not self.executed:
+            # Like mysql-connector: only the identical string object is reused
+            self.connection.prepares += 1
+            self.executed = sql
+        self.rows = []
+        for fragment, rows in self.connection.results.items():
+            if fragment in sql:
+                self.rows = list(rows(sql, params) if callable(rows) else rows)
+                break
+    def executemany(self, sql, seq_params):
+        self.connection.check('execute')
+        seq_params = list(seq_params)
+        self.connection.statements.append((sql, seq_params))
+        self.rowcount = len(seq_params)
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+    def fetchmany(self, size=1):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """
+    Stand-in for a mysql.connector connection.
+    
+    broken makes execute, commit and rollback raise, as a lost connection
+    does; reconnect() repairs it unless reconnect_fails is set.
+    """
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.statements = []
+        self.results = {'information_schema': [(0,)]}
+        self.broken = False
+        self.reconnect_fails = False
+        self.reconnects = 0
+        self.prepares = 0
+    def check(self, operation):
+        if self.broken:
+            raise mysql.connector.errors.OperationalError(
+                msg=f"Connection lost during {operation}")
+    def cursor(self, **kwargs):
+        return FakeCursor(self, **kwargs)
+    def commit(self):
+        self.check('commit')
+    def rollback(self):
+        self.check('rollback')
+    def close(self):
+        pass
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        self.check('ping')
+    def is_connected(self):
+        return not self.broken
+    def reconnect(self, attempts=1, delay=0):
+        self.reconnects += 1
+        if self.reconnect_fails:
+            raise mysql.connector.errors.InterfaceError(msg="Can't connect to MySQL server")
+        self.broken = False
+
+
+class ImporterTestCase(unittest.TestCase):
+    """Base class: a temp directory and importers on fake connections."""
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = Path(self.temp_dir.name)
+        self.connections = []
+        
+        def connect(**kwargs):
+            connection = FakeConnection(**kwargs)
+            self.connections.append(connection)
+            return connection
+        patcher = mock.patch.object(importer_module.mysql.connector, 'connect', side_effect=connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.temp_dir.cleanup)
+    def make_importer(self, **kwargs) -> JSONtoMySQL:
+        options = {'verify': False, 'record_history': False, 'duplicate_keys': None}
+        options.update(kwargs)
+        importer = JSONtoMySQL('localhost', 'user', 'password', 'test', **options)
+        importer.RETRY_BACKOFF_SECONDS = 0
+        self.addCleanup(importer.close)
+        return importer
+    def write_json(self, name: str, records) -> Path:
+        path = self.directory / name
+        path.write_text(json.dumps(records), encoding='utf-8')
+        return path
+
+
+class ConnectionFailureTests(ImporterTestCase):
+    def test_lost_connection_fails_only_that_file(self):
+        self.write_json('a_first.json', [{'SourceIDValue': str(i)} for i in range(20)])
+        self.write_json('b_second.json', [{'SourceIDValue': str(i)} for i in range(10)])
+        importer = self.make_importer()
+        connection = importer.connection
+        
+        # The first file's CREATE TABLE hits a dead connection; the rollback
+        # after it fails the same way and the importer has to reconnect
+        original_execute = FakeCursor.execute
+        def execute(cursor, sql, params=None, **kwargs):
+            if sql.startswith('CREATE TABLE') and '`a_first' in sql:
+                cursor.connection.broken = True
+            return original_execute(cursor, sql, params, **kwargs)
+        with mock.patch.object(FakeCursor, 'execute', execute):
+            summary = importer.import_directory(str(self.directory), prefetch=False)
+        
+        self.assertEqual(summary['failed_files'], ['a_first.json'])
+        self.assertEqual(summary['success_files'], ['b_second.json'])
+        self.assertEqual(connection.reconnects, 1)
+    def test_unrecoverable_connection_does_not_abort_run(self):
+        self.write_json('a_first.json', [{'SourceIDValue': '1'}])
+        self.write_json('b_second.json', [{'SourceIDValue': '2'}])
+        importer = self.make_importer()
+        importer.connection.broken = True
+        importer.connection.reconnect_fails = True
+        
+        summary = importer.import_directory(str(self.directory), prefetch=False)
+        
+        self.assertEqual(summary['total'], 2)
+        self.assertEqual(sorted(summary['failed_files']), ['a_first.json', 'b_second.json'])
+
+    def test_lost_range_connection_reports_the_insert_error(self):
+        path = self.write_json('cases.json', [{'SourceIDValue': str(i)} for i in range(40)])
+        importer = self.make_importer(load_workers=2)
+        importer.PARALLEL_LOAD_MIN_ROWS = 10
+        
+        # One range's connection drops mid-insert; its rollback then fails too
+        original_executemany = FakeCursor.executemany
+        def executemany(cursor, sql, seq_params):
+            if cursor.connection is not importer.connection and '__staging' in sql:
+                cursor.connection.broken = True
+            return original_executemany(cursor, sql, seq_params)
+        with mock.patch.object(FakeCursor, 'executemany', executemany):
+            success, message = importer.import_json_file(str(path))
+        
+        self.assertFalse(success)
+        self.assertIn('during execute', message)
+        self.assertNotIn('during rollback', message)
+
+
+class ResumeSignatureTests(ImporterTestCase):
+    def test_row_order_options_change_the_signature(self):
+        path = str(self.write_json('cases.json', [{'SourceIDValue': '1'}]))
+        column_types = {'SourceIDValue': 'VARCHAR(255)'}
+        plain = self.make_importer(connect=False)
+        signature = plain._file_signature(path, column_types)
+        
+        self.assertEqual(signature, self.make_importer(connect=False)._file_signature(path, column_types))
+        for options in ({'duplicate_keys': ('SourceIDValue',), 'on_duplicate': 'dedupe'},
+                        {'natural_key': ('SourceIDValue',)},
+                        {'flatten': True}):
+            with self.subTest(options=options):
+                other = self.make_importer(connect=False, **options)
+                self.assertNotEqual(signature, other._file_signature(path, column_types))
+        self.assertNotEqual(signature, plain._file_signature(path, column_types, ('SourceIDValue',)))
+    def test_dropped_rows_change_the_signature_with_dedupe(self):
+        path = str(self.write_json('cases.json', [{'SourceIDValue': '1'}]))
+        column_types = {'SourceIDValue': 'VARCHAR(255)'}
+        dedupe = self.make_importer(connect=False, duplicate_keys=('SourceIDValue',),
+                                    on_duplicate='dedupe')
+        self.assertNotEqual(dedupe._file_signature(path, column_types, (), [3]),
+                            dedupe._file_signature(path, column_types, (), [3, 7]))
+        self.assertEqual(dedupe._file_signature(path, column_types, (), {7, 3}),
+                         dedupe._file_signature(path, column_types, (), [3, 7]))
+        plain = self.make_importer(connect=False)
+        self.assertEqual(plain._file_signature(path, column_types, (), [3]),
+                         plain._file_signature(path, column_types))
+
+
+class DuplicateKeyTests(ImporterTestCase):
+    def import_both(self, importer):
+        self.write_json('a_first.json', [{'SourceIDValue': 'ABC-1', 'EntityType': 'Case'}])
+        self.write_json('b_second.json', [{'SourceIDValue': 'abc-1', 'EntityType': 'case'}])
+        return [importer.import_json_file(str(self.directory / name))[0]
+                for name in ('a_first.json', 'b_second.json')]
+    def test_keys_differing_in_case_are_duplicates(self):
+        importer = self.make_importer(duplicate_keys=('SourceIDValue',), on_duplicate='reject')
+        self.assertEqual(self.import_both(importer), [True, False])
+    def test_keys_differing_in_accents_or_trailing_spaces_are_duplicates(self):
+        importer = self.make_importer(duplicate_keys=('SourceIDValue',), on_duplicate='reject')
+        self.write_json('cases.json', [{'SourceIDValue': 'José-1'}, {'SourceIDValue': 'JOSE-1 '}])
+        self.assertFalse(importer.import_json_file(str(self.directory / 'cases.json'))[0])
+    def test_bloom_filter_hit_is_confirmed_whatever_the_case(self):
+        importer = self.make_importer(duplicate_keys=('SourceIDValue',), on_duplicate='reject')
+        importer.duplicate_tracker.exact_key_limit = 0
+        # The loaded table holds the value as first written; a _ci collation matches it
+        importer.connection.results['CAST('] = [('ABC-1',)]
+        self.assertEqual(self.import_both(importer), [True, False])
+        self.assertEqual(importer.duplicate_tracker.mode, 'bloom')
+
+
+class DuplicateKeyTrackerTests(unittest.TestCase):
+    columns = ['EntityType', 'SourceIDValue']
+    def test_bloom_filter_has_no_false_negatives(self):
+        # Sized for the probes below as well, since add() also records them
+        bloom = importer_module.BloomFilter(10000)
+        keys = [('case', str(i)) for i in range(5000)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(bloom.add(key) for key in keys))
+        false_positives = sum(bloom.add(('person', str(i))) for i in range(5000))
+        self.assertLess(false_positives, 5000 * 0.03)
+    def test_exact_set_is_folded_into_the_filter_past_the_limit(self):
+        tracker = importer_module.DuplicateKeyTracker(('SourceIDValue',), exact_key_limit=3)
+        keys, duplicates, _ = tracker.find_duplicates('cases', self.columns, [('case', '1'), ('case', '2')])
+        self.assertEqual(duplicates, [])
+        tracker.add('cases', keys)
+        self.assertEqual(tracker.mode, 'exact')
+        lookups = []
+        def lookup(entity, tables, candidates):
+            lookups.append((entity, tables, sorted(candidates)))
+            return set(candidates)
+        keys, duplicates, earlier = tracker.find_duplicates(
+            'more_cases', self.columns, [('case', '3'), ('Case', '1')], lookup)
+        self.assertEqual(tracker.mode, 'bloom')
+        self.assertEqual((duplicates, earlier), ([1], 1))
+        # Only the flagged key is looked up, in the table it was loaded into
+        self.assertEqual(lookups, [('case', ['cases'], [('case', '1')])])
+    def test_filter_hits_not_found_in_loaded_tables_are_not_duplicates(self):
+        tracker = importer_module.DuplicateKeyTracker(('SourceIDValue',), exact_key_limit=0)
+        keys, _, _ = tracker.find_duplicates('cases', self.columns, [('case', '1')])
+        tracker.add('cases', keys)
+        # Every bit set: every key is a (false) candidate
+        tracker.bloom.bits = bytearray(b'\xff' * len(tracker.bloom.bits))
+        rows = [('case', '2'), ('case', '3'), ('case', '2'), ('person', '1')]
+        keys, duplicates, earlier = tracker.find_duplicates(
+            'more_cases', self.columns, rows, lambda entity, tables, candidates: set())
+        # Only the repeat within the file remains
+        self.assertEqual((duplicates, earlier), ([2], 0))
+
+    def test_reloaded_table_replaces_its_earlier_keys(self):
+        tracker = importer_module.DuplicateKeyTracker(('SourceIDValue',), exact_key_limit=100)
+        def load(table_name, rows):
+            keys, duplicates, _ = tracker.find_duplicates(table_name, self.columns, rows)
+            tracker.add(table_name, keys, duplicates)
+            return duplicates
+        self.assertEqual(load('cases', [('case', '1'), ('case', '2')]), [])
+        # The same table again: not a duplicate of itself, and key 2 is gone
+        self.assertEqual(load('cases', [('case', '1')]), [])
+        self.assertEqual(load('more_cases', [('case', '2'), ('case', '1')]), [1])
+
+
+class FlattenTests(unittest.TestCase):
+    def test_empty_object_is_kept(self):
+        flattener = importer_module.RecordFlattener()
+        rows = [flattener.flatten(record, 'cases', i)
+                for i, record in enumerate([{'a': {}, 'n': 1}, {'a': {'b': 2}, 'n': 2}], 1)]
+        self.assertEqual(rows, [{'a': {}, 'n': 1}, {'a__b': 2, 'n': 2}])
+    def test_colliding_names_are_refused(self):
+        for record in ({'a__b': 1, 'a': {'b': 2}},
+                       {'a': {'b': 2}, 'a__b': 1},
+                       {'items': [{'parent_id': 7}]}):
+            with self.subTest(record=record):
+                with self.assertRaises(ValueError):
+                    importer_module.RecordFlattener().flatten(record, 'cases', 1)
+    def test_collision_across_records_is_refused(self):
+        flattener = importer_module.RecordFlattener()
+        flattener.flatten({'a': {'b': 2}}, 'cases', 1)
+        with self.assertRaisesRegex(ValueError, r'a\.b and a__b .* column a__b'):
+            flattener.flatten({'a__b': 1}, 'cases', 2)
+
+
+class FlattenImportTests(ImporterTestCase):
+    def load(self, fail_children=False):
+        """Import a file with a child table; statements and commits in one list."""
+        path = self.write_json('cases.json', [
+            {'SourceIDValue': 'A1', 'Charges': [{'code': 'x'}, {'code': 'y'}]},
+            {'SourceIDValue': 'A2', 'Charges': [{'code': 'z'}]},
+        ])
+        importer = self.make_importer(flatten=True)
+        connection = importer.connection
+        connection.commit = lambda: connection.statements.append(('COMMIT', None))
+        if fail_children:
+            with mock.patch.object(importer, '_insert_child_rows', side_effect=RuntimeError('boom')):
+                success = importer.import_json_file(str(path))[0]
+        else:
+            success = importer.import_json_file(str(path))[0]
+        statements = [(sql.split()[0], sql, params) for sql, params in connection.statements]
+        first_insert = next(i for i, (verb, sql, _) in enumerate(statements)
+                            if verb == 'INSERT' and '`cases`' in sql)
+        return success, statements, first_insert
+    def test_child_tables_exist_before_parent_rows(self):
+        success, statements, first_insert = self.load()
+        self.assertTrue(success)
+        self.assertTrue(any(verb == 'CREATE' and '`cases__Charges`' in sql
+                            for verb, sql, _ in statements[:first_insert]))
+        after = [verb for verb, _, _ in statements[first_insert:]]
+        self.assertNotIn('CREATE', after)
+        self.assertNotIn('DROP', after)
+        # Explicit ids on both tables, matching the children's parent_id
+        inserts = {sql.split('`')[1]: (sql, params) for verb, sql, params in statements
+                   if verb == 'INSERT'}
+        parent_sql, parent_rows = inserts['cases']
+        child_sql, child_rows = inserts['cases__Charges']
+        self.assertIn('(`id`, ', parent_sql)
+        self.assertIn('(`id`, ', child_sql)
+        self.assertEqual([row[0] for row in parent_rows], [1, 2])
+        self.assertEqual([row[0] for row in child_rows], [1, 2, 3])
+        parent_id = re.findall(r'`(\w+)`', child_sql.split('VALUES')[0])[1:].index('parent_id')
+        self.assertEqual([row[parent_id] for row in child_rows], [1, 1, 2])
+    def test_failed_child_load_commits_no_parent_rows(self):
+        success, statements, first_insert = self.load(fail_children=True)
+        self.assertFalse(success)
+        self.assertNotIn('COMMIT', [verb for verb, _, _ in statements[first_insert:]])
+    def test_long_child_table_name_is_refused_before_any_ddl(self):
+        key = 'x' * 60
+        path = self.write_json('cases.json', [{'SourceIDValue': 'A1', key: [{'code': 'x'}]}])
+        importer = self.make_importer(flatten=True)
+        success, message = importer.import_json_file(str(path))
+        self.assertFalse(success)
+        self.assertIn('longer than 64', message)
+        self.assertFalse(any(sql.startswith(('CREATE', 'DROP')) and '`cases' in sql
+                             for sql, _ in importer.connection.statements))
+
+
+class JsonPathIndexTests(ImporterTestCase):
+    def test_index_is_added_after_commit(self):
+        path = self.write_json('cases.json', [{'SourceIDValue': 'A1', 'Address': {'City': 'X'}},
+                                              {'SourceIDValue': 'A2', 'Address': {'City': 'Y'}}])
+        importer = self.make_importer(json_indexes={'cases': ['Address.City']})
+        connection = importer.connection
+        connection.commit = lambda: connection.statements.append(('COMMIT', None))
+        self.assertTrue(importer.import_json_file(str(path))[0])
+        verbs = [sql.split()[0] for sql, _ in connection.statements]
+        self.assertIn('ALTER', verbs)
+        self.assertLess(verbs.index('COMMIT'), verbs.index('ALTER'))
+    def test_booleans_mixed_with_other_values_get_a_string_column(self):
+        cases = [([True, 1], 'VARCHAR(255)'), ([False, 'x'], 'VARCHAR(255)'),
+                 ([True, 2.5], 'VARCHAR(255)'), ([True, False], 'BOOLEAN'), ([1, 2], 'INT')]
+        for values, column_type in cases:
+            with self.subTest(values=values):
+                profile = importer_module.JsonPathProfile(['Address.Flag'], 10, 10)
+                for value in values:
+                    profile.add({'Address': {'Flag': value}})
+                self.assertEqual(profile.column_type('Address.Flag'), column_type)
+
+
+class PreflightTests(ImporterTestCase):
+    def test_files_are_planned_without_a_connection(self):
+        self.write_json('cases.json', [{'SourceIDValue': 'A1', 'n': 1}, {'SourceIDValue': 'A2', 'n': 2}])
+        self.write_json('empty.json', [])
+        (self.directory / 'broken.json').write_text('[{"SourceIDValue": ', encoding='utf-8')
+        importer = self.make_importer(connect=False)
+        summary = importer.preflight_directory(str(self.directory), rows_per_sec=1000)
+        
+        self.assertEqual(self.connections, [])
+        self.assertEqual((summary['total'], summary['ready'], summary['failed']), (3, 1, 1))
+        self.assertEqual(summary['failed_files'], ['broken.json'])
+        self.assertEqual(summary['empty_files'], ['empty.json'])
+        self.assertEqual(summary['rows'], 2)
+        self.assertAlmostEqual(summary['estimated_seconds'], 2 / 1000)
+        plan, = [plan for plan in summary['tables'] if plan['table'] == 'cases']
+        self.assertEqual(plan['column_types'], {'SourceIDValue': 'VARCHAR(255)', 'n': 'INT'})
+        self.assertIn('CREATE TABLE `cases`', plan['create_sql'])
+
+
+class WatchDirectoryTests(ImporterTestCase):
+    def test_new_and_changed_files_are_imported_once_settled(self):
+        self.write_json('old.json', [{'SourceIDValue': 'A1'}])
+        changes = iter([lambda: self.write_json('new.json', [{'SourceIDValue': 'B1'}]),
+                        lambda: None,
+                        lambda: self.write_json('old.json', [{'SourceIDValue': 'A1'}, {'SourceIDValue': 'A2'}])])
+        # Each wait between scans makes the next change to the directory
+        stop_event = mock.Mock()
+        stop_event.is_set.return_value = False
+        stop_event.wait.side_effect = lambda seconds: next(changes, lambda: None)()
+        importer = self.make_importer()
+        with mock.patch.object(importer, 'import_directory',
+                               wraps=importer.import_directory) as import_directory:
+            summary = importer.watch_directory(str(self.directory), poll_seconds=0, settle_seconds=0,
+                                               stop_event=stop_event, max_scans=6)
+        
+        self.assertEqual(summary['scans'], 6)
+        self.assertEqual(summary['imported_files'], ['new.json', 'old.json'])
+        # One batch per settled file; the unchanged file is never reloaded
+        batches = [[Path(path).name for path in call.kwargs['files']]
+                   for call in import_directory.call_args_list]
+        self.assertEqual(batches, [['new.json'], ['old.json']])
+    def test_duplicate_keys_are_checked_across_batches(self):
+        def write(name, *keys):
+            return lambda: self.write_json(name, [{'SourceIDValue': key, 'EntityType': 'case'}
+                                                  for key in keys])
+        changes = iter([write('a.json', 'A1'), lambda: None, write('b.json', 'A1'), lambda: None,
+                        write('a.json', 'A1', 'A2')])
+        stop_event = mock.Mock()
+        stop_event.is_set.return_value = False
+        stop_event.wait.side_effect = lambda seconds: next(changes, lambda: None)()
+        importer = self.make_importer(duplicate_keys=('SourceIDValue',), on_duplicate='reject')
+        summary = importer.watch_directory(str(self.directory), poll_seconds=0, settle_seconds=0,
+                                           stop_event=stop_event, max_scans=8)
+        
+        # b.json repeats a key of an earlier batch; a.json reloaded is not its own duplicate
+        self.assertEqual(summary['imported_files'], ['a.json', 'a.json'])
+        self.assertEqual(summary['failed_files'], ['b.json'])
+
+
+class FileOrderTests(ImporterTestCase):
+    def test_largest_first_with_empty_files_set_aside(self):
+        mb = 1024 * 1024
+        sizes = {'small.json': mb, 'huge.json': 3 * mb, 'medium.json': mb * 3 // 2, 'large.json': 2 * mb}
+        for name, size in sizes.items():
+            (self.directory / name).write_bytes(b' ' * size)
+        (self.directory / 'empty.json').write_bytes(b'[]\n')
+        messages = []
+        importer = self.make_importer(connect=False, status_callback=messages.append)
+        ordered, empty = importer._plan_file_order(sorted(self.directory.iterdir()), 2)
+        
+        self.assertEqual([path.name for path in ordered],
+                         ['huge.json', 'large.json', 'medium.json', 'small.json'])
+        self.assertEqual([path.name for path in empty], ['empty.json'])
+        # Each file goes to the less loaded worker: huge + small, then large + medium
+        plan, = [message for message in messages if message.startswith('Import order')]
+        self.assertIn('7.5 MB on 2 worker(s); planned critical path 4.0 MB', plan)
+        self.assertIn('largest file huge.json, 3.0 MB', plan)
+
+
+class PartitionExchangeTests(ImporterTestCase):
+    def load(self, unified_columns, partitions):
+        path = self.write_json('Alliance_Exception_case.json',
+                               [{'SourceIDValue': 'A1', 'Status': 'open'}, {'SourceIDValue': 'A2'}])
+        importer = self.make_importer(consolidate=True)
+        connection = importer.connection
+        connection.results = {'information_schema.columns': unified_columns,
+                              'information_schema.partitions': [(partitions,)],
+                              'information_schema': [(0,)]}
+        self.assertTrue(importer.import_json_file(str(path))[0])
+        return [sql for sql, _ in connection.statements
+                if not sql.startswith(('SELECT', 'SHOW', 'SET'))]
+    def test_rows_are_loaded_into_a_copy_and_exchanged(self):
+        statements = self.load([], 0)
+        self.assertIn('PARTITION BY LIST COLUMNS(`EntityType`) (PARTITION `p_case`', statements[0])
+        self.assertEqual(statements[1:4], [
+            'DROP TABLE IF EXISTS `Alliance_Exception__staging`',
+            'CREATE TABLE `Alliance_Exception__staging` LIKE `Alliance_Exception`',
+            'ALTER TABLE `Alliance_Exception__staging` REMOVE PARTITIONING',
+        ])
+        self.assertTrue(statements[4].startswith('INSERT INTO `Alliance_Exception__staging` (`id`, '))
+        self.assertEqual(statements[5:], [
+            'ALTER TABLE `Alliance_Exception` EXCHANGE PARTITION `p_case` '
+            'WITH TABLE `Alliance_Exception__staging`',
+            'DROP TABLE IF EXISTS `Alliance_Exception__staging`',
+        ])
+    def test_existing_table_gets_new_columns_and_partition(self):
+        statements = self.load([('id', 'bigint'), ('SourceIDValue', 'varchar'),
+                                ('EntityType', 'varchar')], 0)
+        self.assertEqual(statements[:2], [
+            'ALTER TABLE `Alliance_Exception` ADD COLUMN `Status` VARCHAR(255)',
+            'ALTER TABLE `Alliance_Exception` ADD PARTITION (PARTITION `p_case` VALUES IN (%s))',
+        ])
+        self.assertIn('EXCHANGE PARTITION `p_case`', statements[-2])
+
+
+class RunHistoryTests(ImporterTestCase):
+    def history(self, importer):
+        """Rows written to the run history, as dicts of the inserted columns."""
+        rows = []
+        for sql, params in importer.connection.statements:
+            if sql.startswith('INSERT INTO `import_runs`'):
+                names = re.findall(r'(\w+)[,)]', sql.split('VALUES')[0])
+                rows.append(dict(zip(names, params)))
+        return rows
+    def test_every_outcome_is_recorded(self):
+        self.write_json('cases.json', [{'SourceIDValue': 'A1'}, {'SourceIDValue': 'A2'}])
+        (self.directory / 'broken.json').write_text('[{"SourceIDValue": ', encoding='utf-8')
+        self.write_json('people.json', [{'SourceIDValue': 'P1'}])
+        importer = self.make_importer(record_history=True)
+        for name in ('cases.json', 'broken.json'):
+            importer.import_json_file(str(self.directory / name))
+        with mock.patch.object(importer, '_create_and_insert', side_effect=RuntimeError('boom')):
+            importer.import_json_file(str(self.directory / 'people.json'))
+        
+        imported, skipped, failed = self.history(importer)
+        self.assertEqual((imported['file_name'], imported['table_name'], imported['outcome'],
+                          imported['rows_loaded']), ('cases.json', 'cases', 'imported', 2))
+        self.assertEqual(imported['file_bytes'], (self.directory / 'cases.json').stat().st_size)
+        self.assertEqual((skipped['file_name'], skipped['outcome']), ('broken.json', 'skipped'))
+        self.assertEqual((failed['outcome'], failed['rows_loaded']), ('failed', None))
+        self.assertIn('boom', failed['message'])
+        self.assertEqual(len({row['run_id'] for row in (imported, skipped, failed)}), 1)
+    def test_history_that_cannot_be_written_does_not_fail_the_import(self):
+        path = self.write_json('cases.json', [{'SourceIDValue': 'A1'}])
+        importer = self.make_importer(record_history=True)
+        def refuse(sql, params):
+            raise mysql.connector.errors.ProgrammingError(msg='history table is read only')
+        importer.connection.results = {'import_runs': refuse, 'information_schema': [(0,)]}
+        self.assertTrue(importer.import_json_file(str(path))[0])
+
+
+class RangeExportTests(ImporterTestCase):
+    def range_key(self, primary_key, id_type):
+        importer = self.make_importer()
+        importer.connection.results = {
+            'key_column_usage': primary_key,
+            "column_name = 'id'": [(id_type,)] if id_type else [],
+        }
+        return importer._range_key_column('Alliance_Exception')
+    def test_integer_primary_key_is_used(self):
+        self.assertEqual(self.range_key([('SourceIDValue', 'bigint')], 'bigint'), 'SourceIDValue')
+    def test_natural_varchar_key_falls_back_to_id(self):
+        self.assertEqual(self.range_key([('SourceIDValue', 'varchar')], 'bigint'), 'id')
+    def test_no_integer_key_is_refused(self):
+        with self.assertRaisesRegex(ValueError, 'no integer key'):
+            self.range_key([('SourceIDValue', 'varchar')], None)
+
+
+class PreparedEngineTests(ImporterTestCase):
+    def test_statements_are_prepared_once_per_row_count(self):
+        importer = self.make_importer()
+        connection = importer.connection
+        rows = [(str(i), i) for i in range(5003)]
+        
+        # Several calls, as the chunked loaders make, each with adaptive batches
+        for chunk in range(3):
+            importer._insert_records(connection, 'cases', rows, ['SourceIDValue', 'n'],
+                                     first_id=chunk * len(rows) + 1, engine='prepared')
+        
+        executes = sum(1 for sql, _ in connection.statements if sql.startswith('INSERT'))
+        self.assertGreater(executes, 10)
+        # One statement for full batches, one for the leftover rows
+        self.assertEqual(connection.prepares, 2)
+        importer._close_prepared_inserts()
+        self.assertEqual(importer._prepared_inserts, {})
+
+
+class AdaptiveBatchSizerTests(ImporterTestCase):
+    def test_climbs_while_faster_then_turns_and_holds(self):
+        sizer = importer_module.AdaptiveBatchSizer(1000, 50, 100000)
+        sizer.record(1000, 1.0)      # First measurement: keep growing
+        self.assertEqual(sizer.size, 1500)
+        sizer.record(1500, 1.0)      # 1500 rows/sec beats 1000
+        self.assertEqual(sizer.size, 2250)
+        sizer.record(2250, 3.0)      # 750 rows/sec: slower, turn around
+        self.assertEqual(sizer.size, 1500)
+        sizer.record(1500, 2.0)      # Same rate: hold
+        self.assertEqual(sizer.size, 1500)
+        sizer.record(1500, 1.0)      # Faster again: climb
+        self.assertEqual(sizer.size, 2250)
+    def test_latency_spike_halves_the_size(self):
+        sizer = importer_module.AdaptiveBatchSizer(1000, 50, 100000)
+        sizer.record(1000, 1.0)
+        sizer.record(1500, 1.0)
+        sizer.record(2250, 60.0)
+        self.assertEqual(sizer.size, 1125)
+        self.assertIsNone(sizer.last_rate)
+    def test_size_stays_within_bounds_and_steps(self):
+        sizer = importer_module.AdaptiveBatchSizer(1000, 10, 2500, step=7)
+        # Ever faster batches climb to the largest multiple of the step
+        for faster in range(1, 11):
+            sizer.record(sizer.size, sizer.size / 1e6 / faster)
+            self.assertEqual(sizer.size % 7, 0)
+            self.assertLessEqual(sizer.size, 2500)
+        self.assertEqual(sizer.size, 2499)
+        # Stalled batches fall to the smallest
+        for _ in range(20):
+            sizer.record(sizer.size, 1e6)
+            self.assertGreaterEqual(sizer.size, 7)
+        self.assertEqual(sizer.size, sizer.min_rows)
+    def test_batches_are_capped_by_max_allowed_packet(self):
+        importer = self.make_importer()
+        importer.connection.results = {'max_allowed_packet': [(100000,)]}
+        rows = [('x' * 97,)] * 10
+        sizer = importer._batch_sizer(importer.connection, rows)
+        row_bytes = importer_module.AdaptiveBatchSizer.estimate_row_bytes(rows)
+        self.assertEqual(sizer.max_rows, int(100000 * importer.PACKET_FILL_RATIO / row_bytes))
+        self.assertLessEqual(sizer.size, sizer.max_rows)
+
+
+class ChecksumTests(ImporterTestCase):
+    def mysql_checksum(self, connection):
+        """Checksum query result computed from the rows the fake received."""
+        def render(value):
+            if value is None:
+                return '\x00'
+            if type(value) is float:
+                return repr(value).replace('e+', 'e')  # MySQL's text for a DOUBLE
+            return str(value)
+        def result(sql, params):
+            selected = re.findall(r"IFNULL\(`(\w+)`", sql)
+            total = count = 0
+            for statement, values in connection.statements:
+                if not statement.startswith('INSERT'):
+                    continue
+                columns = re.findall(r"`(\w+)`", statement.split('VALUES')[0])[1:]
+                if values and not isinstance(values[0], tuple):
+                    values = [tuple(values[i:i + len(columns)])
+                              for i in range(0, len(values), len(columns))]
+                for row in values:
+                    row = dict(zip(columns, row))
+                    text = '\x1f'.join(render(row[column]) for column in selected)
+                    total += zlib.crc32(text.encode('utf-8'))
+                    count += 1
+            return [(count, total)]
+        return result
+    def test_floats_in_text_columns_verify(self):
+        path = self.write_json('cases.json', [{'SourceIDValue': '1', 'v': 0.1},
+                                              {'SourceIDValue': '2', 'v': 1e20},
+                                              {'SourceIDValue': '3', 'v': 'abc'}])
+        for engine in ('text', 'prepared'):
+            with self.subTest(engine=engine):
+                importer = self.make_importer(verify=True, insert_engine=engine)
+                connection = importer.connection
+                connection.results['CRC32'] = self.mysql_checksum(connection)
+                importer.import_json_file(str(path))
+                self.assertEqual(importer.run_metrics['cases.json']['verification'], 'passed')
+                # Text engine: a list of row tuples; prepared: one flat list
+                inserted = [value for sql, values in connection.statements
+                            if sql.startswith('INSERT') for value in values]
+                inserted = [value for row in inserted
+                            for value in (row if isinstance(row, tuple) else [row])]
+                self.assertIn('0.1', inserted)
+                self.assertIn('1e+20', inserted)
+
+
+class ParallelParseTests(ImporterTestCase):
+    def write_lines(self, name, lines):
+        path = self.directory / name
+        path.write_bytes(b''.join(lines))
+        return str(path)
+    def test_ranges_start_on_line_boundaries(self):
+        lines = [json.dumps({'n': i, 'pad': 'x' * (i % 7)}).encode() + b'\n' for i in range(40)]
+        for name, content in (('trailing.jsonl', lines),
+                              ('no_trailing.jsonl', lines[:-1] + [lines[-1].rstrip(b'\n')])):
+            path = self.write_lines(name, content)
+            data = b''.join(content)
+            for parts in (1, 2, 3, 7, 40, 100):
+                with self.subTest(file=name, parts=parts):
+                    ranges = self.make_importer(connect=False)._split_ndjson_ranges(path, parts)
+                    self.assertEqual(ranges[0][0], 0)
+                    self.assertEqual(ranges[-1][1], len(data))
+                    self.assertLessEqual(len(ranges), parts)
+                    for (start, end), (next_start, _) in zip(ranges, ranges[1:]):
+                        self.assertEqual(end, next_start)
+                        self.assertLess(start, end)
+                        self.assertEqual(data[end - 1:end], b'\n')
+                    records = [json.loads(line) for start, end in ranges
+                               for line in data[start:end].splitlines()]
+                    self.assertEqual([record['n'] for record in records], list(range(40)))
+    def test_split_point_on_a_newline_starts_the_next_range(self):
+        # Two 11-byte lines: the midpoint is exactly the start of line two
+        path = self.write_lines('even.jsonl', [b'{"n": 100}\n', b'{"n": 200}\n'])
+        self.assertEqual(self.make_importer(connect=False)._split_ndjson_ranges(path, 2),
+                         [(0, 11), (11, 22)])
+    def test_merge_keeps_file_order_and_remaps_columns(self):
+        first = importer_module.RowBuffer()
+        for record in ({'a': 1, 'b': 'x'}, {'a': 2}):
+            first.add(record)
+        second = importer_module.RowBuffer()
+        for record in ({'c': 1.5, 'b': 'y'}, {'a': 3, 'b': 'z', 'c': None}):
+            second.add(record)
+        third = importer_module.RowBuffer()
+        third.add({'a': 4, 'b': 'w'})
+        
+        first.merge(second)
+        first.merge(third)
+        first.finalize()
+        self.assertEqual(first.columns, ['a', 'b', 'c'])
+        self.assertEqual(first.rows, [(1, 'x', None), (2, None, None), (None, 'y', 1.5),
+                                      (3, 'z', None), (4, 'w', None)])
+        self.assertEqual(first.column_types(), {'a': 'INT', 'b': 'VARCHAR(255)', 'c': 'DOUBLE'})
+        self.assertEqual(second.rows, [])
+
+
+class ExternalSortTests(unittest.TestCase):
+    def spills(self):
+        """Patch the run files, keeping a list of those created."""
+        created = []
+        make = importer_module.tempfile.TemporaryFile
+        def record(*args, **kwargs):
+            created.append(make(*args, **kwargs))
+            return created[-1]
+        patcher = mock.patch.object(importer_module.tempfile, 'TemporaryFile', side_effect=record)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return created
+    def test_runs_are_spilled_and_merged_in_order(self):
+        created = self.spills()
+        rows = [((i * 7919) % 1000, i) for i in range(1000)]
+        key = itemgetter(0)
+        self.assertEqual(list(importer_module._external_sort(iter(rows), key, 64)),
+                         sorted(rows, key=key))
+        self.assertEqual(len(created), 16)
+        self.assertTrue(all(spill.closed for spill in created))
+    def test_rows_that_fit_in_one_run_are_not_spilled(self):
+        created = self.spills()
+        rows = [(3,), (1,), (2,)]
+        self.assertEqual(list(importer_module._external_sort(iter(rows), None, 10)), [(1,), (2,), (3,)])
+        self.assertEqual(created, [])
+    def test_abandoned_merge_removes_its_runs(self):
+        created = self.spills()
+        merged = importer_module._external_sort(iter([(i,) for i in range(100, 0, -1)]), None, 10)
+        self.assertEqual(next(merged), (1,))
+        merged.close()
+        self.assertTrue(created)
+        self.assertTrue(all(spill.closed for spill in created))
+    def test_repeated_key_is_refused(self):
+        key = importer_module._natural_sort_key([0, 1], ['VARCHAR(255)', 'INT'])
+        rows = [('a', 1), ('a', 2), ('B', 1)]
+        self.assertEqual(list(importer_module._unique_sorted(iter(rows), key)), rows)
+        with self.assertRaisesRegex(ValueError, 'Duplicate natural key'):
+            list(importer_module._unique_sorted(iter([('a', 1), ('A', 1)]), key))
+    def test_keys_equal_under_the_collation_are_refused(self):
+        key = importer_module._natural_sort_key([0], ['VARCHAR(255)'])
+        for first, second in (('Jose', 'José'), ('ABC-1', 'abc-1 '), ('STRASSE', 'straße')):
+            with self.subTest(first=first, second=second):
+                with self.assertRaisesRegex(ValueError, 'Duplicate natural key'):
+                    list(importer_module._unique_sorted(iter(sorted([(first,), (second,)], key=key)), key))
+    def test_text_keys_sort_case_insensitively_as_text(self):
+        key = importer_module._natural_sort_key([0], ['VARCHAR(255)'])
+        self.assertEqual(sorted([('b',), (10,), ('A',), (9,)], key=key),
+                         [(10,), (9,), ('A',), ('b',)])
+
+
+class StreamingReaderTests(ImporterTestCase):
+    def test_records_split_across_tiny_chunks(self):
+        records = [{'s': 'a "quoted"\nvalue', 'n': -12.5e3, 'b': False, 'x': None, 'nest': {'k': [1]}}] * 5
+        path = self.write_json('cases.json', records)
+        for chunk_chars in (1, 2, 3, 7):
+            with self.subTest(chunk_chars=chunk_chars):
+                decoded = list(importer_module._iter_json_document(
+                    str(path), json.JSONDecoder(), chunk_chars=chunk_chars))
+                self.assertEqual(decoded, records)
+    def test_early_syntax_error_fails_without_reading_ahead(self):
+        text = '[{"a": 1}, {"a": #}, ' + ', '.join(['{"a": 2}'] * 100000) + ']'
+        path = self.directory / 'broken.json'
+        path.write_text(text, encoding='utf-8')
+        with self.assertRaises(json.JSONDecodeError) as expected:
+            json.loads(text)
+        
+        reads = []
+        real_open = open
+        def counting_open(*args, **kwargs):
+            f = real_open(*args, **kwargs)
+            real_read = f.read
+            def read(size=-1):
+                reads.append(size)
+                return real_read(size)
+            f.read = read
+            return f
+        with mock.patch.object(importer_module, 'open', counting_open, create=True):
+            with self.assertRaises(json.JSONDecodeError) as raised:
+                list(importer_module._iter_json_document(str(path), json.JSONDecoder(),
+                                                         chunk_chars=1024))
+        
+        self.assertEqual(len(reads), 1)
+        error = raised.exception
+        self.assertEqual((error.pos, error.lineno, error.colno),
+                         (expected.exception.pos, expected.exception.lineno,
+                          expected.exception.colno))
+        self.assertEqual(str(error), str(expected.exception))
+
+
+class StreamingImportTests(ImporterTestCase):
+    def inserted(self, connections, table_name='cases__staging'):
+        """Inserted rows (id first) of a table, over all the given connections, by id."""
+        rows = [row for connection in connections for sql, params in connection.statements
+                if sql.startswith(f'INSERT INTO `{table_name}`') for row in params]
+        return sorted(rows)
+    def test_duplicates_in_streamed_file_are_rejected(self):
+        path = self.write_json('cases.json', [{'SourceIDValue': str(i % 100)} for i in range(1000)])
+        importer = self.make_importer(stream_min_bytes=1, duplicate_keys=('SourceIDValue',),
+                                      on_duplicate='reject')
+        success, message = importer.import_json_file(str(path))
+        self.assertFalse(success)
+        self.assertIn('900 duplicate SourceIDValue', message)
+        self.assertEqual(self.inserted([importer.connection]), [])
+    def test_duplicates_dropped_from_streamed_file(self):
+        path = self.write_json('cases.json', [{'SourceIDValue': str(i % 100)} for i in range(1000)])
+        importer = self.make_importer(stream_min_bytes=1, duplicate_keys=('SourceIDValue',),
+                                      on_duplicate='dedupe', insert_engine='text')
+        importer.STREAM_CHUNK_ROWS = 30
+        self.assertEqual(importer.import_json_file(str(path))[0], True)
+        self.assertEqual(self.inserted([importer.connection]),
+                         [(i + 1, str(i)) for i in range(100)])
+    def test_streamed_file_resumes_from_checkpoint(self):
+        path = self.write_json('cases.json', [{'SourceIDValue': str(i)} for i in range(250)])
+        importer = self.make_importer(stream_min_bytes=1, checkpoint_rows=100, insert_engine='text')
+        connection = importer.connection
+        signature = importer._file_signature(str(path), {'SourceIDValue': 'VARCHAR(255)'})
+        connection.results['SELECT file_signature'] = [(signature, 100)]
+        connection.results['information_schema'] = [(1,)]  # The staging table is still there
+        
+        self.assertEqual(importer.import_json_file(str(path))[0], True)
+        self.assertEqual(self.inserted([connection]), [(i + 1, str(i)) for i in range(100, 250)])
+        checkpoints = [params[0] for sql, params in connection.statements
+                       if sql.startswith('UPDATE `import_checkpoints`')]
+        self.assertEqual(checkpoints, [200, 250])
+    def test_streamed_chunks_load_over_several_connections(self):
+        path = self.write_json('cases.json', [{'SourceIDValue': str(i)} for i in range(1000)])
+        importer = self.make_importer(stream_min_bytes=1, load_workers=3, insert_engine='text')
+        importer.STREAM_CHUNK_ROWS = 100
+        importer.PARALLEL_LOAD_MIN_ROWS = 1
+        
+        self.assertEqual(importer.import_json_file(str(path))[0], True)
+        self.assertEqual(self.inserted([importer.connection]), [])
+        self.assertEqual(self.inserted(self.connections[1:]), [(i + 1, str(i)) for i in range(1000)])
+    def test_streamed_ndjson_is_decoded_in_parallel_ranges(self):
+        path = self.directory / 'cases.jsonl'
+        path.write_text(''.join(json.dumps({'SourceIDValue': str(i % 700), 'n': i}) + '\n'
+                                for i in range(2000)), encoding='utf-8')
+        importer = self.make_importer(connect=False, duplicate_keys=('SourceIDValue',))
+        importer.NDJSON_PARALLEL_MIN_BYTES = 0
+        importer.STREAM_RANGE_BYTES = 1000
+        
+        with mock.patch.object(importer_module.os, 'cpu_count', return_value=3):
+            profile, _, keys, duplicates, dropped = importer._profile_stream('cases', str(path))
+            rows = list(importer._stream_rows(str(path), ['SourceIDValue', 'n']))
+        
+        self.assertEqual(profile.rows, 2000)
+        self.assertEqual(profile.column_types(), {'SourceIDValue': 'VARCHAR(255)', 'n': 'INT'})
+        self.assertEqual(duplicates, list(range(700, 2000)))
+        self.assertEqual(dropped, set())
+        self.assertEqual(rows, [(str(i % 700), i) for i in range(2000)])
+
+
+class FanOutTests(ImporterTestCase):
+    def test_streamed_file_is_read_once_for_all_targets(self):
+        self.write_json('cases.json', [{'SourceIDValue': str(i), 'n': i} for i in range(2500)])
+        importer = self.make_importer(stream_min_bytes=1)
+        importer.STREAM_CHUNK_ROWS = 1000
+        target = importer.add_target('otherhost', 'user', 'password', 'test')
+        target.RETRY_BACKOFF_SECONDS = 0
+        
+        reads = []
+        real_iter = importer_module._iter_json_records
+        def counting_iter(*args, **kwargs):
+            reads.append(args[0])
+            return real_iter(*args, **kwargs)
+        with mock.patch.object(importer_module, '_iter_json_records', counting_iter):
+            summary = importer.import_directory(str(self.directory), prefetch=False)
+        
+        self.assertEqual(summary['success_files'], ['cases.json'])
+        self.assertEqual(len(reads), 2)  # Pass one and pass two, once each
+        for connection in (importer.connection, target.connection):
+            inserted = sum(len(params) for sql, params in connection.statements
+                           if sql.startswith('INSERT INTO `cases__staging`'))
+            self.assertEqual(inserted, 2500)
+    def test_failing_target_does_not_stall_the_others(self):
+        self.write_json('cases.json', [{'SourceIDValue': str(i)} for i in range(5000)])
+        importer = self.make_importer(stream_min_bytes=1)
+        importer.STREAM_CHUNK_ROWS = 100
+        target = importer.add_target('otherhost', 'user', 'password', 'test')
+        
+        original_execute = FakeCursor.execute
+        def execute(cursor, sql, params=None, **kwargs):
+            if cursor.connection is target.connection and sql.startswith('CREATE TABLE'):
+                raise mysql.connector.errors.ProgrammingError(msg='Access denied')
+            return original_execute(cursor, sql, params, **kwargs)
+        with mock.patch.object(FakeCursor, 'execute', execute):
+            importer.import_directory(str(self.directory), prefetch=False)
+        
+        self.assertEqual(importer.target_results['test@localhost'][0], True)
+        self.assertEqual(importer.target_results['test@otherhost'][0], False)
+
+
+class FilePrefetcherTests(ImporterTestCase):
+    def fetch_within(self, prefetcher, path, seconds=5):
+        """fetch() in a thread; None if it is still waiting after seconds."""
+        result = []
+        thread = importer_module.threading.Thread(target=lambda: result.append(prefetcher.fetch(path)),
+                                                  daemon=True)
+        thread.start()
+        thread.join(seconds)
+        return result[0] if result else None
+    def test_each_worker_gets_a_budget(self):
+        files = [self.write_json(f'cases{i}.json', [{'n': i}]) for i in range(2)]
+        budget = max(path.stat().st_size for path in files)
+        with importer_module.FilePrefetcher(files, budget, workers=2) as prefetcher:
+            local = [self.fetch_within(prefetcher, path) for path in files]
+            self.assertNotIn(None, local)
+            self.assertFalse(any(path == str(source) for path, source in zip(local, files)))
+    def test_file_over_budget_is_copied_when_nothing_is_held(self):
+        files = [self.write_json('small.json', [{'n': 1}]),
+                 self.write_json('large.json', [{'n': 'x' * 1000}])]
+        with importer_module.FilePrefetcher(files, files[0].stat().st_size) as prefetcher:
+            self.assertNotEqual(self.fetch_within(prefetcher, files[0]), str(files[0]))
+            # Held back while the small copy is in use, copied once it is released
+            self.assertIsNone(self.fetch_within(prefetcher, files[1], seconds=0.2))
+            prefetcher.release(files[0])
+            local = self.fetch_within(prefetcher, files[1])
+            self.assertNotEqual(local, str(files[1]))
+            self.assertEqual(Path(local).read_bytes(), files[1].read_bytes())
+
+
+class SessionPoolTests(unittest.TestCase):
+    def make_gui(self):
+        # Only the pool bookkeeping is exercised, so no window is created
+        gui = importer_module.ImporterGUI.__new__(importer_module.ImporterGUI)
+        gui.connection_pool = mock.Mock()
+        gui.pool_lock = importer_module.threading.Lock()
+        gui.pool_users = 0
+        gui.retired_pools = []
+        gui.log_status = mock.Mock()
+        return gui
+    def test_pool_discarded_during_import_closes_when_it_finishes(self):
+        gui = self.make_gui()
+        pool = gui.use_connection_pool()
+        importer = mock.Mock()
+        
+        gui.discard_connection_pool()  # Connection field edited mid-import
+        pool.close_all.assert_not_called()
+        self.assertIsNone(gui.connection_pool)
+        
+        gui.close_importer(importer)
+        importer.close.assert_called_once()
+        pool.close_all.assert_called_once()
+    def test_importer_closed_even_when_close_fails(self):
+        gui = self.make_gui()
+        gui.use_connection_pool()
+        importer = mock.Mock()
+        importer.close.side_effect = mysql.connector.errors.OperationalError(msg='gone')
+        
+        gui.close_importer(importer)
+        
+        self.assertEqual(gui.pool_users, 0)
+        gui.discard_connection_pool()
+        self.assertIsNone(gui.connection_pool)
+
+
+if __name__ == '__main__':
+    unittest.main()